@@ -0,0 +1,276 @@
+"""
+Admission control in front of Codegen task execution.
+Bounds in-flight requests globally and per tenant, queues the overflow fairly
+(weighted round-robin across tenants) and rejects fast once a request's
+queue deadline passes.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted in time."""
+
+    def __init__(self, message: str, status_code: int = 503, retry_after: float = 1.0, reason: str = "overloaded"):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionLease:
+    """A granted execution slot; release it exactly once when the work ends."""
+
+    def __init__(self, controller: "AdmissionController", tenant: str, queued_for: float):
+        self.controller = controller
+        self.tenant = tenant
+        self.queued_for = queued_for
+        self.granted_at = time.monotonic()
+        self.released = False
+
+    def release(self):
+        """Give the slot back (idempotent)."""
+        if not self.released:
+            self.released = True
+            self.controller._release(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class _Waiter:
+    __slots__ = ("tenant", "future", "enqueued_at")
+
+    def __init__(self, tenant: str, future: asyncio.Future):
+        self.tenant = tenant
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class AdmissionController:
+    """Global and per-tenant concurrency governor with a weighted fair queue."""
+
+    def __init__(
+        self,
+        max_concurrent: int = 32,
+        per_tenant_limit: int = 8,
+        max_queue: int = 256,
+        per_tenant_queue: int = 64,
+        queue_timeout: float = 10.0,
+        tenant_weights: Optional[Dict[str, int]] = None
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.per_tenant_limit = max(1, per_tenant_limit)
+        self.max_queue = max_queue
+        self.per_tenant_queue = per_tenant_queue
+        self.queue_timeout = queue_timeout
+        self.tenant_weights = tenant_weights or {}
+
+        self._active = 0
+        self._tenant_active: Dict[str, int] = {}
+        self._queues: Dict[str, Deque[_Waiter]] = {}
+        self._queued = 0
+        # Round-robin order of tenants with queued work, and their remaining credits this round
+        self._rotation: Deque[str] = deque()
+        self._credits: Dict[str, int] = {}
+
+        # Metrics
+        self._admitted = 0
+        self._admitted_immediately = 0
+        self._rejected: Dict[str, int] = {}
+        self._peak_active = 0
+        self._peak_queued = 0
+        self._recent_waits: Deque[float] = deque(maxlen=1000)
+        self._recent_hold: Deque[float] = deque(maxlen=200)
+
+        logger.info(
+            f"Initialized AdmissionController with max_concurrent={self.max_concurrent}, "
+            f"per_tenant_limit={self.per_tenant_limit}, max_queue={max_queue}, queue_timeout={queue_timeout}s"
+        )
+
+    async def acquire(self, tenant: str = "anonymous", timeout: Optional[float] = None) -> AdmissionLease:
+        """
+        Wait for an execution slot.
+
+        Args:
+            tenant: Tenant identifier (see tenant_from_headers)
+            timeout: Queue deadline in seconds (defaults to queue_timeout)
+
+        Returns:
+            AdmissionLease: The granted slot
+
+        Raises:
+            AdmissionRejected: 429 when the tenant's queue is full, 503 when the
+                global queue is full or the deadline passes
+        """
+        if self._can_run(tenant) and not self._queues.get(tenant):
+            self._admitted_immediately += 1
+            return self._grant(tenant, 0.0)
+
+        queue = self._queues.get(tenant)
+        if self._queued >= self.max_queue:
+            raise self._reject("queue_full", 503, "Server is at capacity, please retry later")
+        if queue is not None and len(queue) >= self.per_tenant_queue:
+            raise self._reject("tenant_queue_full", 429, "Too many concurrent requests for this API key")
+
+        waiter = _Waiter(tenant, asyncio.get_running_loop().create_future())
+        if queue is None:
+            queue = self._queues[tenant] = deque()
+        if not queue:
+            self._rotation.append(tenant)
+        queue.append(waiter)
+        self._queued += 1
+        self._peak_queued = max(self._peak_queued, self._queued)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter.future), timeout=timeout or self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted at the deadline; hand the slot back before rejecting
+                waiter.future.result().release()
+            else:
+                self._remove_waiter(waiter)
+            raise self._reject("queue_timeout", 503, "Timed out waiting for capacity")
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                waiter.future.result().release()
+            else:
+                self._remove_waiter(waiter)
+            raise
+
+    def _can_run(self, tenant: str) -> bool:
+        return self._active < self.max_concurrent and self._tenant_active.get(tenant, 0) < self.per_tenant_limit
+
+    def _grant(self, tenant: str, waited: float) -> AdmissionLease:
+        self._active += 1
+        self._tenant_active[tenant] = self._tenant_active.get(tenant, 0) + 1
+        self._peak_active = max(self._peak_active, self._active)
+        self._admitted += 1
+        self._recent_waits.append(waited)
+        return AdmissionLease(self, tenant, waited)
+
+    def _release(self, lease: AdmissionLease):
+        self._active -= 1
+        remaining = self._tenant_active.get(lease.tenant, 1) - 1
+        if remaining > 0:
+            self._tenant_active[lease.tenant] = remaining
+        else:
+            self._tenant_active.pop(lease.tenant, None)
+        self._recent_hold.append(time.monotonic() - lease.granted_at)
+        self._dispatch()
+
+    def _dispatch(self):
+        """Grant free slots to queued tenants in weighted round-robin order."""
+        skipped = 0
+        while self._rotation and self._active < self.max_concurrent and skipped < len(self._rotation):
+            tenant = self._rotation[0]
+            queue = self._queues.get(tenant)
+            if not queue:
+                self._rotation.popleft()
+                self._credits.pop(tenant, None)
+                continue
+            if self._tenant_active.get(tenant, 0) >= self.per_tenant_limit:
+                # Tenant is at its own limit; let the others go first
+                self._rotation.rotate(-1)
+                skipped += 1
+                continue
+
+            skipped = 0
+            waiter = queue.popleft()
+            self._queued -= 1
+            waiter.future.set_result(self._grant(tenant, time.monotonic() - waiter.enqueued_at))
+
+            credits = self._credits.get(tenant, self.tenant_weights.get(tenant, 1)) - 1
+            if not queue:
+                self._rotation.popleft()
+                self._credits.pop(tenant, None)
+                self._queues.pop(tenant, None)
+            elif credits <= 0:
+                self._rotation.rotate(-1)
+                self._credits[tenant] = self.tenant_weights.get(tenant, 1)
+            else:
+                self._credits[tenant] = credits
+
+    def _remove_waiter(self, waiter: _Waiter):
+        queue = self._queues.get(waiter.tenant)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            self._queued -= 1
+            if not queue:
+                self._queues.pop(waiter.tenant, None)
+                self._credits.pop(waiter.tenant, None)
+                try:
+                    self._rotation.remove(waiter.tenant)
+                except ValueError:
+                    pass
+
+    def _retry_after(self) -> float:
+        """Estimate when capacity frees up from recent hold times and queue depth."""
+        if self._recent_hold:
+            avg_hold = sum(self._recent_hold) / len(self._recent_hold)
+        else:
+            avg_hold = self.queue_timeout
+        estimate = avg_hold * (1 + self._queued / self.max_concurrent)
+        return float(max(1, min(60, round(estimate))))
+
+    def _reject(self, reason: str, status_code: int, message: str) -> AdmissionRejected:
+        self._rejected[reason] = self._rejected.get(reason, 0) + 1
+        retry_after = self._retry_after()
+        logger.warning(f"Admission rejected ({reason}): {message}; retry after {retry_after}s")
+        return AdmissionRejected(message, status_code=status_code, retry_after=retry_after, reason=reason)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Live gauges and counters for the metrics endpoint."""
+        now = time.monotonic()
+        waits = sorted(self._recent_waits)
+        oldest = [q[0].enqueued_at for q in self._queues.values() if q]
+        return {
+            "max_concurrent": self.max_concurrent,
+            "per_tenant_limit": self.per_tenant_limit,
+            "active": self._active,
+            "queue_depth": self._queued,
+            "peak_active": self._peak_active,
+            "peak_queue_depth": self._peak_queued,
+            "oldest_wait_ms": round((now - min(oldest)) * 1000, 1) if oldest else 0.0,
+            "admitted": self._admitted,
+            "admitted_immediately": self._admitted_immediately,
+            "rejected": dict(self._rejected),
+            "wait_p50_ms": round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+            "wait_p95_ms": round(waits[min(len(waits) - 1, int(0.95 * len(waits)))] * 1000, 1) if waits else 0.0,
+            "tenants": {
+                tenant: {
+                    "active": self._tenant_active.get(tenant, 0),
+                    "queued": len(self._queues.get(tenant, ()))
+                }
+                for tenant in set(self._tenant_active) | set(self._queues)
+            }
+        }
+
+
+def tenant_from_headers(headers) -> str:
+    """
+    Derive a tenant ID from the request's API key without keeping the key itself.
+
+    Args:
+        headers: Request headers (Authorization: Bearer ..., x-api-key or x-goog-api-key)
+
+    Returns:
+        str: "key:<hash prefix>" or "anonymous"
+    """
+    api_key = headers.get("x-api-key") or headers.get("x-goog-api-key")
+    auth = headers.get("authorization", "")
+    if not api_key and auth.lower().startswith("bearer "):
+        api_key = auth[7:].strip()
+    if not api_key:
+        return "anonymous"
+    return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
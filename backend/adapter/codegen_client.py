@@ -10,6 +10,10 @@ from typing import Optional, AsyncGenerator
 from codegen.agents import Agent
 from codegen_api_client.exceptions import ApiException
 from backend.adapter.config import CodegenConfig
+from backend.adapter.task_executor import CodegenTaskExecutor, get_task_executor
+from backend.adapter.poll_scheduler import AdaptivePollScheduler, get_poll_scheduler
+from backend.adapter.task_poller import TaskPoller
+from backend.adapter.stream_engine import TaskStreamEngine
 
 logger = logging.getLogger(__name__)
 
@@ -17,9 +21,18 @@ logger = logging.getLogger(__name__)
 class CodegenClient:
     """Wrapper for Codegen SDK with async support and error handling."""
     
-    def __init__(self, config: CodegenConfig):
+    def __init__(
+        self,
+        config: CodegenConfig,
+        executor: Optional[CodegenTaskExecutor] = None,
+        scheduler: Optional[AdaptivePollScheduler] = None
+    ):
         self.config = config
         self.agent = None
+        self.executor = executor or get_task_executor()
+        self.scheduler = (scheduler or get_poll_scheduler()) if config.adaptive_polling else None
+        self.poller = TaskPoller(self.executor, base_delay=1, scheduler=self.scheduler)
+        self.stream_engine = TaskStreamEngine(self.poller)
         self._initialize_agent()
     
     def _initialize_agent(self):
@@ -54,7 +67,7 @@ class CodegenClient:
         
         try:
             # Run the task
-            task = self.agent.run(prompt)
+            task = await self.executor.run(self.agent.run, prompt)
             logger.info(f"Created task with ID: {task.id}")
             
             if stream:
@@ -63,17 +76,19 @@ class CodegenClient:
                     yield chunk
             else:
                 # For non-streaming, wait for completion and return full result
-                await asyncio.sleep(1)  # Initial delay to allow task to start
                 start_time = time.time()  # Track timing for completion logging
                 
                 # Poll task status until completion with rate limiting
                 retry_count = 0
                 max_retries = 20  # Increased for longer tasks
-                base_delay = 5  # Start with 5 seconds to avoid rate limits
+                base_delay = 5  # Backoff start when there is no completion history yet
+                last_poll_time = start_time
+                await asyncio.sleep(self._next_poll_delay(prompt, start_time, retry_count, 1))
                 
                 while retry_count < max_retries:
                     try:
-                        task.refresh()
+                        poll_time = time.time()
+                        await self.executor.run(task.refresh)
                         status = task.status.upper() if hasattr(task.status, 'upper') else str(task.status).upper()
                         
                         # Enhanced completion tracking logging
@@ -81,6 +96,9 @@ class CodegenClient:
                         logger.debug(f"🔍 COMPLETION CHECK | Task: {task.id} | Status: {status} | Attempt: {retry_count + 1} | Duration: {elapsed_time:.2f}s")
                         
                         if status == "COMPLETE":
+                            if self.scheduler:
+                                self.scheduler.record_completion(None, len(prompt), (last_poll_time + poll_time) / 2 - start_time)
+                            
                             # Try multiple ways to get the task result (original logic preserved)
                             # Simplified and more robust content extraction
                             result_content = None
@@ -110,7 +128,7 @@ class CodegenClient:
                             # Try get_result() method as last resort
                             if not result_content and hasattr(task, 'get_result'):
                                 try:
-                                    result_value = task.get_result()
+                                    result_value = await self.executor.run(task.get_result)
                                     if result_value is not None and str(result_value).strip():
                                         result_content = str(result_value).strip()
                                         extraction_method = 'task.get_result()'
@@ -142,14 +160,16 @@ class CodegenClient:
                             logger.error(f"Task {task.id} failed: {error_msg}")
                             raise RuntimeError(f"Codegen task failed: {error_msg}")
                         elif status in ["PENDING", "ACTIVE", "RUNNING"]:
-                            # Use exponential backoff to avoid rate limits
-                            delay = min(base_delay * (1.5 ** retry_count), 30)  # Cap at 30 seconds
+                            # Poll where tasks usually finish, or back off without history
+                            last_poll_time = poll_time
+                            delay = self._next_poll_delay(prompt, start_time, retry_count + 1, base_delay * (1.5 ** retry_count))
                             logger.debug(f"Task {task.id} still {status}, waiting {delay:.1f}s...")
                             await asyncio.sleep(delay)
                             retry_count += 1
                         else:
                             # Unknown status, wait with backoff
-                            delay = min(base_delay * (1.5 ** retry_count), 30)
+                            last_poll_time = poll_time
+                            delay = self._next_poll_delay(prompt, start_time, retry_count + 1, base_delay * (1.5 ** retry_count))
                             logger.warning(f"Task {task.id} unknown status {status}, waiting {delay:.1f}s...")
                             await asyncio.sleep(delay)
                             retry_count += 1
@@ -181,67 +201,23 @@ class CodegenClient:
             logger.error(f"Error running Codegen task: {e}")
             raise
     
+    def _next_poll_delay(self, prompt: str, start_time: float, polls_used: int, fallback: float) -> float:
+        """Delay before the next poll from the learned completion times (fallback without adaptive polling), capped at 30 seconds."""
+        if self.scheduler is None:
+            return min(fallback, 30)
+        delay = self.scheduler.next_poll_delay(None, len(prompt), time.time() - start_time, polls_used)
+        return min(fallback if delay is None else delay, 30)
+    
     async def _stream_task_response(self, task) -> AsyncGenerator[str, None]:
         """
-        Stream task response by polling status and yielding partial results.
+        Stream task response as output deltas.
         
-        This is a simplified streaming implementation since we don't know
-        the exact streaming capabilities of the Codegen SDK.
+        Deltas come from the shared poller's refreshes, so the first token
+        arrives after the first refresh rather than a fixed delay.
         """
-        last_content = ""
-        retry_count = 0
-        max_retries = 20
-        base_delay = 5
-        
-        while retry_count < max_retries:
-            try:
-                await asyncio.sleep(base_delay)  # Wait before polling
-                task.refresh()
-                status = task.status.upper() if hasattr(task.status, 'upper') else str(task.status).upper()
-                
-                if status == "COMPLETE":
-                    if hasattr(task, 'result') and task.result:
-                        # Yield any remaining content
-                        if task.result != last_content:
-                            new_content = task.result[len(last_content):]
-                            if new_content:
-                                yield new_content
-                    break
-                elif status == "FAILED":
-                    error_msg = getattr(task, 'error', 'Task failed with unknown error')
-                    raise RuntimeError(f"Codegen task failed: {error_msg}")
-                elif status in ["ACTIVE", "RUNNING"]:
-                    # Try to get partial results if available
-                    if hasattr(task, 'partial_result') and task.partial_result:
-                        if task.partial_result != last_content:
-                            new_content = task.partial_result[len(last_content):]
-                            if new_content:
-                                yield new_content
-                                last_content = task.partial_result
-                    # If no partial results, yield a small indicator
-                    elif not last_content:
-                        yield ""  # Empty chunk to indicate streaming started
-                        last_content = " "  # Mark that we've started
-                
-                retry_count += 1
-                
-            except ApiException as e:
-                if e.status == 429:  # Rate limit exceeded
-                    retry_after = 5
-                    if hasattr(e, 'headers') and 'Retry-After' in e.headers:
-                        retry_after = int(e.headers['Retry-After'])
-                    
-                    logger.warning(f"Rate limit hit during streaming, waiting {retry_after + 2} seconds...")
-                    await asyncio.sleep(retry_after + 2)
-                    retry_count += 1
-                    continue
-                else:
-                    raise
-            except Exception as e:
-                logger.error(f"Error during streaming: {e}")
-                await asyncio.sleep(base_delay)
-                retry_count += 1
-
+        async for chunk in self.stream_engine.stream(task, timeout=self.config.timeout, max_polls=20):
+            yield chunk
+    
     def count_tokens(self, text: str) -> int:
         """
         Estimate token count for a given text.
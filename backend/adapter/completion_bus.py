@@ -0,0 +1,287 @@
+"""
+Completion bus for fanning webhook completions out across server workers.
+With several uvicorn workers the webhook lands on an arbitrary worker; the bus
+delivers it to every worker so the one that owns the task can wake its waiter.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import redis.asyncio as aioredis
+    REDIS_AVAILABLE = True
+except ImportError:
+    aioredis = None
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# deliver(task_id, status, result) -> True if this worker owns the task
+DeliverCallback = Callable[[str, str, Optional[Any]], bool]
+
+
+class CompletionBus(ABC):
+    """Publishes task completions and delivers them to the local registry."""
+
+    backend = "abstract"
+
+    def __init__(self):
+        self._deliver: Optional[DeliverCallback] = None
+        self._published = 0
+        self._received = 0
+        self._delivered = 0
+        self._ignored = 0
+        self._errors = 0
+
+    async def start(self, deliver: DeliverCallback):
+        """
+        Start receiving completions.
+
+        Args:
+            deliver: Callback that hands a completion to this worker's registry
+        """
+        self._deliver = deliver
+
+    async def stop(self):
+        """Stop receiving completions."""
+        self._deliver = None
+
+    @abstractmethod
+    async def publish(self, task_id: str, status: str, result: Optional[Any] = None):
+        """
+        Publish a completion to every worker.
+
+        Args:
+            task_id: The ID of the task
+            status: Status reported by the webhook
+            result: Result content, if the webhook carried one
+        """
+
+    def _dispatch(self, task_id: str, status: str, result: Optional[Any]) -> bool:
+        """Deliver a completion locally; tasks owned by other workers are ignored."""
+        self._received += 1
+        if not self._deliver:
+            return False
+        try:
+            owned = self._deliver(str(task_id), status, result)
+        except Exception as e:
+            self._errors += 1
+            logger.error(f"Error delivering completion for task {task_id}: {e}")
+            return False
+        if owned:
+            self._delivered += 1
+        else:
+            self._ignored += 1
+        return owned
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get bus throughput counters."""
+        return {
+            "backend": self.backend,
+            "published": self._published,
+            "received": self._received,
+            "delivered": self._delivered,
+            "ignored": self._ignored,
+            "errors": self._errors
+        }
+
+
+class LocalCompletionBus(CompletionBus):
+    """In-process bus for single-worker deployments."""
+
+    backend = "local"
+
+    async def publish(self, task_id: str, status: str, result: Optional[Any] = None):
+        self._published += 1
+        self._dispatch(task_id, status, result)
+
+
+class SQLiteCompletionBus(CompletionBus):
+    """Bus backed by a shared SQLite file that every worker tails."""
+
+    backend = "sqlite"
+
+    def __init__(self, path: str, poll_interval: float = 0.05, retention: float = 300):
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._cursor = 0
+        self._reader: Optional[asyncio.Task] = None
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        # The tailing connection is used from executor threads, one call at a time
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS completion_events ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, task_id TEXT NOT NULL, "
+                "status TEXT NOT NULL, result TEXT, created_at REAL NOT NULL)"
+            )
+        finally:
+            conn.close()
+
+    def _insert(self, task_id: str, status: str, result: Optional[Any]):
+        conn = self._connect()
+        try:
+            conn.execute(
+                "INSERT INTO completion_events (task_id, status, result, created_at) VALUES (?, ?, ?, ?)",
+                (task_id, status, json.dumps(result), time.time())
+            )
+        finally:
+            conn.close()
+
+    def _read_since(self, conn: sqlite3.Connection, cursor: int):
+        return conn.execute(
+            "SELECT id, task_id, status, result FROM completion_events WHERE id > ? ORDER BY id",
+            (cursor,)
+        ).fetchall()
+
+    def _prune(self, conn: sqlite3.Connection):
+        conn.execute("DELETE FROM completion_events WHERE created_at < ?", (time.time() - self.retention,))
+
+    async def start(self, deliver: DeliverCallback):
+        await super().start(deliver)
+        conn = await asyncio.to_thread(self._connect)
+        row = await asyncio.to_thread(lambda: conn.execute("SELECT MAX(id) FROM completion_events").fetchone())
+        self._cursor = row[0] or 0
+        self._reader = asyncio.get_running_loop().create_task(self._tail(conn))
+        logger.info(f"SQLite completion bus tailing {self.path} from event {self._cursor}")
+
+    async def stop(self):
+        if self._reader:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        await super().stop()
+
+    async def publish(self, task_id: str, status: str, result: Optional[Any] = None):
+        self._published += 1
+        await asyncio.to_thread(self._insert, str(task_id), status, result)
+
+    async def _tail(self, conn: sqlite3.Connection):
+        """Deliver new events as other workers write them."""
+        last_prune = time.monotonic()
+        try:
+            while True:
+                try:
+                    rows = await asyncio.to_thread(self._read_since, conn, self._cursor)
+                    for event_id, task_id, status, result in rows:
+                        self._cursor = event_id
+                        self._dispatch(task_id, status, json.loads(result) if result else None)
+                    if time.monotonic() - last_prune > self.retention:
+                        last_prune = time.monotonic()
+                        await asyncio.to_thread(self._prune, conn)
+                except sqlite3.Error as e:
+                    self._errors += 1
+                    logger.error(f"Error reading completion bus: {e}")
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            conn.close()
+
+
+class RedisCompletionBus(CompletionBus):
+    """Bus backed by Redis pub/sub."""
+
+    backend = "redis"
+
+    def __init__(self, url: str, channel: str = "codegen:completions"):
+        super().__init__()
+        if not REDIS_AVAILABLE:
+            raise ImportError("redis is required for the Redis completion bus (pip install redis)")
+        self.url = url
+        self.channel = channel
+        self._client = aioredis.from_url(url)
+        self._pubsub = None
+        self._reader: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: DeliverCallback):
+        await super().start(deliver)
+        self._pubsub = self._client.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._reader = asyncio.get_running_loop().create_task(self._listen())
+        logger.info(f"Redis completion bus subscribed to {self.channel}")
+
+    async def stop(self):
+        if self._reader:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+        if self._pubsub:
+            await self._pubsub.unsubscribe(self.channel)
+            await self._pubsub.close()
+            self._pubsub = None
+        await super().stop()
+
+    async def publish(self, task_id: str, status: str, result: Optional[Any] = None):
+        self._published += 1
+        await self._client.publish(
+            self.channel,
+            json.dumps({"task_id": str(task_id), "status": status, "result": result})
+        )
+
+    async def _listen(self):
+        async for message in self._pubsub.listen():
+            if message.get("type") != "message":
+                continue
+            try:
+                event = json.loads(message["data"])
+            except (TypeError, ValueError) as e:
+                self._errors += 1
+                logger.error(f"Malformed completion bus message: {e}")
+                continue
+            self._dispatch(event.get("task_id"), event.get("status", "UNKNOWN"), event.get("result"))
+
+
+def create_completion_bus(url: Optional[str] = None) -> CompletionBus:
+    """
+    Create a completion bus from a URL.
+
+    Args:
+        url: "local", "sqlite:///path/to/bus.db" or "redis://host:port/db";
+             defaults to CODEGEN_COMPLETION_BUS_URL, then "local". As in
+             SQLAlchemy, sqlite:///bus.db is relative to the working
+             directory and sqlite:////tmp/bus.db is absolute.
+
+    Returns:
+        CompletionBus: The configured bus
+
+    Raises:
+        ValueError: If the SQLite file's directory can't be created or opened
+    """
+    url = url or os.environ.get("CODEGEN_COMPLETION_BUS_URL", "local")
+    if url.startswith("sqlite://"):
+        path = url[len("sqlite://"):]
+        path = (path[1:] if path.startswith("/") else path) or "completion_bus.db"
+        directory = os.path.dirname(os.path.abspath(path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            return SQLiteCompletionBus(path)
+        except (OSError, sqlite3.Error) as e:
+            hint = "" if os.path.isabs(path) else "; use sqlite:////absolute/path.db (four slashes) for an absolute path"
+            raise ValueError(
+                f"CODEGEN_COMPLETION_BUS_URL={url!r}: cannot open SQLite file {os.path.abspath(path)!r} ({e}){hint}"
+            ) from e
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCompletionBus(url)
+    if url != "local":
+        logger.warning(f"Unknown completion bus URL {url!r}, using local bus")
+    return LocalCompletionBus()
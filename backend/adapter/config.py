@@ -17,6 +17,7 @@ class CodegenConfig(BaseModel):
     token: str
     base_url: Optional[str] = "https://codegen-sh--rest-api.modal.run"
     timeout: int = 300
+    adaptive_polling: bool = True  # Schedule polls from observed completion times
     
     @classmethod
     def from_environment(cls) -> "CodegenConfig":
@@ -25,7 +26,8 @@ class CodegenConfig(BaseModel):
             org_id=os.environ.get("CODEGEN_ORG_ID", "323"),
             token=os.environ.get("CODEGEN_API_TOKEN", ""),
             base_url=os.environ.get("CODEGEN_BASE_URL", "https://codegen-sh--rest-api.modal.run"),
-            timeout=int(os.environ.get("CODEGEN_TIMEOUT", "300"))
+            timeout=int(os.environ.get("CODEGEN_TIMEOUT", "300")),
+            adaptive_polling=os.environ.get("CODEGEN_ADAPTIVE_POLLING", "true").lower() == "true"
         )
 
 class EnhancedCodegenConfig(BaseModel):
@@ -53,6 +55,48 @@ class EnhancedCodegenConfig(BaseModel):
     max_retries: int = 20
     base_delay: int = 2
     
+    # Shared task poller settings
+    poll_rate_limit: float = 5.0  # Upstream task refreshes per second across all requests
+    adaptive_polling: bool = True  # Schedule polls from observed completion times
+    poll_budget: int = 12  # Target polls per task for the adaptive schedule
+    
+    # Request coalescing (single-flight) settings
+    coalesce_requests: bool = True  # Share one upstream task between identical concurrent requests
+    coalesce_window: float = 0.0  # Seconds a finished task stays joinable by identical requests
+    
+    # Response cache settings (temperature-0 requests only)
+    response_cache_enabled: bool = False
+    response_cache_path: str = "response_cache.db"
+    response_cache_ttl: int = 3600
+    response_cache_memory_bytes: int = 32 * 1024 * 1024
+    response_cache_disk_bytes: int = 512 * 1024 * 1024
+    
+    # Webhook completion registry settings
+    webhook_result_ttl: int = 300  # Seconds an uncollected webhook result is kept
+    webhook_max_result_bytes: int = 64 * 1024 * 1024  # Memory cap on stored webhook results
+    completion_bus_url: str = "local"  # local, sqlite:///path or redis://host:port/db
+    
+    # Admission control settings
+    max_concurrent_tasks: int = 32  # Requests executing at once across all tenants
+    tenant_concurrency: int = 8  # Requests executing at once per API key
+    admission_queue_size: int = 256  # Requests allowed to wait for a slot
+    tenant_queue_size: int = 64  # Requests allowed to wait per API key
+    admission_timeout: float = 10.0  # Seconds a request may wait before a 503
+    tenant_weights: Dict[str, int] = Field(default_factory=dict)  # Fair-queue weights by tenant ID
+    
+    # Streaming output settings
+    stream_pacing: str = "immediate"  # immediate, coalesce or paced
+    stream_pacing_endpoints: Dict[str, str] = Field(default_factory=dict)  # Per-API overrides (openai/anthropic/gemini)
+    stream_flush_bytes: int = 1024  # Coalesce: flush once this many bytes are buffered
+    stream_flush_interval_ms: float = 20.0  # Coalesce: flush at least this often
+    stream_chars_per_second: float = 400.0  # Paced: output rate limit
+    
+    # Stream hub (extra subscribers via /v1/streams/{id})
+    stream_backlog_bytes: int = 1024 * 1024  # Per-stream replay backlog
+    stream_retention_seconds: float = 60.0  # Finished streams stay attachable this long
+    stream_linger_seconds: float = 30.0  # Keep upstream running this long after the last subscriber leaves (resume window)
+    stream_heartbeat_seconds: float = 15.0  # Send `: ping` on SSE streams idle this long (0 disables)
+    
     # Prompt template settings
     prompt_template_enabled: bool = False
     prompt_template_prefix: Optional[str] = None
@@ -73,6 +117,28 @@ class EnhancedCodegenConfig(BaseModel):
             except Exception as e:
                 logger.warning(f"Failed to parse CODEGEN_MODEL_MAPPING: {e}")
         
+        # Parse fair-queue weights ("key:abc123=3,anonymous=1")
+        tenant_weights = {}
+        weights_str = os.environ.get("CODEGEN_TENANT_WEIGHTS", "")
+        if weights_str:
+            try:
+                for pair in weights_str.split(","):
+                    tenant, weight = pair.rsplit("=", 1)
+                    tenant_weights[tenant.strip()] = max(1, int(weight))
+            except Exception as e:
+                logger.warning(f"Failed to parse CODEGEN_TENANT_WEIGHTS: {e}")
+        
+        # Parse per-API stream pacing ("anthropic:coalesce,gemini:paced")
+        stream_pacing_endpoints = {}
+        pacing_str = os.environ.get("CODEGEN_STREAM_PACING_ENDPOINTS", "")
+        if pacing_str:
+            try:
+                for pair in pacing_str.split(","):
+                    api, mode = pair.split(":")
+                    stream_pacing_endpoints[api.strip().lower()] = mode.strip().lower()
+            except Exception as e:
+                logger.warning(f"Failed to parse CODEGEN_STREAM_PACING_ENDPOINTS: {e}")
+        
         return cls(
             org_id=os.environ.get("CODEGEN_ORG_ID", "323"),
             token=os.environ.get("CODEGEN_API_TOKEN", ""),  # Updated to use CODEGEN_API_TOKEN
@@ -87,6 +153,34 @@ class EnhancedCodegenConfig(BaseModel):
             intercept_gemini=os.environ.get("INTERCEPT_GEMINI", "true").lower() == "true",
             max_retries=int(os.environ.get("CODEGEN_MAX_RETRIES", "20")),
             base_delay=int(os.environ.get("CODEGEN_BASE_DELAY", "2")),
+            poll_rate_limit=float(os.environ.get("CODEGEN_POLL_RATE_LIMIT", "5.0")),
+            adaptive_polling=os.environ.get("CODEGEN_ADAPTIVE_POLLING", "true").lower() == "true",
+            poll_budget=int(os.environ.get("CODEGEN_POLL_BUDGET", "12")),
+            coalesce_requests=os.environ.get("CODEGEN_COALESCE_REQUESTS", "true").lower() == "true",
+            coalesce_window=float(os.environ.get("CODEGEN_COALESCE_WINDOW", "0")),
+            response_cache_enabled=os.environ.get("CODEGEN_RESPONSE_CACHE", "false").lower() == "true",
+            response_cache_path=os.environ.get("CODEGEN_RESPONSE_CACHE_PATH", "response_cache.db"),
+            response_cache_ttl=int(os.environ.get("CODEGEN_RESPONSE_CACHE_TTL", "3600")),
+            response_cache_memory_bytes=int(os.environ.get("CODEGEN_RESPONSE_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024))),
+            response_cache_disk_bytes=int(os.environ.get("CODEGEN_RESPONSE_CACHE_DISK_BYTES", str(512 * 1024 * 1024))),
+            webhook_result_ttl=int(os.environ.get("CODEGEN_WEBHOOK_RESULT_TTL", "300")),
+            webhook_max_result_bytes=int(os.environ.get("CODEGEN_WEBHOOK_MAX_RESULT_BYTES", str(64 * 1024 * 1024))),
+            completion_bus_url=os.environ.get("CODEGEN_COMPLETION_BUS_URL", "local"),
+            max_concurrent_tasks=int(os.environ.get("CODEGEN_MAX_CONCURRENT_TASKS", "32")),
+            tenant_concurrency=int(os.environ.get("CODEGEN_TENANT_CONCURRENCY", "8")),
+            admission_queue_size=int(os.environ.get("CODEGEN_ADMISSION_QUEUE_SIZE", "256")),
+            tenant_queue_size=int(os.environ.get("CODEGEN_TENANT_QUEUE_SIZE", "64")),
+            admission_timeout=float(os.environ.get("CODEGEN_ADMISSION_TIMEOUT", "10")),
+            tenant_weights=tenant_weights,
+            stream_pacing=os.environ.get("CODEGEN_STREAM_PACING", "immediate").lower(),
+            stream_pacing_endpoints=stream_pacing_endpoints,
+            stream_flush_bytes=int(os.environ.get("CODEGEN_STREAM_FLUSH_BYTES", "1024")),
+            stream_flush_interval_ms=float(os.environ.get("CODEGEN_STREAM_FLUSH_INTERVAL_MS", "20")),
+            stream_chars_per_second=float(os.environ.get("CODEGEN_STREAM_CHARS_PER_SECOND", "400")),
+            stream_backlog_bytes=int(os.environ.get("CODEGEN_STREAM_BACKLOG_BYTES", str(1024 * 1024))),
+            stream_retention_seconds=float(os.environ.get("CODEGEN_STREAM_RETENTION_SECONDS", "60")),
+            stream_linger_seconds=float(os.environ.get("CODEGEN_STREAM_LINGER_SECONDS", "30")),
+            stream_heartbeat_seconds=float(os.environ.get("CODEGEN_STREAM_HEARTBEAT_SECONDS", "15")),
             prompt_template_enabled=os.environ.get("CODEGEN_PROMPT_TEMPLATE_ENABLED", "false").lower() == "true",
             prompt_template_prefix=os.environ.get("CODEGEN_PROMPT_TEMPLATE_PREFIX"),
             prompt_template_suffix=os.environ.get("CODEGEN_PROMPT_TEMPLATE_SUFFIX")
@@ -3,7 +3,8 @@ Enhanced Codegen client with model selection and prompt template support.
 """
 
 import logging
-from typing import AsyncGenerator, Optional
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Dict, Optional
 
 from codegen.agents import Agent
 
@@ -11,6 +12,11 @@ from backend.adapter.auth import CodegenAuth
 from backend.adapter.config import EnhancedCodegenConfig
 from backend.adapter.model_mapper import ModelMapper
 from backend.adapter.task_manager import CodegenTaskManager
+from backend.adapter.task_executor import CodegenTaskExecutor, get_task_executor
+from backend.adapter.task_poller import TaskPoller
+from backend.adapter.poll_scheduler import AdaptivePollScheduler
+from backend.adapter.single_flight import SingleFlight, make_request_key
+from backend.adapter.response_cache import ResponseCache, is_deterministic
 from backend.adapter.enhanced_transformer import PromptTemplate
 
 logger = logging.getLogger(__name__)
@@ -24,13 +30,29 @@ class EnhancedCodegenClient:
         auth: Optional[CodegenAuth] = None,
         model_mapper: Optional[ModelMapper] = None,
         prompt_template: Optional[PromptTemplate] = None,
-        webhook_handler = None
+        webhook_handler = None,
+        executor: Optional[CodegenTaskExecutor] = None
     ):
         self.config = config
         self.auth = auth or CodegenAuth()
         self.model_mapper = model_mapper or ModelMapper(config.model_mapping)
         self.prompt_template = prompt_template or PromptTemplate(config)
         self.webhook_handler = webhook_handler
+        self.executor = executor or get_task_executor()
+        self.scheduler = AdaptivePollScheduler(poll_budget=config.poll_budget) if config.adaptive_polling else None
+        self.poller = TaskPoller(
+            self.executor,
+            base_delay=config.base_delay,
+            max_polls_per_second=config.poll_rate_limit,
+            scheduler=self.scheduler
+        )
+        self.single_flight = SingleFlight(window=config.coalesce_window) if config.coalesce_requests else None
+        self.response_cache = ResponseCache(
+            path=config.response_cache_path,
+            ttl=config.response_cache_ttl,
+            max_memory_bytes=config.response_cache_memory_bytes,
+            max_disk_bytes=config.response_cache_disk_bytes
+        ) if config.response_cache_enabled else None
         self.agent = None
         self.task_manager = None
         self._initialize_agent()
@@ -68,7 +90,9 @@ class EnhancedCodegenClient:
                 self.agent,
                 max_retries=self.config.max_retries,
                 base_delay=self.config.base_delay,
-                webhook_handler=self.webhook_handler
+                webhook_handler=self.webhook_handler,
+                executor=self.executor,
+                poller=self.poller
             )
             
             logger.info(f"Initialized enhanced Codegen client for org_id: {org_id}")
@@ -81,7 +105,10 @@ class EnhancedCodegenClient:
         prompt: str,
         model: Optional[str] = None,
         stream: bool = False,
-        timeout: Optional[int] = None
+        timeout: Optional[int] = None,
+        request_params: Optional[Dict[str, Any]] = None,
+        coalesce: bool = True,
+        cache: bool = True
     ) -> AsyncGenerator[str, None]:
         """
         Run a task with the Codegen agent.
@@ -91,6 +118,9 @@ class EnhancedCodegenClient:
             model: The Codegen model to use
             stream: Whether to stream the response
             timeout: Maximum time to wait for completion in seconds
+            request_params: Generation parameters from the client request
+            coalesce: Share one upstream task with identical concurrent requests
+            cache: Allow answering deterministic requests from the response cache
             
         Yields:
             Response chunks if streaming, or final response if not streaming
@@ -104,18 +134,63 @@ class EnhancedCodegenClient:
         # Use provided timeout or default from config
         timeout_value = timeout or self.config.timeout
         
-        # Run the task
-        async for chunk in self.task_manager.run_task(
-            prompt=prompt,
-            model=model,
-            stream=stream,
-            timeout=timeout_value
-        ):
-            yield chunk
+        # Deterministic requests can be answered from (and stored into) the response cache
+        cache_key = None
+        if self.response_cache and cache and is_deterministic(request_params):
+            cache_key = make_request_key(prompt, model, request_params)
+            cached = await self.response_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Serving response from cache ({len(cached)} chars)")
+                yield cached
+                return
+        
+        async def store_result(result: str):
+            # Only a completed task's full result is cached, never partial or placeholder output
+            if isinstance(result, str):
+                await self.response_cache.put(cache_key, result)
+        
+        def start_task():
+            return self.task_manager.run_task(
+                prompt=prompt,
+                model=model,
+                stream=stream,
+                timeout=timeout_value,
+                on_result=store_result if cache_key else None
+            )
+        
+        # Run the task, sharing it with identical in-flight requests when allowed
+        if self.single_flight and coalesce:
+            key = make_request_key(prompt, model, request_params, stream)
+            chunks = self.single_flight.run(key, start_task)
+        else:
+            chunks = start_task()
+        
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                yield chunk
     
     def validate(self) -> bool:
         """Validate client configuration."""
         return self.agent is not None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get task-execution metrics for the metrics endpoint."""
+        stats = {
+            "executor": self.executor.get_stats(),
+            "poller": self.poller.get_stats()
+        }
+        if self.task_manager:
+            stats["streaming"] = self.task_manager.stream_engine.get_stats()
+            stats["cancellation"] = self.task_manager.get_stats()
+        if self.single_flight:
+            stats["single_flight"] = self.single_flight.get_stats()
+        if self.response_cache:
+            stats["response_cache"] = self.response_cache.get_stats()
+        if self.webhook_handler:
+            stats["webhook"] = self.webhook_handler.get_stats()
+            if getattr(self.webhook_handler, "bus", None):
+                stats["completion_bus"] = self.webhook_handler.bus.get_stats()
+        return stats
 
 
 def create_enhanced_client(
@@ -123,7 +198,8 @@ def create_enhanced_client(
     auth: Optional[CodegenAuth] = None,
     model_mapper: Optional[ModelMapper] = None,
     prompt_template: Optional[PromptTemplate] = None,
-    webhook_handler = None
+    webhook_handler = None,
+    executor: Optional[CodegenTaskExecutor] = None
 ) -> EnhancedCodegenClient:
     """Create an enhanced Codegen client."""
     return EnhancedCodegenClient(
@@ -131,5 +207,6 @@ def create_enhanced_client(
         auth=auth,
         model_mapper=model_mapper,
         prompt_template=prompt_template,
-        webhook_handler=webhook_handler
+        webhook_handler=webhook_handler,
+        executor=executor
     )
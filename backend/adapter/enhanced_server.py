@@ -2,13 +2,16 @@
 Enhanced FastAPI server with model selection and prompt template support.
 """
 
+import asyncio
 import logging
 import traceback
 import time
+from contextlib import asynccontextmanager
 from datetime import datetime
+from typing import Optional
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 
 from backend.adapter.models import (
@@ -32,7 +35,7 @@ from backend.adapter.response_transformer import (
     estimate_tokens, clean_content
 )
 from backend.adapter.enhanced_streaming import (
-    create_enhanced_streaming_response, collect_enhanced_streaming_response
+    create_enhanced_streaming_response, create_text_streaming_response, collect_enhanced_streaming_response
 )
 from backend.adapter.anthropic_transformer import create_anthropic_response
 from backend.adapter.anthropic_streaming import (
@@ -44,6 +47,10 @@ from backend.adapter.gemini_streaming import (
 )
 from backend.adapter.system_message_manager import get_system_message_manager
 from backend.adapter.webhook_handler import WebhookHandler
+from backend.adapter.completion_bus import create_completion_bus
+from backend.adapter.admission import AdmissionController, AdmissionLease, AdmissionRejected, tenant_from_headers
+from backend.middleware.compression import CompressionConfig, CompressionMiddleware, get_compression_stats
+from backend.streaming import HubStream, PacingConfig, StreamHub, StreamNotFound
 
 # Enhanced logging configuration
 logging.basicConfig(
@@ -63,8 +70,13 @@ model_mapper = get_model_mapper()
 prompt_template = create_prompt_template(codegen_config)
 system_message_manager = get_system_message_manager()
 
-# Initialize webhook handler
-webhook_handler = WebhookHandler()
+# Initialize webhook handler; the completion bus routes webhooks to the worker that owns the task
+completion_bus = create_completion_bus(codegen_config.completion_bus_url)
+webhook_handler = WebhookHandler(
+    result_ttl=codegen_config.webhook_result_ttl,
+    max_result_bytes=codegen_config.webhook_max_result_bytes,
+    bus=completion_bus
+)
 
 # Initialize enhanced client
 enhanced_client = create_enhanced_client(
@@ -75,11 +87,117 @@ enhanced_client = create_enhanced_client(
     webhook_handler=webhook_handler
 )
 
+# Initialize admission control in front of task execution
+admission = AdmissionController(
+    max_concurrent=codegen_config.max_concurrent_tasks,
+    per_tenant_limit=codegen_config.tenant_concurrency,
+    max_queue=codegen_config.admission_queue_size,
+    per_tenant_queue=codegen_config.tenant_queue_size,
+    queue_timeout=codegen_config.admission_timeout,
+    tenant_weights=codegen_config.tenant_weights
+)
+
+# Streaming output pacing, with optional per-API overrides
+def get_stream_pacing(api: str) -> PacingConfig:
+    """Pacing settings for one API dialect (openai, anthropic or gemini)."""
+    return PacingConfig.from_dict({
+        "mode": codegen_config.stream_pacing_endpoints.get(api, codegen_config.stream_pacing),
+        "flush_bytes": codegen_config.stream_flush_bytes,
+        "flush_interval_ms": codegen_config.stream_flush_interval_ms,
+        "chars_per_second": codegen_config.stream_chars_per_second
+    })
+
+stream_pacing = {api: get_stream_pacing(api) for api in ("openai", "anthropic", "gemini")}
+
+# Streamed completions are published here so more readers can attach by stream ID
+stream_hub = StreamHub(
+    backlog_bytes=codegen_config.stream_backlog_bytes,
+    retention=codegen_config.stream_retention_seconds,
+    linger=codegen_config.stream_linger_seconds,
+    heartbeat_interval=codegen_config.stream_heartbeat_seconds
+)
+
+def publish_stream(response: StreamingResponse, lease: AdmissionLease, http_request: Request) -> StreamingResponse:
+    """
+    Serve a streaming response through the stream hub.
+    
+    The upstream is read once; this client becomes its first subscriber and
+    others can attach via /v1/streams/{id}. The admission slot is held until
+    the upstream ends rather than until this client leaves. Event-stream
+    frames get an `id:` so a dropped client can resume with Last-Event-ID.
+    
+    Args:
+        response: Streaming response built by one of the create_*_streaming_response helpers
+        lease: Admission slot for the upstream task
+        http_request: Incoming request (for the owning tenant)
+        
+    Returns:
+        The same response, reading from the hub and carrying an X-Stream-ID header
+    """
+    stream = stream_hub.publish(
+        response.body_iterator,
+        tenant=tenant_from_headers(http_request.headers),
+        media_type=response.media_type,
+        headers={k: v for k, v in response.headers.items() if k.lower() != "content-length"},
+        on_finish=lease.release,
+        event_ids="text/event-stream" in response.headers.get("content-type", "")
+    )
+    response.body_iterator = stream.subscribe()
+    response.headers["X-Stream-ID"] = stream.id
+    return response
+
+def attached_response(stream: HubStream, from_seq: Optional[int] = None) -> StreamingResponse:
+    """A response reading an already-published stream, from its backlog or from `from_seq`."""
+    return StreamingResponse(
+        stream.subscribe(from_seq),
+        media_type=stream.media_type,
+        headers={**stream.headers, "X-Stream-ID": stream.id}
+    )
+
+def resume_stream(http_request: Request) -> Optional[StreamingResponse]:
+    """
+    Continue a dropped stream when the client reconnects with Last-Event-ID.
+    
+    The upstream task keeps running for CODEGEN_STREAM_LINGER_SECONDS after its
+    last reader leaves, so a reconnect within that window (or while the
+    finished stream is retained) picks up at the next event without starting
+    a new Codegen task or taking another admission slot.
+    
+    Args:
+        http_request: Incoming request
+        
+    Returns:
+        A response continuing the stream, or None to serve the request normally
+    """
+    last_event_id = http_request.headers.get("last-event-id")
+    if not last_event_id:
+        return None
+    try:
+        stream, from_seq = stream_hub.resume(last_event_id, tenant_from_headers(http_request.headers))
+    except StreamNotFound as e:
+        logger.warning(f"⚠️ Cannot resume from Last-Event-ID: {e}; starting a new stream")
+        return None
+    logger.info(f"🔁 Resuming {stream.id} at event {from_seq} ({stream.subscribers} already reading)")
+    return attached_response(stream, from_seq)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start and stop background task-completion machinery."""
+    await completion_bus.start(webhook_handler.complete_task)
+    logger.info(f"Completion bus started ({completion_bus.backend})")
+    try:
+        yield
+    finally:
+        await completion_bus.stop()
+        await enhanced_client.poller.stop()
+        logger.info("Completion bus and task poller stopped")
+
 # Create FastAPI app
 app = FastAPI(
     title="Enhanced OpenAI Codegen Adapter",
     description="OpenAI-compatible API server with model selection and prompt templates",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -91,6 +209,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses the client accepts (per-event flush for SSE)
+app.add_middleware(CompressionMiddleware, config=CompressionConfig.from_environment())
+
 # Add static files for Web UI
 try:
     app.mount("/static", StaticFiles(directory="src"), name="static")
@@ -106,6 +227,70 @@ def log_request_start(endpoint: str, request_data: dict, host: str = None, trans
     logger.info(f"   📊 Request Data: {request_data}")
     logger.info(f"   🕐 Timestamp: {datetime.now().isoformat()}")
 
+def get_task_options(http_request: Request, **request_params) -> dict:
+    """Build run_task options: generation params plus the coalescing and cache opt-out headers."""
+    no_coalesce = http_request.headers.get("x-codegen-no-coalesce", "").lower() in ("1", "true", "yes")
+    no_cache = "no-cache" in http_request.headers.get("cache-control", "").lower()
+    return {
+        "request_params": {k: v for k, v in request_params.items() if v is not None},
+        "coalesce": not no_coalesce,
+        "cache": not no_cache
+    }
+
+class ClientDisconnected(Exception):
+    """Raised when a non-streaming client goes away before its response is ready."""
+
+# How often a non-streaming request checks whether its client is still connected
+DISCONNECT_CHECK_INTERVAL = 1.0
+
+async def until_disconnected(http_request: Request, awaitable):
+    """
+    Await a response body, cancelling the work behind it if the client disconnects.
+    
+    Args:
+        http_request: The client request to watch
+        awaitable: Coroutine producing the response content
+        
+    Returns:
+        The awaitable's result
+        
+    Raises:
+        ClientDisconnected: If the client disconnected first
+    """
+    work = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({work}, timeout=DISCONNECT_CHECK_INTERVAL)
+            if done:
+                return work.result()
+            if await http_request.is_disconnected():
+                logger.info(f"🔌 Client disconnected from {http_request.url.path}, cancelling its task")
+                raise ClientDisconnected(http_request.url.path)
+    finally:
+        if not work.done():
+            work.cancel()
+
+@app.exception_handler(ClientDisconnected)
+async def client_disconnected_handler(request: Request, exc: ClientDisconnected):
+    """Nobody is listening; close out the request with nginx's 'client closed request' status."""
+    return Response(status_code=499)
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Return a fast 429/503 with Retry-After when a request can't get an execution slot."""
+    error_response = ErrorResponse(
+        error=ErrorDetail(
+            message=str(exc),
+            type="rate_limit_error" if exc.status_code == 429 else "overloaded_error",
+            code=str(exc.status_code)
+        )
+    )
+    return JSONResponse(
+        status_code=exc.status_code,
+        content=error_response.dict(),
+        headers={"Retry-After": str(int(exc.retry_after))}
+    )
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler to return OpenAI-compatible errors."""
@@ -200,6 +385,12 @@ async def chat_completions(request: ChatRequest, http_request: Request):
         
         log_request_start("/v1/chat/completions", request.dict(), host, is_transparent)
         
+        # A reconnecting client continues its dropped stream instead of starting a new task
+        if request.stream:
+            resumed = resume_stream(http_request)
+            if resumed is not None:
+                return resumed
+        
         # Convert request to prompt with model selection
         prompt, codegen_model = enhanced_chat_request_to_prompt(
             request=request,
@@ -210,20 +401,44 @@ async def chat_completions(request: ChatRequest, http_request: Request):
         logger.info(f"Using Codegen model: {codegen_model}")
         logger.debug(f"🔄 Converted prompt: {prompt[:200]}...")
         
+        task_options = get_task_options(
+            http_request,
+            temperature=request.temperature,
+            max_tokens=request.max_tokens,
+            top_p=request.top_p,
+            frequency_penalty=request.frequency_penalty,
+            presence_penalty=request.presence_penalty,
+            stop=request.stop
+        )
+        
+        # Wait for an execution slot; rejections surface as 429/503 with Retry-After
+        lease = await admission.acquire(tenant_from_headers(http_request.headers))
+        
         if request.stream:
             # Return streaming response
             logger.info("🌊 Initiating streaming response...")
-            return create_enhanced_streaming_response(
-                enhanced_client,
-                prompt,
-                request.model,
-                f"chatcmpl-{hash(prompt) % 1000000}",
-                codegen_model
-            )
+            # Until the hub owns the upstream, a failure here must give the slot back
+            try:
+                return publish_stream(create_enhanced_streaming_response(
+                    enhanced_client,
+                    prompt,
+                    request.model,
+                    f"chatcmpl-{hash(prompt) % 1000000}",
+                    codegen_model,
+                    task_options,
+                    pacing=stream_pacing["openai"]
+                ), lease, http_request)
+            except BaseException:
+                lease.release()
+                raise
         else:
             # Return complete response
             logger.info("📦 Initiating non-streaming response...")
-            content = await collect_enhanced_streaming_response(enhanced_client, prompt, codegen_model)
+            async with lease:
+                content = await until_disconnected(
+                    http_request,
+                    collect_enhanced_streaming_response(enhanced_client, prompt, codegen_model, task_options)
+                )
             
             # Estimate token counts
             prompt_tokens = estimate_tokens(prompt)
@@ -245,6 +460,8 @@ async def chat_completions(request: ChatRequest, http_request: Request):
             logger.info(f"✅ Chat completion successful in {processing_time:.2f}s")
             return response
             
+    except (AdmissionRejected, ClientDisconnected):
+        raise
     except Exception as e:
         processing_time = time.time() - start_time
         logger.error(f"❌ Error in chat completion after {processing_time:.2f}s: {e}")
@@ -275,6 +492,12 @@ async def text_completions(request: TextRequest, http_request: Request):
         
         log_request_start("/v1/completions", request.dict(), host, is_transparent)
         
+        # A reconnecting client continues its dropped stream instead of starting a new task
+        if request.stream:
+            resumed = resume_stream(http_request)
+            if resumed is not None:
+                return resumed
+        
         # Convert request to prompt with model selection
         prompt, codegen_model = enhanced_text_request_to_prompt(
             request=request,
@@ -285,21 +508,44 @@ async def text_completions(request: TextRequest, http_request: Request):
         logger.info(f"Using Codegen model: {codegen_model}")
         logger.debug(f"🔄 Converted prompt: {prompt[:200]}...")
         
+        task_options = get_task_options(
+            http_request,
+            temperature=request.temperature,
+            max_tokens=request.max_tokens,
+            top_p=request.top_p,
+            frequency_penalty=request.frequency_penalty,
+            presence_penalty=request.presence_penalty,
+            stop=request.stop
+        )
+        
+        # Wait for an execution slot; rejections surface as 429/503 with Retry-After
+        lease = await admission.acquire(tenant_from_headers(http_request.headers))
+        
         if request.stream:
             # Return streaming response
             logger.info("🌊 Initiating streaming response...")
-            # Use the chat streaming response for text completions
-            return create_enhanced_streaming_response(
-                enhanced_client,
-                prompt,
-                request.model,
-                f"cmpl-{hash(prompt) % 1000000}",
-                codegen_model
-            )
+            # Until the hub owns the upstream, a failure here must give the slot back
+            try:
+                return publish_stream(create_text_streaming_response(
+                    enhanced_client,
+                    prompt,
+                    request.model,
+                    f"cmpl-{hash(prompt) % 1000000}",
+                    codegen_model,
+                    task_options,
+                    pacing=stream_pacing["openai"]
+                ), lease, http_request)
+            except BaseException:
+                lease.release()
+                raise
         else:
             # Return complete response
             logger.info("📦 Initiating non-streaming response...")
-            content = await collect_enhanced_streaming_response(enhanced_client, prompt, codegen_model)
+            async with lease:
+                content = await until_disconnected(
+                    http_request,
+                    collect_enhanced_streaming_response(enhanced_client, prompt, codegen_model, task_options)
+                )
             
             # Estimate token counts
             prompt_tokens = estimate_tokens(prompt)
@@ -321,6 +567,8 @@ async def text_completions(request: TextRequest, http_request: Request):
             logger.info(f"✅ Text completion successful in {processing_time:.2f}s")
             return response
             
+    except (AdmissionRejected, ClientDisconnected):
+        raise
     except Exception as e:
         processing_time = time.time() - start_time
         logger.error(f"❌ Error in text completion after {processing_time:.2f}s: {e}")
@@ -351,6 +599,12 @@ async def anthropic_messages(request: AnthropicRequest, http_request: Request):
         
         log_request_start("/v1/messages", request.dict(), host, is_transparent)
         
+        # A reconnecting client continues its dropped stream instead of starting a new task
+        if request.stream:
+            resumed = resume_stream(http_request)
+            if resumed is not None:
+                return resumed
+        
         # Store original model for response
         request.original_model = request.model
         
@@ -364,19 +618,42 @@ async def anthropic_messages(request: AnthropicRequest, http_request: Request):
         logger.info(f"Using Codegen model: {codegen_model}")
         logger.debug(f"🔄 Converted prompt: {prompt[:200]}...")
         
+        task_options = get_task_options(
+            http_request,
+            max_tokens=request.max_tokens,
+            temperature=request.temperature,
+            top_p=request.top_p,
+            top_k=request.top_k,
+            stop=request.stop_sequences
+        )
+        
+        # Wait for an execution slot; rejections surface as 429/503 with Retry-After
+        lease = await admission.acquire(tenant_from_headers(http_request.headers))
+        
         if request.stream:
             # Return streaming response
             logger.info("🌊 Initiating Anthropic streaming response...")
-            return create_anthropic_streaming_response(
-                enhanced_client,
-                prompt,
-                request.model,
-                codegen_model
-            )
+            # Until the hub owns the upstream, a failure here must give the slot back
+            try:
+                return publish_stream(create_anthropic_streaming_response(
+                    enhanced_client,
+                    prompt,
+                    request.model,
+                    task_options=task_options,
+                    pacing=stream_pacing["anthropic"],
+                    codegen_model=codegen_model
+                ), lease, http_request)
+            except BaseException:
+                lease.release()
+                raise
         else:
             # Return complete response
             logger.info("📦 Initiating Anthropic non-streaming response...")
-            content = await collect_enhanced_streaming_response(enhanced_client, prompt, codegen_model)
+            async with lease:
+                content = await until_disconnected(
+                    http_request,
+                    collect_enhanced_streaming_response(enhanced_client, prompt, codegen_model, task_options)
+                )
             
             # Estimate token counts
             prompt_tokens = estimate_tokens(prompt)
@@ -398,6 +675,8 @@ async def anthropic_messages(request: AnthropicRequest, http_request: Request):
             logger.info(f"✅ Anthropic message successful in {processing_time:.2f}s")
             return response
             
+    except (AdmissionRejected, ClientDisconnected):
+        raise
     except Exception as e:
         processing_time = time.time() - start_time
         logger.error(f"❌ Error in Anthropic message after {processing_time:.2f}s: {e}")
@@ -441,14 +720,32 @@ async def gemini_generate_content(request: GeminiRequest, http_request: Request)
         # Check if streaming is requested
         is_streaming = request.stream
         
+        generation_config = request.generationConfig.dict() if request.generationConfig else {}
+        task_options = get_task_options(http_request, **generation_config)
+        
+        # Wait for an execution slot; rejections surface as 429/503 with Retry-After
+        lease = await admission.acquire(tenant_from_headers(http_request.headers))
+        
         if is_streaming:
             # Return streaming response
             logger.info("🌊 Initiating Gemini streaming response...")
-            return create_gemini_streaming_response(enhanced_client, prompt, codegen_model)
+            # Until the hub owns the upstream, a failure here must give the slot back
+            try:
+                return publish_stream(create_gemini_streaming_response(
+                    enhanced_client, prompt, codegen_model, task_options,
+                    pacing=stream_pacing["gemini"], codegen_model=codegen_model
+                ), lease, http_request)
+            except BaseException:
+                lease.release()
+                raise
         else:
             # Return complete response
             logger.info("📦 Initiating Gemini non-streaming response...")
-            content = await collect_enhanced_streaming_response(enhanced_client, prompt, codegen_model)
+            async with lease:
+                content = await until_disconnected(
+                    http_request,
+                    collect_enhanced_streaming_response(enhanced_client, prompt, codegen_model, task_options)
+                )
             
             # Estimate token counts
             prompt_tokens = estimate_tokens(prompt)
@@ -469,6 +766,8 @@ async def gemini_generate_content(request: GeminiRequest, http_request: Request)
             logger.info(f"✅ Gemini content generation successful in {processing_time:.2f}s")
             return response
             
+    except (AdmissionRejected, ClientDisconnected):
+        raise
     except Exception as e:
         processing_time = time.time() - start_time
         logger.error(f"❌ Error in Gemini content generation after {processing_time:.2f}s: {e}")
@@ -510,6 +809,79 @@ async def health_check():
             "error": str(e)
         }
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """Get task-execution metrics (executor saturation and shared poller state)."""
+    try:
+        stats = enhanced_client.get_stats()
+        stats["admission"] = admission.get_stats()
+        stats["stream_hub"] = stream_hub.get_stats()
+        stats["compression"] = get_compression_stats().get_stats()
+        return stats
+    except Exception as e:
+        logger.error(f"Error getting metrics: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get metrics")
+
+@app.get("/v1/streams/{stream_id}")
+async def attach_stream(stream_id: str, http_request: Request):
+    """
+    Attach another reader to a streamed completion (ID from its X-Stream-ID header).
+    Replays the stream's backlog, then follows it live; no new Codegen task is started.
+    With a Last-Event-ID header (e.g. an EventSource reconnect) it resumes after that event.
+    """
+    tenant = tenant_from_headers(http_request.headers)
+    last_event_id = http_request.headers.get("last-event-id")
+    try:
+        if last_event_id and last_event_id.startswith(f"{stream_id}:"):
+            stream, from_seq = stream_hub.resume(last_event_id, tenant)
+        else:
+            stream, from_seq = stream_hub.get(stream_id, tenant), None
+    except StreamNotFound as e:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": {
+                    "message": str(e),
+                    "type": "not_found_error",
+                    "code": "404"
+                }
+            }
+        )
+    logger.info(f"🔗 Attaching subscriber to {stream_id} ({stream.subscribers} already reading)")
+    return attached_response(stream, from_seq)
+
+@app.get("/api/metrics/tasks")
+async def get_polled_tasks():
+    """List in-flight Codegen tasks tracked by the shared poller."""
+    return {
+        "tasks": enhanced_client.poller.list_tasks()
+    }
+
+@app.get("/api/metrics/streams")
+async def get_stream_metrics():
+    """Per-request time-to-first-token and volume for recent streamed tasks."""
+    return {
+        "streams": enhanced_client.task_manager.stream_engine.list_streams()
+    }
+
+@app.get("/api/admin/poll-scheduler")
+async def get_poll_scheduler_state():
+    """Expose the learned task completion-time distributions behind adaptive polling."""
+    if not enhanced_client.scheduler:
+        return {"enabled": False}
+    return {
+        "enabled": True,
+        **enhanced_client.scheduler.get_distributions()
+    }
+
+@app.delete("/api/admin/response-cache")
+async def clear_response_cache():
+    """Remove every entry from the response cache."""
+    if not enhanced_client.response_cache:
+        return {"enabled": False}
+    await enhanced_client.response_cache.clear()
+    return {"enabled": True, "cleared": True}
+
 # Service state management
 class ServiceState:
     def __init__(self):
@@ -814,7 +1186,7 @@ async def clear_system_message():
 async def service_status_middleware(request: Request, call_next):
     """Middleware to check if service is enabled for API endpoints."""
     # Allow access to Web UI, status, toggle, system message, webhook, and health endpoints
-    allowed_paths = ["/", "/api/status", "/api/toggle", "/api/system-message", "/health", "/static", "/webhook/codegen"]
+    allowed_paths = ["/", "/api/status", "/api/toggle", "/api/system-message", "/api/metrics", "/api/admin", "/health", "/static", "/webhook/codegen"]
     
     if any(request.url.path.startswith(path) for path in allowed_paths):
         response = await call_next(request)
@@ -0,0 +1,246 @@
+"""
+Adaptive poll scheduling for Codegen tasks.
+Learns task completion times per model and prompt-size bucket and places
+polls where tasks are most likely to finish instead of on a fixed backoff.
+"""
+
+import bisect
+import logging
+import math
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Prompt-size buckets (characters); the last bucket is open-ended
+PROMPT_SIZE_BUCKETS = [1_000, 4_000, 16_000, 64_000]
+
+
+class CompletionHistogram:
+    """Streaming histogram of completion times with log-spaced buckets."""
+
+    def __init__(
+        self,
+        min_seconds: float = 0.5,
+        max_seconds: float = 1800.0,
+        growth: float = 1.25,
+        max_samples: int = 2000
+    ):
+        self.bounds: List[float] = []
+        bound = min_seconds
+        while bound < max_seconds:
+            self.bounds.append(bound)
+            bound *= growth
+        self.bounds.append(max_seconds)
+        # counts[i] covers (bounds[i-1], bounds[i]]; the extra slot catches overflow
+        self.counts = [0.0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.samples = 0
+        self.max_samples = max_samples
+        self.min_seen: Optional[float] = None
+        self.max_seen: Optional[float] = None
+
+    def record(self, seconds: float):
+        """Record one completion time, decaying old samples so the shape can drift."""
+        if self.total >= self.max_samples:
+            self.counts = [c / 2 for c in self.counts]
+            self.total /= 2
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.total += 1
+        self.samples += 1
+        self.min_seen = seconds if self.min_seen is None else min(self.min_seen, seconds)
+        self.max_seen = seconds if self.max_seen is None else max(self.max_seen, seconds)
+
+    def _bucket_range(self, index: int):
+        lower = self.bounds[index - 1] if index > 0 else 0.0
+        upper = self.bounds[index] if index < len(self.bounds) else (self.max_seen or self.bounds[-1])
+        return lower, max(upper, lower)
+
+    def cdf(self, seconds: float) -> float:
+        """Fraction of tasks that completed within `seconds`."""
+        if not self.total:
+            return 0.0
+        mass = 0.0
+        for index, count in enumerate(self.counts):
+            lower, upper = self._bucket_range(index)
+            if seconds >= upper:
+                mass += count
+            else:
+                if seconds > lower and upper > lower:
+                    mass += count * (seconds - lower) / (upper - lower)
+                break
+        return min(1.0, mass / self.total)
+
+    def quantile(self, q: float) -> float:
+        """Completion time below which a fraction `q` of tasks finished."""
+        if not self.total:
+            return 0.0
+        target = max(0.0, min(1.0, q)) * self.total
+        mass = 0.0
+        for index, count in enumerate(self.counts):
+            if count and mass + count >= target:
+                lower, upper = self._bucket_range(index)
+                return lower + (upper - lower) * (target - mass) / count
+            mass += count
+        return self.max_seen or self.bounds[-1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summarize the learned distribution."""
+        return {
+            "samples": self.samples,
+            "weight": round(self.total, 2),
+            "min_seconds": round(self.min_seen, 2) if self.min_seen is not None else None,
+            "max_seconds": round(self.max_seen, 2) if self.max_seen is not None else None,
+            "p50_seconds": round(self.quantile(0.5), 2),
+            "p90_seconds": round(self.quantile(0.9), 2),
+            "p99_seconds": round(self.quantile(0.99), 2),
+            "buckets": [
+                {"le": round(self._bucket_range(i)[1], 2), "count": round(c, 2)}
+                for i, c in enumerate(self.counts) if c
+            ]
+        }
+
+
+class AdaptivePollScheduler:
+    """Chooses the next poll time from learned completion-time distributions."""
+
+    def __init__(
+        self,
+        poll_budget: int = 12,
+        min_delay: float = 0.5,
+        max_delay: float = 30.0,
+        min_samples: int = 20,
+        tail_quantile: float = 0.99
+    ):
+        self.poll_budget = max(1, poll_budget)
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.tail_quantile = tail_quantile
+        self._histograms: Dict[str, CompletionHistogram] = {}
+        self._lock = threading.Lock()
+        self._adaptive_decisions = 0
+        self._fallback_decisions = 0
+        logger.info(f"Initialized AdaptivePollScheduler with poll_budget={self.poll_budget}, min_samples={min_samples}")
+
+    @staticmethod
+    def bucket_key(model: Optional[str], prompt_size: int) -> str:
+        """Histogram key for a model and prompt-size bucket."""
+        index = bisect.bisect_right(PROMPT_SIZE_BUCKETS, prompt_size)
+        if index < len(PROMPT_SIZE_BUCKETS):
+            size_label = f"<{PROMPT_SIZE_BUCKETS[index] // 1000}k"
+        else:
+            size_label = f">={PROMPT_SIZE_BUCKETS[-1] // 1000}k"
+        return f"{model or 'default'}|{size_label}"
+
+    def record_completion(self, model: Optional[str], prompt_size: int, seconds: float):
+        """Record how long a task took to complete."""
+        key = self.bucket_key(model, prompt_size)
+        with self._lock:
+            for k in (key, "*"):
+                histogram = self._histograms.get(k)
+                if histogram is None:
+                    histogram = self._histograms[k] = CompletionHistogram()
+                histogram.record(seconds)
+
+    def _histogram_for(self, model: Optional[str], prompt_size: int) -> Optional[CompletionHistogram]:
+        """Most specific histogram with enough samples, falling back to all tasks."""
+        for key in (self.bucket_key(model, prompt_size), "*"):
+            histogram = self._histograms.get(key)
+            if histogram and histogram.samples >= self.min_samples:
+                return histogram
+        return None
+
+    def next_poll_delay(
+        self,
+        model: Optional[str],
+        prompt_size: int,
+        elapsed: float,
+        polls_used: int
+    ) -> Optional[float]:
+        """
+        Pick the delay until the next poll of a task.
+
+        Remaining polls are spread at equal probability mass over the part of
+        the learned distribution the task has not yet passed, so polls are
+        dense around the typical completion times (p50-p90) and sparse in the
+        tails, which keeps expected detection delay low for a fixed budget.
+
+        Args:
+            model: Codegen model the task runs on
+            prompt_size: Prompt length in characters
+            elapsed: Seconds since the task was created
+            polls_used: Polls already spent on this task
+
+        Returns:
+            Optional[float]: Delay in seconds, or None when there is not enough
+            history (or the task is past the learned tail) and the caller
+            should use its default backoff
+        """
+        with self._lock:
+            histogram = self._histogram_for(model, prompt_size)
+            if histogram is None:
+                self._fallback_decisions += 1
+                return None
+
+            reached = histogram.cdf(elapsed)
+            if reached >= self.tail_quantile:
+                self._fallback_decisions += 1
+                return None
+
+            remaining_polls = max(1, self.poll_budget - polls_used)
+            target = min(self.tail_quantile, reached + (1.0 - reached) / remaining_polls)
+            delay = histogram.quantile(target) - elapsed
+            self._adaptive_decisions += 1
+
+        if not math.isfinite(delay):
+            return None
+        return max(self.min_delay, min(self.max_delay, delay))
+
+    def expected_remaining(self, model: Optional[str], prompt_size: int, elapsed: float) -> Optional[float]:
+        """
+        Estimate how much longer a task that has run for `elapsed` seconds will take.
+
+        Args:
+            model: Codegen model the task runs on
+            prompt_size: Prompt length in characters
+            elapsed: Seconds since the task was created
+
+        Returns:
+            Optional[float]: Median remaining seconds given the task hasn't finished
+            yet, or None without enough history
+        """
+        with self._lock:
+            histogram = self._histogram_for(model, prompt_size)
+            if histogram is None:
+                return None
+            reached = histogram.cdf(elapsed)
+            remaining = histogram.quantile(reached + (1.0 - reached) / 2) - elapsed
+        if not math.isfinite(remaining):
+            return None
+        return max(0.0, remaining)
+
+    def get_distributions(self) -> Dict[str, Any]:
+        """Expose the learned distributions for the admin endpoint."""
+        with self._lock:
+            return {
+                "poll_budget": self.poll_budget,
+                "min_samples": self.min_samples,
+                "adaptive_decisions": self._adaptive_decisions,
+                "fallback_decisions": self._fallback_decisions,
+                "distributions": {key: h.to_dict() for key, h in sorted(self._histograms.items())}
+            }
+
+
+# Singleton instance
+_poll_scheduler: Optional[AdaptivePollScheduler] = None
+
+def get_poll_scheduler() -> AdaptivePollScheduler:
+    """Get the shared adaptive poll scheduler instance."""
+    global _poll_scheduler
+    if _poll_scheduler is None:
+        _poll_scheduler = AdaptivePollScheduler(
+            poll_budget=int(os.environ.get("CODEGEN_POLL_BUDGET", "12"))
+        )
+    return _poll_scheduler
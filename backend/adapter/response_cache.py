@@ -0,0 +1,251 @@
+"""
+Response cache for deterministic (temperature 0) Codegen completions.
+An in-memory LRU sits in front of a content-addressed SQLite store, both
+bounded by TTL and byte size.
+"""
+
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def is_deterministic(request_params: Optional[Dict[str, Any]]) -> bool:
+    """Only temperature-0 requests are safe to answer from the cache."""
+    if not request_params:
+        return False
+    temperature = request_params.get("temperature")
+    return temperature is not None and float(temperature) == 0.0
+
+
+class ResponseCache:
+    """Two-tier cache of completed response text keyed by request hash."""
+
+    def __init__(
+        self,
+        path: str = "response_cache.db",
+        ttl: float = 3600,
+        max_memory_bytes: int = 32 * 1024 * 1024,
+        max_disk_bytes: int = 512 * 1024 * 1024
+    ):
+        """
+        Args:
+            path: SQLite file for the on-disk tier
+            ttl: Seconds an entry stays valid
+            max_memory_bytes: Byte cap for the in-memory LRU
+            max_disk_bytes: Byte cap for stored response bodies on disk
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        # key -> (content, expires_at, size); most recently used last
+        self._memory: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._init_db()
+
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._memory_evictions = 0
+        self._disk_evictions = 0
+        self._expired = 0
+
+        logger.info(
+            f"Initialized ResponseCache at {path} with ttl={ttl}s, "
+            f"max_memory_bytes={max_memory_bytes}, max_disk_bytes={max_disk_bytes}"
+        )
+
+    def _init_db(self):
+        with self._db_lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # Bodies are stored once per distinct content; entries point at them by hash
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                "hash TEXT PRIMARY KEY, content TEXT NOT NULL, size INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, hash TEXT NOT NULL, created_at REAL NOT NULL, "
+                "expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries(expires_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_hash ON entries(hash)")
+            row = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()
+            self._disk_bytes = row[0]
+
+    async def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            key: Request key from make_request_key
+
+        Returns:
+            Optional[str]: The cached response text, or None on a miss
+        """
+        now = time.time()
+        cached = self._memory.get(key)
+        if cached:
+            content, expires_at, size = cached
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self._memory_hits += 1
+                return content
+            self._drop_memory(key)
+            self._expired += 1
+
+        row = await asyncio.to_thread(self._disk_get, key, now)
+        if row is None:
+            self._misses += 1
+            return None
+
+        content, expires_at = row
+        self._disk_hits += 1
+        self._remember(key, content, expires_at)
+        return content
+
+    async def put(self, key: str, content: str):
+        """
+        Store a completed response.
+
+        Args:
+            key: Request key from make_request_key
+            content: Full response text
+        """
+        expires_at = time.time() + self.ttl
+        self._remember(key, content, expires_at)
+        self._stores += 1
+        await asyncio.to_thread(self._disk_put, key, content, expires_at)
+
+    async def clear(self):
+        """Remove every cached response."""
+        self._memory.clear()
+        self._memory_bytes = 0
+        await asyncio.to_thread(self._disk_clear)
+
+    def _remember(self, key: str, content: str, expires_at: float):
+        """Insert into the memory tier, evicting least recently used entries."""
+        size = len(content.encode("utf-8"))
+        if size > self.max_memory_bytes:
+            return
+        self._drop_memory(key)
+        self._memory[key] = (content, expires_at, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            evicted, (_, _, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+            self._memory_evictions += 1
+
+    def _drop_memory(self, key: str):
+        cached = self._memory.pop(key, None)
+        if cached:
+            self._memory_bytes -= cached[2]
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT b.content, e.expires_at FROM entries e JOIN blobs b ON b.hash = e.hash WHERE e.key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._delete_orphan_blobs()
+                self._expired += 1
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            return row[0], row[1]
+
+    def _disk_put(self, key: str, content: str, expires_at: float):
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        size = len(content.encode("utf-8"))
+        now = time.time()
+        with self._db_lock:
+            # Counters change as the transaction runs; put them back if it rolls back
+            counters = (self._disk_bytes, self._expired, self._disk_evictions)
+            self._conn.execute("BEGIN")
+            try:
+                inserted = self._conn.execute(
+                    "INSERT OR IGNORE INTO blobs (hash, content, size) VALUES (?, ?, ?)",
+                    (content_hash, content, size)
+                ).rowcount
+                if inserted:
+                    self._disk_bytes += size
+                previous = self._conn.execute("SELECT hash FROM entries WHERE key = ?", (key,)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, hash, created_at, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, content_hash, now, expires_at, now)
+                )
+                expired = self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,)).rowcount
+                self._expired += expired
+                if expired or (previous and previous[0] != content_hash):
+                    self._delete_orphan_blobs()
+                self._enforce_disk_cap()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                self._disk_bytes, self._expired, self._disk_evictions = counters
+                raise
+
+    def _enforce_disk_cap(self):
+        """Evict least recently used entries until stored bodies fit the byte cap."""
+        while self._disk_bytes > self.max_disk_bytes:
+            victims = self._conn.execute(
+                "SELECT key FROM entries ORDER BY last_access LIMIT 32"
+            ).fetchall()
+            if not victims:
+                break
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+            self._disk_evictions += len(victims)
+            self._delete_orphan_blobs()
+
+    def _delete_orphan_blobs(self):
+        freed = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM blobs WHERE hash NOT IN (SELECT hash FROM entries)"
+        ).fetchone()[0]
+        if freed:
+            self._conn.execute("DELETE FROM blobs WHERE hash NOT IN (SELECT hash FROM entries)")
+            self._disk_bytes -= freed
+
+    def _disk_clear(self):
+        with self._db_lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM blobs")
+            self._disk_bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and tier occupancy."""
+        hits = self._memory_hits + self._disk_hits
+        lookups = hits + self._misses
+        return {
+            "hits": hits,
+            "memory_hits": self._memory_hits,
+            "disk_hits": self._disk_hits,
+            "misses": self._misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "stores": self._stores,
+            "expired": self._expired,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "max_memory_bytes": self.max_memory_bytes,
+            "memory_evictions": self._memory_evictions,
+            "disk_bytes": self._disk_bytes,
+            "max_disk_bytes": self.max_disk_bytes,
+            "disk_evictions": self._disk_evictions,
+            "ttl_seconds": self.ttl
+        }
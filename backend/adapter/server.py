@@ -34,6 +34,7 @@ from backend.adapter.response_transformer import (
     estimate_tokens, clean_content
 )
 from backend.adapter.streaming import create_streaming_response, collect_streaming_response
+from backend.adapter.enhanced_streaming import create_text_streaming_response
 from backend.adapter.anthropic_transformer import (
     anthropic_request_to_prompt, create_anthropic_response,
     extract_anthropic_generation_params
@@ -296,9 +297,13 @@ async def completions(request: TextRequest):
         logger.debug(f"Generation parameters: {gen_params}")
         
         if request.stream:
-            # For text completions streaming, we'd need a different streaming format
-            # For now, fall back to non-streaming
-            logger.warning("Streaming not yet implemented for text completions, falling back to non-streaming")
+            logger.info("🌊 Initiating streaming response...")
+            return create_text_streaming_response(
+                codegen_client,
+                prompt,
+                request.model,
+                f"cmpl-{hash(prompt) % 1000000}"
+            )
         
         # Get complete response
         content = await collect_streaming_response(codegen_client, prompt)
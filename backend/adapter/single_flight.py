@@ -0,0 +1,184 @@
+"""
+Request coalescing (single-flight) for identical concurrent Codegen prompts.
+Identical requests share one upstream task; every subscriber receives the
+same result, or the same chunk sequence when streaming.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def make_request_key(
+    prompt: str,
+    model: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+    stream: bool = False
+) -> str:
+    """
+    Build a stable key for a Codegen request.
+
+    Args:
+        prompt: The final prompt sent to the agent
+        model: The mapped Codegen model
+        params: Generation parameters from the client request
+        stream: Whether the response is streamed
+
+    Returns:
+        str: Hex digest identifying equivalent requests
+    """
+    normalized = _WHITESPACE.sub(" ", prompt).strip()
+    payload = json.dumps(
+        {"prompt": normalized, "model": model, "params": params or {}, "stream": stream},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Flight:
+    """One upstream execution shared by every identical request."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.chunks: List[str] = []
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.subscribers = 0
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self.producer: Optional[asyncio.Task] = None
+        self._updated = asyncio.Event()
+
+    def notify(self):
+        """Wake subscribers waiting for the next chunk."""
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def subscribe(self) -> AsyncGenerator[str, None]:
+        """Replay chunks produced so far, then follow the producer until it finishes."""
+        index = 0
+        while True:
+            while index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+            if self.done:
+                if self.error:
+                    raise self.error
+                return
+            await self._updated.wait()
+
+
+class SingleFlight:
+    """Registry of in-flight (and briefly retained) shared Codegen executions."""
+
+    def __init__(self, window: float = 0.0):
+        """
+        Args:
+            window: Seconds a finished flight stays joinable, so identical requests
+                arriving just after completion (e.g. retries) reuse its result
+        """
+        self.window = window
+        self._flights: Dict[str, Flight] = {}
+        self._started = 0
+        self._coalesced = 0
+        self._failed = 0
+        self._abandoned = 0
+        logger.info(f"Initialized SingleFlight with window={window}s")
+
+    async def run(
+        self,
+        key: str,
+        factory: Callable[[], AsyncGenerator[str, None]]
+    ) -> AsyncGenerator[str, None]:
+        """
+        Run `factory()` once per key and stream its chunks to every caller.
+
+        Args:
+            key: Request key from make_request_key
+            factory: Creates the upstream chunk generator when no flight exists
+
+        Yields:
+            The shared chunk sequence
+        """
+        flight = self._flights.get(key)
+        if flight and flight.done and (flight.error or self._expired(flight)):
+            self._flights.pop(key, None)
+            flight = None
+
+        if flight is None:
+            flight = Flight(key)
+            self._flights[key] = flight
+            self._started += 1
+            # The producer is its own task so a leaving subscriber can't cancel it for the rest
+            flight.producer = asyncio.get_running_loop().create_task(self._produce(flight, factory))
+        else:
+            self._coalesced += 1
+            logger.info(f"Coalesced request onto in-flight task {key[:12]} ({flight.subscribers + 1} subscribers)")
+
+        flight.subscribers += 1
+        try:
+            async with aclosing(flight.subscribe()) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done and flight.producer:
+                # Every requester left; stop the shared upstream task instead of finishing it
+                self._abandoned += 1
+                self._discard(flight)
+                flight.producer.cancel()
+
+    async def _produce(self, flight: Flight, factory: Callable[[], AsyncGenerator[str, None]]):
+        """Drive the upstream generator, recording chunks for all subscribers."""
+        try:
+            async for chunk in factory():
+                flight.chunks.append(chunk)
+                flight.notify()
+        except BaseException as e:
+            flight.error = e
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._failed += 1
+        finally:
+            flight.done = True
+            flight.finished_at = time.monotonic()
+            flight.notify()
+            self._retire(flight)
+
+    def _expired(self, flight: Flight) -> bool:
+        return flight.finished_at is not None and time.monotonic() - flight.finished_at >= self.window
+
+    def _retire(self, flight: Flight):
+        """Drop a finished flight now, or once its join window closes."""
+        if flight.error or self.window <= 0:
+            self._discard(flight)
+        else:
+            asyncio.get_running_loop().call_later(self.window, self._discard, flight)
+
+    def _discard(self, flight: Flight):
+        if self._flights.get(flight.key) is flight:
+            del self._flights[flight.key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get coalescing counters."""
+        in_flight = [f for f in self._flights.values() if not f.done]
+        return {
+            "window_seconds": self.window,
+            "in_flight": len(in_flight),
+            "retained": len(self._flights) - len(in_flight),
+            "subscribers": sum(f.subscribers for f in in_flight),
+            "upstream_started": self._started,
+            "coalesced": self._coalesced,
+            "failed": self._failed,
+            "abandoned": self._abandoned
+        }
@@ -0,0 +1,213 @@
+"""
+Incremental streaming engine for Codegen tasks.
+Emits output deltas as soon as any source reports new text: pushed progress
+(webhook), then the shared poller's refreshes as a fallback. Records
+time-to-first-token per request.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, AsyncGenerator, Awaitable, Callable, Deque, Dict, List, Optional
+
+from backend.adapter.task_poller import PolledTask, TaskPoller
+
+logger = logging.getLogger(__name__)
+
+# Task attributes that may hold partial or final output, in order of preference
+OUTPUT_ATTRIBUTES = ("partial_result", "result", "output", "response", "content")
+# Attributes holding a finished task's final output
+RESULT_ATTRIBUTES = ("result", "output", "response", "content")
+# Once the task is done, its final result takes precedence over a stale partial one
+FINAL_OUTPUT_ATTRIBUTES = RESULT_ATTRIBUTES + ("partial_result",)
+
+
+class StreamRecord:
+    """Timing and volume of one streamed task."""
+
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+        self.started_at = time.monotonic()
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.chunks = 0
+        self.chars = 0
+        self.sources: Dict[str, int] = {}
+        self.rewrites = 0
+        self.outcome = "streaming"
+
+    def record(self, delta: str, source: str):
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+        self.chunks += 1
+        self.chars += len(delta)
+        self.sources[source] = self.sources.get(source, 0) + 1
+
+    @property
+    def ttft_ms(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return round((self.first_token_at - self.started_at) * 1000, 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        end = self.finished_at or time.monotonic()
+        return {
+            "task_id": self.task_id,
+            "outcome": self.outcome,
+            "ttft_ms": self.ttft_ms,
+            "duration_ms": round((end - self.started_at) * 1000, 1),
+            "chunks": self.chunks,
+            "chars": self.chars,
+            "sources": dict(self.sources),
+            "rewrites": self.rewrites
+        }
+
+
+class TaskStreamEngine:
+    """Turns task output snapshots from every available source into a delta stream."""
+
+    def __init__(self, poller: TaskPoller, history: int = 200):
+        self.poller = poller
+        self._recent: Deque[StreamRecord] = deque(maxlen=history)
+        self._active: Dict[str, StreamRecord] = {}
+        self._streams = 0
+
+    async def stream(
+        self,
+        task,
+        timeout: float,
+        max_polls: int = 60,
+        on_result: Optional[Callable[[str], Awaitable[None]]] = None,
+        **poll_key
+    ) -> AsyncGenerator[str, None]:
+        """
+        Stream a task's output as deltas.
+
+        Args:
+            task: The Codegen task object
+            timeout: Maximum time to stream in seconds
+            max_polls: Maximum number of refreshes before giving up
+            on_result: Awaited with the final result once the task completes,
+                if the emitted deltas add up to exactly that result
+            **poll_key: model / prompt_size / created_at for the poll scheduler
+
+        Yields:
+            "" immediately to open the stream, then each new piece of output
+        """
+        task_id = str(task.id)
+        record = StreamRecord(task_id)
+        self._streams += 1
+        self._active[f"{task_id}:{id(record)}"] = record
+        deadline = time.monotonic() + timeout
+        emitted = ""
+
+        entry = self.poller.register(task, stream=True, max_polls=max_polls, **poll_key)
+        try:
+            # Yield empty chunk to start the stream
+            yield ""
+
+            while True:
+                if time.monotonic() > deadline:
+                    logger.error(f"Task {task_id} streaming exceeded timeout of {timeout}s")
+                    record.outcome = "timeout"
+                    raise TimeoutError(f"Task streaming exceeded timeout of {timeout}s")
+
+                if entry.done and entry.error:
+                    logger.error(f"Task {task_id} failed during streaming: {entry.error}")
+                    record.outcome = "failed"
+                    raise entry.error
+
+                snapshot, source = self._snapshot(entry, task)
+                if snapshot and snapshot != emitted:
+                    delta = self._delta(emitted, snapshot, record)
+                    if delta:
+                        record.record(delta, source)
+                        if record.chunks == 1:
+                            logger.info(f"Task {task_id} first token after {record.ttft_ms}ms via {source}")
+                        yield delta
+                    emitted = snapshot
+
+                if entry.done:
+                    final = entry.result or _task_output(task, RESULT_ATTRIBUTES)
+                    # Without a final result the stream ended on partial output
+                    record.outcome = "complete" if final else "incomplete"
+                    if final and final == emitted and on_result:
+                        await on_result(final)
+                    break
+
+                await self.poller.wait_for_update(task_id, timeout=max(0.0, deadline - time.monotonic()))
+        except (GeneratorExit, asyncio.CancelledError):
+            record.outcome = "disconnected"
+            raise
+        finally:
+            self.poller.unregister(task_id)
+            record.finished_at = time.monotonic()
+            self._active.pop(f"{task_id}:{id(record)}", None)
+            self._recent.append(record)
+            logger.info(
+                f"Task {task_id} stream {record.outcome}: ttft={record.ttft_ms}ms, "
+                f"{record.chunks} chunks, {record.chars} chars"
+            )
+
+    @staticmethod
+    def _snapshot(entry: PolledTask, task):
+        """Latest known output and where it came from."""
+        if entry.done:
+            if entry.result:
+                return entry.result, "webhook"
+            final = _task_output(task, FINAL_OUTPUT_ATTRIBUTES)
+            if final:
+                return final, "poll"
+        if entry.partial:
+            polled = _task_output(task)
+            # Prefer whichever source is further ahead
+            if polled and len(polled) > len(entry.partial) and polled.startswith(entry.partial):
+                return polled, "poll"
+            return entry.partial, "push"
+        return _task_output(task), "poll"
+
+    @staticmethod
+    def _delta(emitted: str, snapshot: str, record: StreamRecord) -> str:
+        """New text in `snapshot` relative to what was already sent."""
+        if snapshot.startswith(emitted):
+            return snapshot[len(emitted):]
+        # Output was rewritten upstream; already-sent text can't be retracted
+        record.rewrites += 1
+        logger.warning(f"Task {record.task_id} output changed non-incrementally; emitting tail only")
+        return snapshot[len(emitted):] if len(snapshot) > len(emitted) else ""
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Aggregate TTFT and throughput over recent streams."""
+        ttfts = sorted(r.ttft_ms for r in self._recent if r.ttft_ms is not None)
+
+        def percentile(q: float) -> Optional[float]:
+            if not ttfts:
+                return None
+            return ttfts[min(len(ttfts) - 1, int(q * len(ttfts)))]
+
+        outcomes: Dict[str, int] = {}
+        for r in self._recent:
+            outcomes[r.outcome] = outcomes.get(r.outcome, 0) + 1
+        return {
+            "streams_total": self._streams,
+            "active_streams": len(self._active),
+            "recent_streams": len(self._recent),
+            "ttft_p50_ms": percentile(0.5),
+            "ttft_p95_ms": percentile(0.95),
+            "ttft_max_ms": ttfts[-1] if ttfts else None,
+            "outcomes": outcomes
+        }
+
+    def list_streams(self) -> List[Dict[str, Any]]:
+        """Per-request TTFT and volume, active streams first."""
+        return [r.to_dict() for r in self._active.values()] + [r.to_dict() for r in reversed(self._recent)]
+
+
+def _task_output(task, attributes=OUTPUT_ATTRIBUTES) -> Optional[str]:
+    """Read the first non-empty string output attribute from a task."""
+    for attr in attributes:
+        value = getattr(task, attr, None)
+        if value and isinstance(value, str):
+            return value
+    return None
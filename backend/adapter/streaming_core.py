@@ -0,0 +1,288 @@
+"""
+Streaming core shared by the OpenAI, Anthropic and Gemini front-ends.
+A task's output is pulled and cleaned once as raw deltas; thin dialect
+encoders turn those deltas into each API's wire events.
+"""
+
+import logging
+import time
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Dict, List, Optional, Sequence
+from fastapi.responses import StreamingResponse
+
+from backend.adapter.response_transformer import estimate_tokens
+from backend.streaming import (
+    AnthropicEventEncoder, GeminiChunkEncoder, OpenAIChunkEncoder, PacingConfig,
+    TextCompletionChunkEncoder, pace_stream
+)
+
+logger = logging.getLogger(__name__)
+
+# Markers the agent may leave in its output
+_MARKERS = ("<FINISHED_ALL_TASKS>", "ENDOFTURN")
+
+
+def clean_delta(text: str) -> str:
+    """Remove agent markers from a delta; unlike clean_content, whitespace between deltas is kept."""
+    for marker in _MARKERS:
+        if marker in text:
+            text = text.replace(marker, "")
+    return text
+
+
+def _task_options(codegen_model: Optional[str], task_options: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    options = dict(task_options or {})
+    if codegen_model:
+        # The basic client has no model selection, so only pass it when set
+        options["model"] = codegen_model
+    return options
+
+
+async def stream_deltas(
+    client: Any,
+    prompt: str,
+    codegen_model: Optional[str] = None,
+    task_options: Optional[Dict[str, Any]] = None
+) -> AsyncGenerator[str, None]:
+    """
+    Run a task in streaming mode and yield each piece of new output once.
+
+    Args:
+        client: Codegen client instance (enhanced or basic)
+        prompt: The prompt to send to the agent
+        codegen_model: Codegen model to use
+        task_options: Extra run_task options (request params, coalescing opt-out)
+
+    Yields:
+        Non-empty text deltas, with markers removed and leading whitespace
+        trimmed from the start of the output
+    """
+    started = False
+    async with aclosing(client.run_task(prompt, stream=True, **_task_options(codegen_model, task_options))) as chunks:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            text = clean_delta(chunk)
+            if not started:
+                text = text.lstrip()
+            if text:
+                started = True
+                yield text
+
+
+async def collect_response(
+    client: Any,
+    prompt: str,
+    codegen_model: Optional[str] = None,
+    task_options: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Run a task in non-streaming mode and return its complete raw output.
+
+    Args:
+        client: Codegen client instance (enhanced or basic)
+        prompt: The prompt to send to the agent
+        codegen_model: Codegen model to use
+        task_options: Extra run_task options (request params, coalescing opt-out)
+
+    Returns:
+        str: Output chunks joined in order (uncleaned)
+    """
+    parts: List[str] = []
+    start_time = time.time()
+    logger.info("🔄 Starting response collection from Codegen...")
+    logger.info(f"   📝 Prompt length: {len(prompt)} characters")
+    if codegen_model:
+        logger.info(f"   🤖 Using Codegen model: {codegen_model}")
+
+    async with aclosing(client.run_task(prompt, stream=False, **_task_options(codegen_model, task_options))) as chunks:
+        async for chunk in chunks:
+            if chunk:
+                if not parts:
+                    logger.info(f"📦 First response chunk received ({len(chunk)} chars)")
+                parts.append(chunk)
+
+    content = "".join(parts)
+    logger.info(f"✅ Response collection completed in {time.time() - start_time:.2f}s: {len(parts)} chunks, {len(content)} chars")
+    return content
+
+
+class StreamDialect:
+    """Turns raw deltas into one API's events; subclasses fill in the framing"""
+
+    name = "stream"
+
+    def start(self, prompt_tokens: int) -> Sequence[bytes]:
+        """Frames sent before the first delta."""
+        return ()
+
+    def delta(self, text: str) -> bytes:
+        raise NotImplementedError
+
+    def finish(self, prompt_tokens: int, completion_tokens: int) -> Sequence[bytes]:
+        """Frames sent after the last delta."""
+        return ()
+
+    def error(self, message: str) -> Sequence[bytes]:
+        """Frames that end the stream after a failure."""
+        return ()
+
+
+class OpenAIChatDialect(StreamDialect):
+    """chat.completion.chunk frames"""
+
+    name = "OpenAI"
+
+    def __init__(self, request_id: str, model: str):
+        self.encoder = OpenAIChunkEncoder(request_id, model)
+
+    def start(self, prompt_tokens: int) -> Sequence[bytes]:
+        # Initial empty chunk opens the stream
+        return (self.encoder.delta(""),)
+
+    def delta(self, text: str) -> bytes:
+        return self.encoder.delta(text)
+
+    def finish(self, prompt_tokens: int, completion_tokens: int) -> Sequence[bytes]:
+        return (self.encoder.chunk("", finish_reason="stop"), self.encoder.done())
+
+    def error(self, message: str) -> Sequence[bytes]:
+        return (self.encoder.chunk(f"Error: {message}", finish_reason="error"), self.encoder.done())
+
+
+class TextCompletionDialect(OpenAIChatDialect):
+    """text_completion frames (legacy /v1/completions)"""
+
+    name = "text completion"
+
+    def __init__(self, request_id: str, model: str):
+        self.encoder = TextCompletionChunkEncoder(request_id, model)
+
+    def start(self, prompt_tokens: int) -> Sequence[bytes]:
+        return ()
+
+
+class AnthropicDialect(StreamDialect):
+    """Messages API event sequence"""
+
+    name = "Anthropic"
+
+    def __init__(self, model: str, message_id: Optional[str] = None):
+        self.encoder = AnthropicEventEncoder(model, message_id)
+
+    def start(self, prompt_tokens: int) -> Sequence[bytes]:
+        return (
+            self.encoder.message_start(prompt_tokens),
+            self.encoder.content_block_start(),
+            self.encoder.ping()
+        )
+
+    def delta(self, text: str) -> bytes:
+        return self.encoder.delta(text)
+
+    def finish(self, prompt_tokens: int, completion_tokens: int) -> Sequence[bytes]:
+        return (
+            self.encoder.content_block_stop(),
+            self.encoder.message_delta("end_turn", completion_tokens),
+            self.encoder.message_stop(),
+            self.encoder.done()
+        )
+
+    def error(self, message: str) -> Sequence[bytes]:
+        return (self.encoder.message_delta("error", 0), self.encoder.message_stop(), self.encoder.done())
+
+
+class GeminiDialect(StreamDialect):
+    """streamGenerateContent chunks"""
+
+    name = "Gemini"
+
+    def __init__(self):
+        self.encoder = GeminiChunkEncoder()
+
+    def delta(self, text: str) -> bytes:
+        return self.encoder.delta(text)
+
+    def finish(self, prompt_tokens: int, completion_tokens: int) -> Sequence[bytes]:
+        return (self.encoder.final(prompt_tokens, completion_tokens), self.encoder.done())
+
+    def error(self, message: str) -> Sequence[bytes]:
+        return (self.encoder.error(message),)
+
+
+async def stream_events(
+    dialect: StreamDialect,
+    client: Any,
+    prompt: str,
+    codegen_model: Optional[str] = None,
+    task_options: Optional[Dict[str, Any]] = None
+) -> AsyncGenerator[bytes, None]:
+    """
+    Stream a task's output as one dialect's events.
+
+    Args:
+        dialect: Encoder for the client's API
+        client: Codegen client instance (enhanced or basic)
+        prompt: The prompt to send to the agent
+        codegen_model: Codegen model to use
+        task_options: Extra run_task options (request params, coalescing opt-out)
+
+    Yields:
+        Encoded frames: the dialect's opening frames, one per delta, then its
+        closing frames (or its error frames if the task fails)
+    """
+    prompt_tokens = estimate_tokens(prompt)
+    for frame in dialect.start(prompt_tokens):
+        yield frame
+
+    parts: List[str] = []
+    try:
+        async with aclosing(stream_deltas(client, prompt, codegen_model, task_options)) as deltas:
+            async for text in deltas:
+                parts.append(text)
+                yield dialect.delta(text)
+    except Exception as e:
+        logger.error(f"❌ Error in {dialect.name} streaming: {e}")
+        for frame in dialect.error(str(e)):
+            yield frame
+        return
+
+    content = "".join(parts)
+    for frame in dialect.finish(prompt_tokens, estimate_tokens(content)):
+        yield frame
+    logger.info(f"✅ {dialect.name} streaming completed: {len(parts)} deltas, {len(content)} chars")
+
+
+def create_streaming_response(
+    dialect: StreamDialect,
+    client: Any,
+    prompt: str,
+    codegen_model: Optional[str] = None,
+    task_options: Optional[Dict[str, Any]] = None,
+    pacing: Optional[PacingConfig] = None,
+    content_type: str = "text/event-stream"
+) -> StreamingResponse:
+    """
+    Create a FastAPI StreamingResponse for any dialect.
+
+    Args:
+        dialect: Encoder for the client's API
+        client: Codegen client instance (enhanced or basic)
+        prompt: The prompt to send to the agent
+        codegen_model: Codegen model to use
+        task_options: Extra run_task options (request params, coalescing opt-out)
+        pacing: Output pacing (immediate, coalescing or paced)
+        content_type: Content-Type header of the stream
+
+    Returns:
+        FastAPI StreamingResponse
+    """
+    return StreamingResponse(
+        pace_stream(stream_events(dialect, client, prompt, codegen_model, task_options), pacing),
+        media_type=content_type,
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "Content-Type": content_type,
+        }
+    )
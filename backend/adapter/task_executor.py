@@ -0,0 +1,142 @@
+"""
+Bounded thread-pool executor for blocking Codegen SDK calls.
+Keeps Agent.run and task.refresh off the event loop and tracks saturation.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CodegenTaskExecutor:
+    """Runs synchronous Codegen SDK calls on a dedicated, bounded thread pool."""
+
+    def __init__(self, max_workers: int = 16, thread_name_prefix: str = "codegen-sdk"):
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=thread_name_prefix
+        )
+        self._lock = threading.Lock()
+
+        # Live gauges
+        self._queued = 0
+        self._active = 0
+        self._peak_queued = 0
+        self._peak_active = 0
+
+        # Counters
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._total_queue_wait = 0.0
+        self._max_queue_wait = 0.0
+        self._total_run_time = 0.0
+
+        logger.info(f"Initialized CodegenTaskExecutor with max_workers={self.max_workers}")
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking callable on the executor without blocking the event loop.
+
+        Args:
+            func: The synchronous callable to run (e.g. agent.run, task.refresh)
+            *args: Positional arguments for the callable
+            **kwargs: Keyword arguments for the callable
+
+        Returns:
+            The callable's return value
+        """
+        loop = asyncio.get_running_loop()
+        submitted_at = time.monotonic()
+
+        with self._lock:
+            self._submitted += 1
+            self._queued += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+
+        def _call():
+            started_at = time.monotonic()
+            queue_wait = started_at - submitted_at
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._peak_active = max(self._peak_active, self._active)
+                self._total_queue_wait += queue_wait
+                self._max_queue_wait = max(self._max_queue_wait, queue_wait)
+
+            failed = False
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._total_run_time += time.monotonic() - started_at
+                    if failed:
+                        self._failed += 1
+                    else:
+                        self._completed += 1
+
+        return await loop.run_in_executor(self._executor, _call)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of calls waiting for a free worker."""
+        return self._queued
+
+    @property
+    def active_workers(self) -> int:
+        """Number of workers currently executing a call."""
+        return self._active
+
+    @property
+    def saturation(self) -> float:
+        """Fraction of workers busy, plus queued calls relative to pool size."""
+        return (self._active + self._queued) / self.max_workers
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get executor queue depth and saturation metrics."""
+        with self._lock:
+            finished = self._completed + self._failed
+            started = finished + self._active
+            return {
+                "max_workers": self.max_workers,
+                "active_workers": self._active,
+                "queue_depth": self._queued,
+                "saturation": round((self._active + self._queued) / self.max_workers, 3),
+                "peak_active_workers": self._peak_active,
+                "peak_queue_depth": self._peak_queued,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_queue_wait_ms": round(self._total_queue_wait / started * 1000, 2) if started else 0.0,
+                "max_queue_wait_ms": round(self._max_queue_wait * 1000, 2),
+                "avg_run_time_ms": round(self._total_run_time / finished * 1000, 2) if finished else 0.0
+            }
+
+    def shutdown(self, wait: bool = False):
+        """Shut down the underlying thread pool."""
+        self._executor.shutdown(wait=wait)
+        logger.info("CodegenTaskExecutor shut down")
+
+
+# Singleton instance
+_task_executor: Optional[CodegenTaskExecutor] = None
+
+def get_task_executor() -> CodegenTaskExecutor:
+    """Get the shared Codegen SDK executor instance."""
+    global _task_executor
+    if _task_executor is None:
+        _task_executor = CodegenTaskExecutor(
+            max_workers=int(os.environ.get("CODEGEN_EXECUTOR_WORKERS", "16"))
+        )
+    return _task_executor
@@ -5,23 +5,52 @@ Handles task creation, polling, and streaming with proper error handling.
 
 import asyncio
 import logging
-import random
 import time
-from typing import AsyncGenerator, Optional
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Optional, Set
 
 from codegen.agents import Agent
-from codegen_api_client.exceptions import ApiException
+
+from backend.adapter.task_executor import CodegenTaskExecutor, get_task_executor
+from backend.adapter.task_poller import TERMINAL_STATUSES, TaskPoller, get_task_status
+from backend.adapter.stream_engine import TaskStreamEngine
 
 logger = logging.getLogger(__name__)
 
+# Returned to the client when a task completes without any output
+NO_RESULT_MESSAGE = "Task completed but no result found"
+
 class CodegenTaskManager:
     """Manages Codegen tasks with proper polling and error handling."""
     
-    def __init__(self, agent: Agent, max_retries: int = 60, base_delay: int = 2, webhook_handler = None):
+    def __init__(
+        self,
+        agent: Agent,
+        max_retries: int = 60,
+        base_delay: int = 2,
+        webhook_handler = None,
+        executor: Optional[CodegenTaskExecutor] = None,
+        poller: Optional[TaskPoller] = None,
+        stream_engine: Optional[TaskStreamEngine] = None
+    ):
         self.agent = agent
         self.max_retries = max_retries
         self.base_delay = base_delay
         self.webhook_handler = webhook_handler
+        # All blocking SDK calls go through this executor so polls never stall the event loop
+        self.executor = executor or get_task_executor()
+        # One poller refreshes every in-flight task instead of a loop per request
+        self.poller = poller or TaskPoller(self.executor, base_delay=base_delay)
+        self.stream_engine = stream_engine or TaskStreamEngine(self.poller)
+        
+        # Tasks abandoned by their clients, and the upstream work that saved
+        self._abandoned = 0
+        self._upstream_cancelled = 0
+        self._upstream_cancel_unsupported = 0
+        self._upstream_cancel_failed = 0
+        self._task_seconds_held = 0.0
+        self._task_seconds_avoided = 0.0
+        self._cancellations: Set[asyncio.Task] = set()
         logger.info(f"Initialized CodegenTaskManager with max_retries={max_retries}, base_delay={base_delay}, webhook_handler={'enabled' if webhook_handler else 'disabled'}")
     
     async def run_task(
@@ -29,7 +58,8 @@ class CodegenTaskManager:
         prompt: str,
         model: Optional[str] = None,
         stream: bool = False,
-        timeout: int = 300
+        timeout: int = 300,
+        on_result: Optional[Callable[[str], Awaitable[None]]] = None
     ) -> AsyncGenerator[str, None]:
         """
         Run a task and handle polling/streaming.
@@ -39,6 +69,8 @@ class CodegenTaskManager:
             model: The Codegen model to use
             stream: Whether to stream the response
             timeout: Maximum time to wait for completion in seconds
+            on_result: Awaited with the task's final result after it has been
+                yielded; not called for partial output or a task with no result
             
         Yields:
             Response chunks if streaming, or final response if not streaming
@@ -46,6 +78,9 @@ class CodegenTaskManager:
         if not self.agent:
             raise RuntimeError("Codegen agent not initialized")
         
+        # Completion-time samples are keyed by model and original prompt size
+        poll_key = {"model": model, "prompt_size": len(prompt)}
+        
         # Add model selection to prompt if specified
         if model:
             prompt = f"[MODEL: {model}]\n{prompt}"
@@ -53,216 +88,174 @@ class CodegenTaskManager:
         
         # Run the task
         try:
-            task = self.agent.run(prompt)
+            creation = asyncio.ensure_future(self.executor.run(self.agent.run, prompt))
+            try:
+                task = await asyncio.shield(creation)
+            except asyncio.CancelledError:
+                # The agent call can't be interrupted; cancel the task once it exists
+                creation.add_done_callback(lambda f: self._abandon_created(f, poll_key))
+                raise
+            poll_key["created_at"] = time.monotonic()
             task_id = task.id
             logger.info(f"Created task with ID: {task_id}")
             
-            # Register task with webhook handler if available
-            event = None
+            # Register task with webhook handler if available; a webhook resolves the
+            # shared poller entry directly, so whichever signal comes first wins
             if self.webhook_handler:
                 logger.info(f"Registering task {task_id} with webhook handler")
-                event = self.webhook_handler.register_task(task_id)
+                self.webhook_handler.register_task(task_id, self._on_webhook, self._on_webhook_progress)
             
-            if stream:
-                logger.info(f"Streaming response for task {task_id}")
-                async for chunk in self._stream_response(task, timeout, event):
-                    yield chunk
-            else:
-                logger.info(f"Waiting for completion of task {task_id}")
-                
-                # If webhook handler is available, wait for webhook callback
-                if self.webhook_handler and event:
-                    logger.info(f"Using webhook for task {task_id}")
-                    
-                    # Wait for webhook callback with timeout
-                    success = await self.webhook_handler.wait_for_task(task_id, timeout)
-                    
-                    if success:
-                        # Get result from webhook handler
-                        result = self.webhook_handler.get_task_result(task_id)
-                        if result:
-                            logger.info(f"Got result from webhook for task {task_id}")
-                            yield result
-                        else:
-                            # Fallback to polling if webhook didn't provide result
-                            logger.warning(f"Webhook didn't provide result for task {task_id}, falling back to polling")
-                            result = await self._poll_until_complete(task, timeout)
-                            yield result
-                    else:
-                        # Fallback to polling if webhook timed out
-                        logger.warning(f"Webhook timed out for task {task_id}, falling back to polling")
-                        result = await self._poll_until_complete(task, timeout)
-                        yield result
+            completed = False
+            try:
+                if stream:
+                    logger.info(f"Streaming response for task {task_id}")
+                    async with aclosing(self._stream_response(task, timeout, poll_key, on_result)) as chunks:
+                        async for chunk in chunks:
+                            yield chunk
                 else:
-                    # Use traditional polling if webhook handler is not available
-                    result = await self._poll_until_complete(task, timeout)
-                    yield result
+                    logger.info(f"Waiting for completion of task {task_id}")
+                    result = await self._poll_until_complete(task, timeout, poll_key)
+                    completed = True
+                    yield NO_RESULT_MESSAGE if result is None else result
+                    if result is not None and on_result:
+                        await on_result(result)
+            except (GeneratorExit, asyncio.CancelledError):
+                # The client went away; stop paying for a task nobody will read
+                if not completed and not self._is_finished(task):
+                    self._abandon(task, poll_key)
+                raise
+            finally:
+                if self.webhook_handler:
+                    # Drop any stored webhook result as soon as this request is done with it
+                    self.webhook_handler.unregister_task(task_id)
                 
         except Exception as e:
             logger.error(f"Error running task: {e}")
             raise
     
-    async def _poll_until_complete(self, task, timeout: int) -> str:
-        """Poll task until completion with exponential backoff."""
-        start_time = time.time()
-        retry_count = 0
+    def _is_finished(self, task) -> bool:
+        """Whether a task already reached a terminal state via polling or webhook."""
+        if get_task_status(task) in TERMINAL_STATUSES:
+            return True
+        return bool(self.webhook_handler) and self.webhook_handler.get_task_status(task.id) in TERMINAL_STATUSES
+    
+    def _abandon(self, task, poll_key: dict):
+        """Record an abandoned task and cancel it upstream in the background."""
+        elapsed = max(0.0, time.monotonic() - poll_key.get("created_at", time.monotonic()))
+        self._abandoned += 1
+        self._task_seconds_held += elapsed
         
-        while retry_count < self.max_retries:
-            # Check timeout
-            elapsed_time = time.time() - start_time
-            if elapsed_time > timeout:
-                logger.error(f"Task {task.id} polling exceeded timeout of {timeout}s")
-                raise TimeoutError(f"Task polling exceeded timeout of {timeout}s")
-            
-            try:
-                task.refresh()
-                status = task.status.upper() if hasattr(task.status, 'upper') else str(task.status).upper()
-                
-                logger.debug(f"Task {task.id} status: {status} (attempt {retry_count+1}/{self.max_retries}, elapsed {elapsed_time:.1f}s)")
-                
-                if status == "COMPLETE":
-                    logger.info(f"Task {task.id} completed successfully after {elapsed_time:.1f}s")
-                    
-                    # Extract result using multiple methods
-                    for attr in ['result', 'output', 'response', 'content']:
-                        if hasattr(task, attr):
-                            result = getattr(task, attr)
-                            if result:
-                                logger.info(f"Extracted result from task.{attr}")
-                                return result
-                    
-                    # If no result found
-                    logger.warning(f"Task {task.id} completed but no result found")
-                    return "Task completed but no result found"
-                
-                elif status == "FAILED":
-                    error_msg = getattr(task, 'error', 'Task failed with unknown error')
-                    logger.error(f"Task {task.id} failed: {error_msg}")
-                    raise RuntimeError(f"Codegen task failed: {error_msg}")
-                
-                # Use exponential backoff with jitter
-                delay = min(self.base_delay * (1.5 ** retry_count) * (0.9 + 0.2 * random.random()), 30)
-                logger.debug(f"Task {task.id} still in progress, waiting {delay:.1f}s...")
-                await asyncio.sleep(delay)
-                retry_count += 1
-                
-            except ApiException as e:
-                if e.status == 429:  # Rate limit
-                    retry_after = 5
-                    if hasattr(e, 'headers') and 'Retry-After' in e.headers:
-                        retry_after = int(e.headers['Retry-After'])
-                    
-                    logger.warning(f"Rate limit hit for task {task.id}, waiting {retry_after + 2}s...")
-                    await asyncio.sleep(retry_after + 2)  # Add buffer
-                    retry_count += 1
-                else:
-                    logger.error(f"API error for task {task.id}: {e}")
-                    raise
-            except Exception as e:
-                if not isinstance(e, TimeoutError) and not isinstance(e, RuntimeError):
-                    logger.error(f"Unexpected error polling task {task.id}: {e}")
-                    await asyncio.sleep(self.base_delay)
-                    retry_count += 1
-                else:
-                    raise
+        expected_remaining = None
+        if self.poller.scheduler:
+            expected_remaining = self.poller.scheduler.expected_remaining(
+                poll_key.get("model"), poll_key.get("prompt_size", 0), elapsed
+            )
+        logger.info(f"Task {task.id} abandoned by client after {elapsed:.1f}s, cancelling upstream")
         
-        logger.error(f"Task {task.id} polling exceeded maximum retries ({self.max_retries})")
-        raise RuntimeError(f"Task polling exceeded maximum retries ({self.max_retries})")
+        cancellation = asyncio.get_running_loop().create_task(self._cancel_upstream(task, expected_remaining))
+        self._cancellations.add(cancellation)
+        cancellation.add_done_callback(self._cancellations.discard)
+    
+    def _abandon_created(self, creation: asyncio.Future, poll_key: dict):
+        """Cancel a task whose creation finished after its client disconnected."""
+        if creation.cancelled() or creation.exception() is not None:
+            return
+        poll_key["created_at"] = time.monotonic()
+        self._abandon(creation.result(), poll_key)
     
-    async def _stream_response(self, task, timeout: int, event=None) -> AsyncGenerator[str, None]:
-        """Stream response by polling for partial results."""
+    async def _cancel_upstream(self, task, expected_remaining: Optional[float] = None):
+        """Ask Codegen to stop a task, where the SDK exposes a cancel call."""
+        cancel = getattr(task, "cancel", None)
+        if not callable(cancel):
+            self._upstream_cancel_unsupported += 1
+            logger.info(f"Task {task.id} can't be cancelled upstream by this SDK version; polling stopped")
+            return
+        try:
+            await self.executor.run(cancel)
+        except Exception as e:
+            self._upstream_cancel_failed += 1
+            logger.warning(f"Failed to cancel task {task.id} upstream: {e}")
+            return
+        self._upstream_cancelled += 1
+        if expected_remaining:
+            self._task_seconds_avoided += expected_remaining
+        logger.info(f"Cancelled task {task.id} upstream")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cancellation counters."""
+        return {
+            "abandoned": self._abandoned,
+            "upstream_cancelled": self._upstream_cancelled,
+            "upstream_cancel_unsupported": self._upstream_cancel_unsupported,
+            "upstream_cancel_failed": self._upstream_cancel_failed,
+            "pending_cancellations": len(self._cancellations),
+            "task_seconds_held": round(self._task_seconds_held, 1),
+            "task_seconds_avoided": round(self._task_seconds_avoided, 1)
+        }
+    
+    def _on_webhook(self, task_id: str, status: str, result=None):
+        """Webhook callback: complete the poller entry without waiting for the next poll."""
+        # A completion without content still needs a refresh to fetch the result
+        if status == "FAILED" or result:
+            self.poller.complete(task_id, status, result)
+    
+    def _on_webhook_progress(self, task_id: str, partial):
+        """Webhook progress callback: push partial output to streaming waiters."""
+        if isinstance(partial, str):
+            self.poller.update(task_id, partial)
+    
+    def _apply_early_webhook(self, task_id: str):
+        """Resolve a poller entry from a webhook that arrived before it was registered."""
+        if not self.webhook_handler:
+            return
+        status = self.webhook_handler.get_task_status(task_id)
+        if status in TERMINAL_STATUSES:
+            self._on_webhook(str(task_id), status, self.webhook_handler.get_task_result(task_id))
+    
+    async def _poll_until_complete(self, task, timeout: int, poll_key: Optional[dict] = None) -> Optional[str]:
+        """Wait for the shared poller to see the task complete and extract its result (None if it has none)."""
         start_time = time.time()
-        last_content = ""
-        retry_count = 0
-        task_id = task.id
+        entry = self.poller.register(task, max_polls=self.max_retries, **(poll_key or {}))
+        self._apply_early_webhook(task.id)
         
-        # Initial delay to allow task to start
-        await asyncio.sleep(self.base_delay)
+        try:
+            task = await self.poller.wait_for_completion(task.id, timeout)
+        finally:
+            self.poller.unregister(task.id)
         
-        # Yield empty chunk to start the stream
-        yield ""
+        elapsed_time = time.time() - start_time
+        logger.info(f"Task {task.id} completed successfully after {elapsed_time:.1f}s")
         
-        while retry_count < self.max_retries:
-            # Check timeout
-            elapsed_time = time.time() - start_time
-            if elapsed_time > timeout:
-                logger.error(f"Task {task_id} streaming exceeded timeout of {timeout}s")
-                raise TimeoutError(f"Task streaming exceeded timeout of {timeout}s")
-            
-            # Check if webhook has received a completion event
-            if self.webhook_handler and event and event.is_set():
-                logger.info(f"Webhook received completion for task {task_id}")
-                result = self.webhook_handler.get_task_result(task_id)
-                if result and result != last_content:
-                    new_content = result[len(last_content):]
-                    if new_content:
-                        logger.debug(f"Yielding final chunk from webhook: {len(new_content)} chars")
-                        yield new_content
-                break
-            
-            try:
-                task.refresh()
-                status = task.status.upper() if hasattr(task.status, 'upper') else str(task.status).upper()
-                
-                if status == "COMPLETE":
-                    # Final chunk
-                    if hasattr(task, 'result') and task.result:
-                        if task.result != last_content:
-                            new_content = task.result[len(last_content):]
-                            if new_content:
-                                logger.debug(f"Yielding final chunk: {len(new_content)} chars")
-                                yield new_content
-                    break
-                    
-                elif status == "FAILED":
-                    error_msg = getattr(task, 'error', 'Task failed with unknown error')
-                    logger.error(f"Task {task_id} failed during streaming: {error_msg}")
-                    raise RuntimeError(f"Codegen task failed: {error_msg}")
-                    
-                elif status in ["ACTIVE", "RUNNING", "PENDING"]:
-                    # Try to get partial results
-                    partial_result = None
-                    
-                    # Check various attributes for partial results
-                    for attr in ['partial_result', 'result', 'output', 'response', 'content']:
-                        if hasattr(task, attr):
-                            attr_value = getattr(task, attr)
-                            if attr_value and isinstance(attr_value, str) and attr_value != last_content:
-                                partial_result = attr_value
-                                break
-                    
-                    if partial_result and partial_result != last_content:
-                        new_content = partial_result[len(last_content):]
-                        if new_content:
-                            logger.debug(f"Yielding partial chunk: {len(new_content)} chars")
-                            yield new_content
-                            last_content = partial_result
-                
-                # Use exponential backoff with jitter for polling
-                delay = min(self.base_delay * (1.2 ** retry_count) * (0.9 + 0.2 * random.random()), 10)
-                await asyncio.sleep(delay)
-                retry_count += 1
-                
-            except ApiException as e:
-                if e.status == 429:  # Rate limit
-                    retry_after = 5
-                    if hasattr(e, 'headers') and 'Retry-After' in e.headers:
-                        retry_after = int(e.headers['Retry-After'])
-                    
-                    logger.warning(f"Rate limit hit during streaming for task {task.id}, waiting {retry_after + 2}s...")
-                    await asyncio.sleep(retry_after + 2)
-                    retry_count += 1
-                else:
-                    logger.error(f"API error during streaming for task {task.id}: {e}")
-                    raise
-            except Exception as e:
-                if not isinstance(e, TimeoutError) and not isinstance(e, RuntimeError):
-                    logger.error(f"Unexpected error during streaming for task {task.id}: {e}")
-                    await asyncio.sleep(self.base_delay)
-                    retry_count += 1
-                else:
-                    raise
+        if entry.result:
+            logger.info(f"Got result from webhook for task {task.id}")
+            return entry.result
+        
+        # Extract result using multiple methods
+        for attr in ['result', 'output', 'response', 'content']:
+            if hasattr(task, attr):
+                result = getattr(task, attr)
+                if result:
+                    logger.info(f"Extracted result from task.{attr}")
+                    return result
         
-        if retry_count >= self.max_retries:
-            logger.error(f"Task {task.id} streaming exceeded maximum retries ({self.max_retries})")
-            raise RuntimeError(f"Task streaming exceeded maximum retries ({self.max_retries})")
+        # If no result found
+        logger.warning(f"Task {task.id} completed but no result found")
+        return None
+    
+    async def _stream_response(
+        self,
+        task,
+        timeout: int,
+        poll_key: Optional[dict] = None,
+        on_result: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> AsyncGenerator[str, None]:
+        """Stream output deltas from pushed progress and shared poller refreshes."""
+        opened = False
+        stream = self.stream_engine.stream(task, timeout, max_polls=self.max_retries, on_result=on_result, **(poll_key or {}))
+        async with aclosing(stream) as deltas:
+            async for delta in deltas:
+                if not opened:
+                    # The task is registered with the poller once the stream opens
+                    opened = True
+                    self._apply_early_webhook(task.id)
+                yield delta
@@ -0,0 +1,497 @@
+"""
+Centralized poller for in-flight Codegen tasks.
+A single background loop refreshes every pending task on a shared schedule
+under one global rate budget, and wakes the per-task waiters.
+"""
+
+import asyncio
+import logging
+import math
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional
+
+from codegen_api_client.exceptions import ApiException
+
+from backend.adapter.poll_scheduler import AdaptivePollScheduler
+from backend.adapter.task_executor import CodegenTaskExecutor
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("COMPLETE", "FAILED")
+
+
+def get_task_status(task) -> str:
+    """Normalize a Codegen task status to an upper-case string."""
+    status = getattr(task, "status", None)
+    return status.upper() if hasattr(status, "upper") else str(status).upper()
+
+
+def parse_retry_after(value, default: float) -> float:
+    """
+    Seconds to wait from a Retry-After header value.
+
+    Accepts delta-seconds ("120") or an HTTP-date; anything missing or
+    unparseable falls back to default.
+    """
+    if value is None:
+        return default
+    try:
+        seconds = float(value)
+        return max(0.0, seconds) if math.isfinite(seconds) else default
+    except (TypeError, ValueError):
+        pass
+    try:
+        when = parsedate_to_datetime(str(value))
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return default
+
+
+class PolledTask:
+    """Registry entry for a task refreshed by the shared poller."""
+
+    def __init__(
+        self,
+        task,
+        stream: bool,
+        max_polls: int,
+        model: Optional[str] = None,
+        prompt_size: int = 0,
+        created_at: Optional[float] = None
+    ):
+        self.task = task
+        self.task_id = str(task.id)
+        self.stream = stream
+        self.max_polls = max_polls
+        self.model = model
+        self.prompt_size = prompt_size
+        self.status = "PENDING"
+        self.registered_at = time.monotonic()
+        self.created_at = created_at if created_at is not None else self.registered_at
+        self.last_poll_at = self.created_at
+        self.next_poll_at = self.registered_at
+        self.poll_count = 0
+        self.error_count = 0
+        self.refs = 1
+        self.result: Optional[Any] = None
+        self.partial: Optional[str] = None
+        self.error: Optional[Exception] = None
+        self.completion: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._updated = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.completion.done()
+
+    def notify(self):
+        """Wake everyone waiting for the next update of this task."""
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    def finish(self, status: str, result: Optional[Any] = None, error: Optional[Exception] = None):
+        """Mark the task terminal and resolve its completion future."""
+        if self.done:
+            return
+        self.status = status
+        if result is not None:
+            self.result = result
+        if error is not None:
+            self.error = error
+            self.completion.set_exception(error)
+            # Waiters may only be watching updates; don't warn about an unretrieved exception
+            self.completion.exception()
+        else:
+            self.completion.set_result(self.task)
+        self.notify()
+
+
+class TaskPoller:
+    """Shared background poller that refreshes all pending Codegen tasks."""
+
+    def __init__(
+        self,
+        executor: CodegenTaskExecutor,
+        base_delay: float = 2,
+        max_delay: float = 30,
+        stream_max_delay: float = 10,
+        max_polls_per_second: float = 5.0,
+        tick_interval: float = 0.5,
+        default_retry_after: float = 5,
+        scheduler: Optional[AdaptivePollScheduler] = None
+    ):
+        self.executor = executor
+        self.scheduler = scheduler
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stream_max_delay = stream_max_delay
+        self.max_polls_per_second = max(0.1, max_polls_per_second)
+        self.tick_interval = tick_interval
+        self.default_retry_after = default_retry_after
+
+        self._tasks: Dict[str, PolledTask] = {}
+        self._runner: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+        # Global rate budget (token bucket) shared by every task
+        self._tokens = self.max_polls_per_second
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+
+        # Metrics
+        self._ticks = 0
+        self._polls = 0
+        self._rate_limited = 0
+        self._poll_errors = 0
+        self._completed = 0
+        self._failed = 0
+        self._external_completions = 0
+        self._external_updates = 0
+        self._max_batch = 0
+
+        logger.info(
+            f"Initialized TaskPoller with max_polls_per_second={self.max_polls_per_second}, "
+            f"tick_interval={tick_interval}s, base_delay={base_delay}s, "
+            f"adaptive={'on' if scheduler else 'off'}"
+        )
+
+    def register(
+        self,
+        task,
+        stream: bool = False,
+        max_polls: int = 60,
+        model: Optional[str] = None,
+        prompt_size: int = 0,
+        created_at: Optional[float] = None
+    ) -> PolledTask:
+        """
+        Register a task with the poller, or add a reference to an existing entry.
+
+        Args:
+            task: The Codegen task object
+            stream: Whether the caller streams partial results (polls more often)
+            max_polls: Maximum number of refreshes before giving up
+            model: Codegen model the task runs on (keys the learned schedule)
+            prompt_size: Prompt length in characters (keys the learned schedule)
+            created_at: time.monotonic() when the task was created, if earlier than now
+
+        Returns:
+            PolledTask: The registry entry for the task
+        """
+        task_id = str(task.id)
+        entry = self._tasks.get(task_id)
+        if entry:
+            entry.refs += 1
+            if stream and not entry.stream:
+                entry.stream = True
+                entry.next_poll_at = min(entry.next_poll_at, time.monotonic() + self.base_delay)
+            return entry
+
+        entry = PolledTask(task, stream, max_polls, model, prompt_size, created_at)
+        entry.next_poll_at = time.monotonic() + self._next_delay(entry)
+        self._tasks[task_id] = entry
+        logger.debug(f"Registered task {task_id} with poller ({len(self._tasks)} pending)")
+        self._ensure_running()
+        return entry
+
+    def unregister(self, task_id: str):
+        """Drop one reference to a task; the entry is removed when no waiters remain."""
+        entry = self._tasks.get(str(task_id))
+        if not entry:
+            return
+        entry.refs -= 1
+        if entry.refs <= 0:
+            self._tasks.pop(entry.task_id, None)
+            logger.debug(f"Unregistered task {entry.task_id} from poller")
+
+    def get(self, task_id: str) -> Optional[PolledTask]:
+        """Get the registry entry for a task."""
+        return self._tasks.get(str(task_id))
+
+    def complete(self, task_id: str, status: str, result: Optional[Any] = None):
+        """
+        Resolve a task from an external signal (e.g. a webhook) without polling.
+
+        Args:
+            task_id: The ID of the task
+            status: Terminal status reported for the task
+            result: Result content, if the signal carried one
+        """
+        entry = self._tasks.get(str(task_id))
+        if not entry or entry.done:
+            return
+        status = status.upper()
+        self._external_completions += 1
+        if status == "FAILED":
+            self._failed += 1
+            entry.finish(status, error=RuntimeError(f"Codegen task failed: {result or 'unknown error'}"))
+        else:
+            self._completed += 1
+            # External signals arrive at completion time, so they are exact samples
+            self._record_completion(entry, time.monotonic() - entry.created_at)
+            entry.finish(status, result=result)
+
+    def update(self, task_id: str, partial: str):
+        """
+        Push partial output for a task from an external source (e.g. a progress webhook).
+
+        Args:
+            task_id: The ID of the task
+            partial: Output produced so far
+        """
+        entry = self._tasks.get(str(task_id))
+        if not entry or entry.done:
+            return
+        entry.partial = partial
+        self._external_updates += 1
+        entry.notify()
+
+    async def wait_for_completion(self, task_id: str, timeout: Optional[float] = None):
+        """
+        Wait until the poller sees the task finish.
+
+        Args:
+            task_id: The ID of a registered task
+            timeout: Maximum time to wait in seconds
+
+        Returns:
+            The refreshed task object
+
+        Raises:
+            TimeoutError: If the task did not finish in time
+            RuntimeError: If the task failed or polling gave up
+        """
+        entry = self._tasks.get(str(task_id))
+        if not entry:
+            raise RuntimeError(f"Task {task_id} is not registered with the poller")
+        try:
+            return await asyncio.wait_for(asyncio.shield(entry.completion), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Task polling exceeded timeout of {timeout}s")
+
+    async def wait_for_update(self, task_id: str, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the next refresh (or completion) of a task.
+
+        Returns:
+            bool: True if an update arrived, False on timeout
+        """
+        entry = self._tasks.get(str(task_id))
+        if not entry:
+            return False
+        if entry.done:
+            return True
+        try:
+            await asyncio.wait_for(entry._updated.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def _ensure_running(self):
+        """Start the background loop if it is not running."""
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.get_running_loop().create_task(self._run())
+        else:
+            self._wakeup.set()
+
+    def _take_tokens(self, wanted: int) -> int:
+        """Take up to `wanted` polls from the global rate budget."""
+        now = time.monotonic()
+        self._tokens = min(
+            self.max_polls_per_second,
+            self._tokens + (now - self._last_refill) * self.max_polls_per_second
+        )
+        self._last_refill = now
+        granted = min(wanted, int(self._tokens))
+        self._tokens -= granted
+        return granted
+
+    def _next_delay(self, entry: PolledTask) -> float:
+        """
+        Delay before the next refresh of a task.
+
+        Non-streaming tasks follow the learned completion-time schedule when
+        there is enough history; otherwise (and for streams, which poll for
+        partial output) fall back to exponential backoff with jitter.
+        """
+        if self.scheduler and not entry.stream:
+            delay = self.scheduler.next_poll_delay(
+                entry.model,
+                entry.prompt_size,
+                time.monotonic() - entry.created_at,
+                entry.poll_count
+            )
+            if delay is not None:
+                return delay
+
+        if entry.stream:
+            delay = self.base_delay * (1.2 ** entry.poll_count)
+            cap = self.stream_max_delay
+        else:
+            delay = self.base_delay * (1.5 ** entry.poll_count)
+            cap = self.max_delay
+        return min(delay * (0.9 + 0.2 * random.random()), cap)
+
+    def _record_completion(self, entry: PolledTask, seconds: float):
+        """Feed an observed completion time back into the scheduler."""
+        if self.scheduler:
+            self.scheduler.record_completion(entry.model, entry.prompt_size, max(0.0, seconds))
+
+    async def _run(self):
+        """Background loop: refresh due tasks in batches until the registry is empty."""
+        logger.info("TaskPoller loop started")
+        try:
+            while self._tasks:
+                self._ticks += 1
+                now = time.monotonic()
+
+                if now < self._paused_until:
+                    await self._sleep(self._paused_until - now)
+                    continue
+
+                due = sorted(
+                    (e for e in self._tasks.values() if not e.done and e.next_poll_at <= now),
+                    key=lambda e: e.next_poll_at
+                )
+                if due:
+                    granted = self._take_tokens(len(due))
+                    batch = due[:granted]
+                    if batch:
+                        self._max_batch = max(self._max_batch, len(batch))
+                        await asyncio.gather(*(self._refresh(entry) for entry in batch))
+                    if granted < len(due):
+                        # Out of budget: come back when the next token is available
+                        await self._sleep(1.0 / self.max_polls_per_second)
+                        continue
+
+                pending = [e.next_poll_at for e in self._tasks.values() if not e.done]
+                if not pending:
+                    await self._sleep(self.tick_interval)
+                    continue
+                await self._sleep(max(0.0, min(pending) - time.monotonic()))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"TaskPoller loop crashed: {e}")
+            for entry in list(self._tasks.values()):
+                entry.finish("FAILED", error=RuntimeError(f"Task poller failed: {e}"))
+        finally:
+            logger.info("TaskPoller loop stopped")
+
+    async def _sleep(self, seconds: float):
+        """Sleep until the deadline or until a new task is registered."""
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=max(seconds, 0.01))
+        except asyncio.TimeoutError:
+            pass
+
+    async def _refresh(self, entry: PolledTask):
+        """Refresh one task and resolve or reschedule it."""
+        task = entry.task
+        try:
+            polled_at = time.monotonic()
+            await self.executor.run(task.refresh)
+            self._polls += 1
+            entry.poll_count += 1
+            entry.error_count = 0
+            status = get_task_status(task)
+            entry.status = status
+
+            if status == "COMPLETE":
+                self._completed += 1
+                # The task finished somewhere since the previous poll; use the midpoint
+                self._record_completion(entry, (entry.last_poll_at + polled_at) / 2 - entry.created_at)
+                entry.finish(status)
+                return
+            if status == "FAILED":
+                self._failed += 1
+                error_msg = getattr(task, "error", "Task failed with unknown error")
+                logger.error(f"Task {entry.task_id} failed: {error_msg}")
+                entry.finish(status, error=RuntimeError(f"Codegen task failed: {error_msg}"))
+                return
+
+            entry.last_poll_at = polled_at
+            entry.notify()
+
+        except ApiException as e:
+            if e.status == 429:
+                headers = getattr(e, "headers", None) or {}
+                retry_after = parse_retry_after(headers.get("Retry-After"), self.default_retry_after)
+                self._rate_limited += 1
+                # One shared pause for every task instead of N independent backoffs
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                self._tokens = 0
+                logger.warning(f"Rate limit hit polling task {entry.task_id}, pausing all polls for {retry_after}s")
+            else:
+                logger.error(f"API error polling task {entry.task_id}: {e}")
+                entry.finish("FAILED", error=e)
+                return
+        except Exception as e:
+            self._poll_errors += 1
+            entry.error_count += 1
+            entry.poll_count += 1
+            logger.error(f"Unexpected error polling task {entry.task_id}: {e}")
+
+        if entry.poll_count >= entry.max_polls:
+            logger.error(f"Task {entry.task_id} polling exceeded maximum retries ({entry.max_polls})")
+            entry.finish("FAILED", error=RuntimeError(f"Task polling exceeded maximum retries ({entry.max_polls})"))
+            return
+
+        entry.next_poll_at = time.monotonic() + (
+            self.base_delay if entry.error_count else self._next_delay(entry)
+        )
+
+    async def stop(self):
+        """Stop the background loop."""
+        if self._runner and not self._runner.done():
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+        self._runner = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get poller registry and rate-budget metrics."""
+        now = time.monotonic()
+        pending = [e for e in self._tasks.values() if not e.done]
+        return {
+            "running": bool(self._runner and not self._runner.done()),
+            "pending_tasks": len(pending),
+            "streaming_tasks": sum(1 for e in pending if e.stream),
+            "waiters": sum(e.refs for e in self._tasks.values()),
+            "max_polls_per_second": self.max_polls_per_second,
+            "adaptive_scheduling": self.scheduler is not None,
+            "ticks": self._ticks,
+            "polls": self._polls,
+            "max_batch_size": self._max_batch,
+            "completed": self._completed,
+            "failed": self._failed,
+            "external_completions": self._external_completions,
+            "external_updates": self._external_updates,
+            "rate_limited": self._rate_limited,
+            "poll_errors": self._poll_errors,
+            "paused_for_seconds": round(max(0.0, self._paused_until - now), 2)
+        }
+
+    def list_tasks(self) -> List[Dict[str, Any]]:
+        """List pending tasks with their poll state."""
+        now = time.monotonic()
+        return [
+            {
+                "task_id": e.task_id,
+                "status": e.status,
+                "stream": e.stream,
+                "polls": e.poll_count,
+                "age_seconds": round(now - e.registered_at, 2),
+                "next_poll_in_seconds": round(max(0.0, e.next_poll_at - now), 2)
+            }
+            for e in self._tasks.values()
+        ]
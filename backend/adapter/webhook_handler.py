@@ -1,187 +1,396 @@
 """
 Webhook handler for Codegen API callbacks.
+Acts as a bounded completion registry: entries expire on a timer, stored
+results are capped in bytes, and a result is dropped once its waiter takes it.
 """
 
 import logging
 import asyncio
+import heapq
+import itertools
 import time
-from datetime import datetime
-from typing import Dict, Any, Optional, Callable
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from fastapi import Request
 
+from backend.adapter.completion_bus import CompletionBus
+
 logger = logging.getLogger(__name__)
 
+TERMINAL_STATUSES = ("COMPLETE", "FAILED")
+
+
+class WebhookEntry:
+    """Registry entry for a task awaiting (or holding) a webhook completion."""
+
+    __slots__ = ("task_id", "status", "created_at", "updated_at", "expires_at",
+                 "event", "callback", "progress_callback", "result", "result_bytes")
+
+    def __init__(
+        self,
+        task_id: str,
+        callback: Optional[Callable],
+        expires_at: float,
+        progress_callback: Optional[Callable] = None
+    ):
+        now = time.monotonic()
+        self.task_id = task_id
+        self.status = "PENDING"
+        self.created_at = now
+        self.updated_at = now
+        self.expires_at = expires_at
+        self.event = asyncio.Event()
+        self.callback = callback
+        self.progress_callback = progress_callback
+        self.result: Optional[Any] = None
+        self.result_bytes = 0
+
+
+def _result_size(result: Any) -> int:
+    """Approximate memory held by a webhook result, in bytes."""
+    if isinstance(result, bytes):
+        return len(result)
+    if isinstance(result, str):
+        return len(result.encode("utf-8"))
+    return len(str(result).encode("utf-8"))
+
+
 class WebhookHandler:
     """Handles webhook callbacks from Codegen API."""
-    
-    def __init__(self):
-        """Initialize the webhook handler."""
-        self.tasks = {}  # Store task state by task_id
-        self.callbacks = {}  # Store callback functions by task_id
-        self.results = {}  # Store task results by task_id
-        self.events = {}  # Store asyncio events by task_id
-        self.cleanup_interval = 3600  # Cleanup old tasks every hour
-        self.last_cleanup = datetime.now()
-        logger.info("Initialized WebhookHandler")
-    
-    def register_task(self, task_id: str, callback: Optional[Callable] = None) -> asyncio.Event:
+
+    def __init__(
+        self,
+        pending_ttl: float = 3600,
+        result_ttl: float = 300,
+        max_result_bytes: int = 64 * 1024 * 1024,
+        bus: Optional[CompletionBus] = None
+    ):
+        """
+        Initialize the webhook handler.
+
+        Args:
+            pending_ttl: Seconds to keep a task that never receives a webhook
+            result_ttl: Seconds to keep a completed result nobody has collected
+            max_result_bytes: Hard cap on memory held by stored results
+            bus: Completion bus that fans webhooks out to every server worker
+        """
+        self.bus = bus
+        self.pending_ttl = pending_ttl
+        self.result_ttl = result_ttl
+        self.max_result_bytes = max_result_bytes
+
+        self._entries: Dict[str, WebhookEntry] = {}
+        # Completed entries holding a result, oldest first (LRU eviction order)
+        self._results: "OrderedDict[str, WebhookEntry]" = OrderedDict()
+        self._result_bytes = 0
+
+        # Expiry heap of (expires_at, seq, task_id) with one timer armed for the earliest
+        self._expiry: List[Tuple[float, int, str]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_at: Optional[float] = None
+
+        # O(1) counters
+        self._pending = 0
+        self._completed = 0
+        self._registered_total = 0
+        self._delivered_total = 0
+        self._expired_total = 0
+        self._evicted_memory_total = 0
+        self._unknown_total = 0
+
+        logger.info(
+            f"Initialized WebhookHandler with pending_ttl={pending_ttl}s, result_ttl={result_ttl}s, "
+            f"max_result_bytes={max_result_bytes}"
+        )
+
+    def register_task(
+        self,
+        task_id: str,
+        callback: Optional[Callable] = None,
+        progress_callback: Optional[Callable] = None
+    ) -> asyncio.Event:
         """
         Register a task for webhook callbacks.
-        
+
         Args:
             task_id: The ID of the task to register
             callback: Optional callback function to call when the task completes
-            
+            progress_callback: Optional callback for non-terminal updates carrying partial output
+
         Returns:
             asyncio.Event: An event that will be set when the task completes
         """
-        self.tasks[task_id] = {
-            "status": "PENDING",
-            "created_at": datetime.now(),
-            "updated_at": datetime.now()
-        }
-        
-        if callback:
-            self.callbacks[task_id] = callback
-        
-        # Create an event for this task
-        event = asyncio.Event()
-        self.events[task_id] = event
-        
+        task_id = str(task_id)
+        self._remove(task_id)
+
+        entry = WebhookEntry(task_id, callback, time.monotonic() + self.pending_ttl, progress_callback)
+        self._entries[task_id] = entry
+        self._pending += 1
+        self._registered_total += 1
+        self._schedule_expiry(entry)
+
         logger.info(f"Registered task {task_id} for webhook callbacks")
-        
-        # Cleanup old tasks if needed
-        self._cleanup_old_tasks()
-        
-        return event
-    
+        return entry.event
+
+    def unregister_task(self, task_id: str):
+        """
+        Forget a task, releasing its stored result.
+
+        Args:
+            task_id: The ID of the task
+        """
+        self._remove(str(task_id))
+
     async def handle_webhook(self, request: Request) -> Dict[str, Any]:
         """
         Handle a webhook callback from Codegen API.
-        
+
         Args:
             request: The FastAPI request object
-            
+
         Returns:
             Dict[str, Any]: Response to send back to Codegen API
         """
         try:
             # Parse the webhook payload
             payload = await request.json()
-            logger.info(f"Received webhook payload: {payload}")
-            
+
             # Extract task ID and status
             task_id = payload.get("task_id")
             status = payload.get("status", "UNKNOWN").upper()
             result = payload.get("result")
-            
+            logger.info(f"Received webhook for task {task_id} with status {status}")
+
             if not task_id:
                 logger.warning("Webhook payload missing task_id")
                 return {"status": "error", "message": "Missing task_id"}
-            
-            # Update task status
-            if task_id in self.tasks:
-                self.tasks[task_id]["status"] = status
-                self.tasks[task_id]["updated_at"] = datetime.now()
-                
-                # Store result if provided
-                if result:
-                    self.results[task_id] = result
-                
-                # Set event if task is complete
-                if status in ["COMPLETE", "FAILED"]:
-                    if task_id in self.events:
-                        logger.info(f"Setting event for task {task_id} with status {status}")
-                        self.events[task_id].set()
-                    
-                    # Call callback if registered
-                    if task_id in self.callbacks and self.callbacks[task_id]:
-                        try:
-                            self.callbacks[task_id](task_id, status, result)
-                        except Exception as e:
-                            logger.error(f"Error calling callback for task {task_id}: {e}")
-                
+
+            if self.bus:
+                # The owning worker may be another process; let the bus route it
+                await self.bus.publish(str(task_id), status, result)
+                return {"status": "success", "task_id": task_id}
+
+            if self.complete_task(str(task_id), status, result):
                 return {"status": "success", "task_id": task_id}
-            else:
-                logger.warning(f"Received webhook for unknown task {task_id}")
-                return {"status": "error", "message": f"Unknown task {task_id}"}
-        
+
+            self._unknown_total += 1
+            logger.warning(f"Received webhook for unknown task {task_id}")
+            return {"status": "error", "message": f"Unknown task {task_id}"}
+
         except Exception as e:
             logger.error(f"Error handling webhook: {e}")
             return {"status": "error", "message": str(e)}
-    
+
+    def complete_task(self, task_id: str, status: str, result: Optional[Any] = None) -> bool:
+        """
+        Record a status update for a registered task.
+
+        Args:
+            task_id: The ID of the task
+            status: Status reported by the webhook
+            result: Result content, if the webhook carried one
+
+        Returns:
+            bool: True if the task was registered, False otherwise
+        """
+        entry = self._entries.get(task_id)
+        if not entry:
+            return False
+
+        entry.status = status
+        entry.updated_at = time.monotonic()
+        if entry.event.is_set():
+            return True
+        if status not in TERMINAL_STATUSES:
+            # Progress update: forward partial output without storing it
+            if result and entry.progress_callback:
+                try:
+                    entry.progress_callback(task_id, result)
+                except Exception as e:
+                    logger.error(f"Error calling progress callback for task {task_id}: {e}")
+            return True
+
+        self._pending -= 1
+        self._completed += 1
+        logger.info(f"Setting event for task {task_id} with status {status}")
+        entry.event.set()
+
+        if result:
+            entry.result = result
+            entry.result_bytes = _result_size(result)
+            self._results[task_id] = entry
+            self._result_bytes += entry.result_bytes
+            self._enforce_memory_cap()
+
+        # Uncollected completions only live for result_ttl
+        entry.expires_at = time.monotonic() + self.result_ttl
+        self._schedule_expiry(entry)
+
+        # Call callback if registered; it may consume or unregister the task
+        if entry.callback:
+            try:
+                entry.callback(task_id, status, result)
+            except Exception as e:
+                logger.error(f"Error calling callback for task {task_id}: {e}")
+        return True
+
     def get_task_result(self, task_id: str) -> Optional[Any]:
         """
-        Get the result of a task.
-        
+        Get the result of a task without consuming it.
+
+        Args:
+            task_id: The ID of the task
+
+        Returns:
+            Optional[Any]: The task result, or None if not available
+        """
+        entry = self._entries.get(str(task_id))
+        if entry and entry.result is not None:
+            self._results.move_to_end(entry.task_id)
+            return entry.result
+        return None
+
+    def pop_task_result(self, task_id: str) -> Optional[Any]:
+        """
+        Take the result of a task, dropping the task from the registry.
+
         Args:
             task_id: The ID of the task
-            
+
         Returns:
             Optional[Any]: The task result, or None if not available
         """
-        return self.results.get(task_id)
-    
+        entry = self._entries.get(str(task_id))
+        if not entry:
+            return None
+        result = entry.result
+        if result is not None:
+            self._delivered_total += 1
+        self._remove(entry.task_id)
+        return result
+
     def get_task_status(self, task_id: str) -> str:
         """
         Get the status of a task.
-        
+
         Args:
             task_id: The ID of the task
-            
+
         Returns:
             str: The task status, or "UNKNOWN" if not found
         """
-        if task_id in self.tasks:
-            return self.tasks[task_id]["status"]
-        return "UNKNOWN"
-    
+        entry = self._entries.get(str(task_id))
+        return entry.status if entry else "UNKNOWN"
+
     async def wait_for_task(self, task_id: str, timeout: Optional[float] = None) -> bool:
         """
         Wait for a task to complete.
-        
+
         Args:
             task_id: The ID of the task to wait for
             timeout: Maximum time to wait in seconds
-            
+
         Returns:
             bool: True if the task completed, False if timed out
         """
-        if task_id not in self.events:
+        entry = self._entries.get(str(task_id))
+        if not entry:
             logger.warning(f"Attempted to wait for unregistered task {task_id}")
             return False
-        
+
         try:
             logger.info(f"Waiting for task {task_id} with timeout {timeout}s")
-            return await asyncio.wait_for(self.events[task_id].wait(), timeout=timeout)
+            return await asyncio.wait_for(entry.event.wait(), timeout=timeout)
         except asyncio.TimeoutError:
             logger.warning(f"Timeout waiting for task {task_id}")
             return False
-    
-    def _cleanup_old_tasks(self):
-        """Clean up old tasks to prevent memory leaks."""
-        now = datetime.now()
-        
-        # Only clean up once per interval
-        if (now - self.last_cleanup).total_seconds() < self.cleanup_interval:
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get registry occupancy and eviction counters."""
+        return {
+            "pending": self._pending,
+            "completed": self._completed,
+            "stored_results": len(self._results),
+            "stored_result_bytes": self._result_bytes,
+            "max_result_bytes": self.max_result_bytes,
+            "registered_total": self._registered_total,
+            "delivered_total": self._delivered_total,
+            "expired_total": self._expired_total,
+            "evicted_memory_total": self._evicted_memory_total,
+            "unknown_webhooks_total": self._unknown_total
+        }
+
+    def _remove(self, task_id: str) -> Optional[WebhookEntry]:
+        """Drop an entry and its result, keeping the counters in step."""
+        entry = self._entries.pop(task_id, None)
+        if not entry:
+            return None
+        if entry.event.is_set():
+            self._completed -= 1
+        else:
+            self._pending -= 1
+        if self._results.pop(task_id, None) is not None:
+            self._result_bytes -= entry.result_bytes
+        entry.result = None
+        return entry
+
+    def _enforce_memory_cap(self):
+        """Evict least recently used results until under the byte cap."""
+        while self._result_bytes > self.max_result_bytes and self._results:
+            task_id, entry = self._results.popitem(last=False)
+            self._result_bytes -= entry.result_bytes
+            entry.result = None
+            entry.result_bytes = 0
+            self._evicted_memory_total += 1
+            logger.warning(f"Evicted webhook result for task {task_id} to stay under {self.max_result_bytes} bytes")
+
+    def _schedule_expiry(self, entry: WebhookEntry):
+        """Push an expiry deadline and make sure the timer fires for the earliest one."""
+        heapq.heappush(self._expiry, (entry.expires_at, next(self._seq), entry.task_id))
+        if len(self._expiry) > 2 * len(self._entries) + 64:
+            # Most heap items are stale (consumed or rescheduled); rebuild from live entries
+            self._expiry = [(e.expires_at, next(self._seq), e.task_id) for e in self._entries.values()]
+            heapq.heapify(self._expiry)
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+                self._timer_at = None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop (e.g. synchronous use): expire opportunistically instead
+            self._expire()
             return
-        
-        self.last_cleanup = now
-        
-        # Find tasks older than cleanup_interval
-        old_tasks = []
-        for task_id, task in self.tasks.items():
-            if (now - task["updated_at"]).total_seconds() > self.cleanup_interval:
-                old_tasks.append(task_id)
-        
-        # Remove old tasks
-        for task_id in old_tasks:
-            logger.info(f"Cleaning up old task {task_id}")
-            self.tasks.pop(task_id, None)
-            self.callbacks.pop(task_id, None)
-            self.results.pop(task_id, None)
-            self.events.pop(task_id, None)
-        
-        if old_tasks:
-            logger.info(f"Cleaned up {len(old_tasks)} old tasks")
+        deadline = self._expiry[0][0]
+        if self._timer is None or self._timer_at is None or deadline < self._timer_at:
+            if self._timer:
+                self._timer.cancel()
+            self._timer_at = deadline
+            self._timer = loop.call_later(max(0.0, deadline - time.monotonic()), self._on_timer)
+
+    def _on_timer(self):
+        """Timer callback: expire due entries and re-arm for the next deadline."""
+        self._timer = None
+        self._timer_at = None
+        self._expire()
+        if self._expiry:
+            deadline = self._expiry[0][0]
+            self._timer_at = deadline
+            self._timer = asyncio.get_running_loop().call_later(
+                max(0.0, deadline - time.monotonic()), self._on_timer
+            )
 
+    def _expire(self):
+        """Remove entries whose deadline has passed; stale heap items are skipped."""
+        now = time.monotonic()
+        expired = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, _, task_id = heapq.heappop(self._expiry)
+            entry = self._entries.get(task_id)
+            if entry and entry.expires_at == expires_at:
+                self._remove(task_id)
+                expired += 1
+        if expired:
+            self._expired_total += expired
+            logger.info(f"Expired {expired} webhook tasks")
@@ -5,12 +5,12 @@ Handles OpenAI-compatible APIs, Codegen API, and other REST endpoints
 
 import asyncio
 import aiohttp
-import json
 import logging
 from typing import Dict, Any, Optional, AsyncGenerator
 from datetime import datetime
 
 from .base_adapter import BaseAdapter, AdapterResponse, AdapterError
+from ..streaming import SSEParser, openai_delta_content
 
 logger = logging.getLogger(__name__)
 
@@ -228,22 +228,14 @@ class RestApiAdapter(BaseAdapter):
                 error_text = await response.text()
                 raise AdapterError(f"API request failed: {error_text}", "API_ERROR")
             
-            async for line in response.content:
-                line = line.decode('utf-8').strip()
-                if line.startswith('data: '):
-                    data_str = line[6:]
-                    if data_str == '[DONE]':
-                        break
-                    
-                    try:
-                        data = json.loads(data_str)
-                        if 'choices' in data and len(data['choices']) > 0:
-                            delta = data['choices'][0].get('delta', {})
-                            content = delta.get('content', '')
-                            if content:
-                                yield content
-                    except json.JSONDecodeError:
-                        continue
+            parser = SSEParser()
+            async for chunk in response.content.iter_any():
+                for event in parser.feed(chunk):
+                    if event.is_done:
+                        return
+                    content = openai_delta_content(event.data)
+                    if content:
+                        yield content
     
     async def _stream_openai_compatible_request(self, message: str, model: str, **kwargs) -> AsyncGenerator[str, None]:
         """Stream request to OpenAI-compatible API"""
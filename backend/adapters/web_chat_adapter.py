@@ -13,6 +13,7 @@ from datetime import datetime
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page
 
 from .base_adapter import BaseAdapter, AdapterResponse, AdapterError
+from ..streaming import PacingConfig, PacingMode, pace_stream
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +31,7 @@ class WebChatAdapter(BaseAdapter):
         self.username = provider_config.get('username')
         self.password = provider_config.get('password')
         self.is_authenticated = False
+        self.pacing = PacingConfig.from_dict(provider_config.get('streaming'), default_mode=PacingMode.COALESCE)
         
     async def initialize(self) -> bool:
         """Initialize browser and authenticate if needed"""
@@ -341,14 +343,12 @@ class WebChatAdapter(BaseAdapter):
         # For web chat, we'll simulate streaming by yielding the complete response
         response = await self.send_message(message, **kwargs)
         
-        # Simulate streaming by yielding chunks
+        # Stream the complete response through the provider's pacing stage
         content = response.content
         chunk_size = 10
-        
-        for i in range(0, len(content), chunk_size):
-            chunk = content[i:i + chunk_size]
+        chunks = [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
+        async for chunk in pace_stream(chunks, self.pacing):
             yield chunk
-            await asyncio.sleep(0.1)  # Simulate streaming delay
     
     async def _send_message_to_interface(self, message: str):
         """Send message to the web chat interface"""
@@ -5,10 +5,12 @@ Uses the Z.ai Python SDK for direct API communication instead of browser automat
 
 import asyncio
 import logging
+from contextlib import aclosing
 from typing import Dict, Any, Optional, AsyncGenerator, List
 from datetime import datetime
 
 from .base_adapter import BaseAdapter, AdapterResponse, AdapterError
+from ..streaming import BackpressureConfig, buffered_stream
 from ..zai_sdk.client import ZAIClient
 from ..zai_sdk.core.exceptions import ZAIError
 from ..zai_sdk.models import ChatCompletionResponse
@@ -25,6 +27,7 @@ class ZaiSdkAdapter(BaseAdapter):
         self.timeout = provider_config.get('timeout_seconds', 180)
         self.auto_auth = provider_config.get('auto_auth', True)
         self.verbose = provider_config.get('verbose', False)
+        self.backpressure = BackpressureConfig.from_dict(provider_config.get('streaming'), BackpressureConfig.from_environment())
         
     async def initialize(self) -> bool:
         """Initialize the Z.ai SDK client"""
@@ -160,21 +163,24 @@ class ZaiSdkAdapter(BaseAdapter):
             messages = [{"role": "user", "content": message}]
             
             full_content = ""
-            async def stream_wrapper():
-                nonlocal full_content
+            # The SDK stream is blocking; it is read on a worker thread, one chunk at a time,
+            # and pauses whenever the client falls a full buffer behind
+            answer_chunks = (
+                chunk.delta_content
                 for chunk in self.client.stream_completion(
                     chat_id=chat_id,
                     messages=messages,
                     model=zai_model,
                     enable_thinking=enable_thinking
-                ):
-                    if chunk.phase == "answer" and chunk.delta_content:
-                        full_content += chunk.delta_content
-                        yield chunk.delta_content
+                )
+                if chunk.phase == "answer" and chunk.delta_content
+            )
             
             # Stream the response
-            async for chunk in stream_wrapper():
-                yield chunk
+            async with aclosing(buffered_stream(answer_chunks, self.backpressure, self.provider_name)) as chunks:
+                async for chunk in chunks:
+                    full_content += chunk
+                    yield chunk
             
             # Add final response to conversation history
             if session_id and full_content:
@@ -9,13 +9,18 @@ from pydantic import BaseModel
 from typing import Dict, Any, List, Optional, Union, AsyncGenerator
 import json
 import logging
+from contextlib import aclosing
 from datetime import datetime
 
 from ..endpoint_manager import get_endpoint_manager
+from ..streaming import BackpressureConfig, buffered_stream
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/v1", tags=["chat"])
 
+# Per-stream buffer limits between the endpoint and the client
+backpressure_config = BackpressureConfig.from_environment()
+
 class ChatMessage(BaseModel):
     role: str
     content: str
@@ -53,8 +58,8 @@ async def create_chat_completion(request: ChatCompletionRequest):
     try:
         manager = get_endpoint_manager()
         
-        # Get the best endpoint for this request
-        best_endpoint = await manager.get_best_endpoint('success_rate')
+        # Pick an endpoint with the load-balancing strategy for this model
+        best_endpoint = await manager.select_endpoint(request.model, "/v1/chat/completions")
         
         if not best_endpoint:
             raise HTTPException(status_code=503, detail="No endpoints available")
@@ -141,20 +146,22 @@ async def _stream_chat_completion(
         
         yield f"data: {initial_chunk.json()}\n\n"
         
-        # Stream content
-        async for chunk in manager.stream_message(endpoint_name, message, **kwargs):
-            stream_chunk = ChatCompletionStreamResponse(
-                id=response_id,
-                created=created,
-                model=request.model,
-                choices=[{
-                    "index": 0,
-                    "delta": {"content": chunk},
-                    "finish_reason": None
-                }]
-            )
-            
-            yield f"data: {stream_chunk.json()}\n\n"
+        # Stream content; upstream reads pause while the client is a full buffer behind
+        upstream = buffered_stream(manager.stream_message(endpoint_name, message, **kwargs), backpressure_config, endpoint_name)
+        async with aclosing(upstream) as chunks:
+            async for chunk in chunks:
+                stream_chunk = ChatCompletionStreamResponse(
+                    id=response_id,
+                    created=created,
+                    model=request.model,
+                    choices=[{
+                        "index": 0,
+                        "delta": {"content": chunk},
+                        "finish_reason": None
+                    }]
+                )
+                
+                yield f"data: {stream_chunk.json()}\n\n"
         
         # Send final chunk
         final_chunk = ChatCompletionStreamResponse(
@@ -18,6 +18,9 @@ from .adapters.base_adapter import BaseAdapter, AdapterResponse
 from .adapters.rest_api_adapter import RestApiAdapter
 from .adapters.web_chat_adapter import WebChatAdapter
 from .adapters.zai_sdk_adapter import ZaiSdkAdapter
+from .routing.circuit_breaker import get_circuit_breakers
+from .routing.load_balancer import get_load_balancer
+from .routing.routing_index import get_routing_index
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +53,7 @@ class EndpointManager:
         self.db_manager = get_database_manager()
         self.active_adapters: Dict[str, BaseAdapter] = {}
         self.active_endpoints: Dict[str, BaseEndpoint] = {}
+        self.endpoints_version = 0  # Bumped on every change to active_endpoints
         self.endpoint_metrics: Dict[str, EndpointMetrics] = {}
         self.is_running = False
         
@@ -264,6 +268,12 @@ class EndpointManager:
             logger.error(f"Failed to stop endpoint {provider_name}: {e}")
             return False
     
+    def _breaker(self, provider_name: str):
+        """Circuit breaker for an adapter (shared with the priority router)"""
+        adapter = self.active_adapters.get(provider_name)
+        overrides = adapter.provider_config.get('circuit_breaker') if adapter else None
+        return get_circuit_breakers().get(provider_name, overrides)
+    
     async def send_message(self, provider_name: str, message: str, **kwargs) -> Optional[AdapterResponse]:
         """Send message to specific endpoint"""
         try:
@@ -273,6 +283,11 @@ class EndpointManager:
             
             adapter = self.active_adapters[provider_name]
             
+            breaker = self._breaker(provider_name)
+            if not breaker.allow_request():
+                logger.warning(f"Endpoint {provider_name} skipped: circuit {breaker.state.value}")
+                return None
+            
             # Update metrics
             metrics = self.endpoint_metrics.get(provider_name)
             if metrics:
@@ -280,9 +295,13 @@ class EndpointManager:
                 metrics.last_request_time = datetime.utcnow().isoformat()
             
             start_time = asyncio.get_event_loop().time()
+            load_balancer = get_load_balancer()
+            started = load_balancer.begin(provider_name)
             
             try:
                 response = await adapter.send_message(message, **kwargs)
+                load_balancer.end(provider_name, started, success=True)
+                breaker.record_success()
                 
                 # Update success metrics
                 if metrics:
@@ -296,6 +315,8 @@ class EndpointManager:
                 return response
                 
             except Exception as e:
+                load_balancer.end(provider_name, started, success=False)
+                breaker.record_failure()
                 # Update failure metrics
                 if metrics:
                     metrics.failed_requests += 1
@@ -316,27 +337,48 @@ class EndpointManager:
             
             adapter = self.active_adapters[provider_name]
             
+            breaker = self._breaker(provider_name)
+            if not breaker.allow_request():
+                logger.warning(f"Endpoint {provider_name} skipped: circuit {breaker.state.value}")
+                return
+            
             # Update metrics
             metrics = self.endpoint_metrics.get(provider_name)
             if metrics:
                 metrics.total_requests += 1
                 metrics.last_request_time = datetime.utcnow().isoformat()
             
+            # Streams count as in flight for load balancing but are not latency samples
+            load_balancer = get_load_balancer()
+            started = load_balancer.begin(provider_name)
+            success = False
+            failed = False
             try:
                 async for chunk in adapter.stream_message(message, **kwargs):
                     yield chunk
+                success = True
                 
                 # Update success metrics
                 if metrics:
                     metrics.successful_requests += 1
                     
             except Exception as e:
+                failed = True
                 # Update failure metrics
                 if metrics:
                     metrics.failed_requests += 1
                 
                 logger.error(f"Streaming failed for endpoint {provider_name}: {e}")
                 raise
+            finally:
+                load_balancer.end(provider_name, started, success=success, sample_latency=False)
+                if success:
+                    breaker.record_success()
+                elif failed:
+                    breaker.record_failure()
+                else:
+                    # Client went away mid-stream: no verdict on the endpoint
+                    breaker.release()
                 
         except Exception as e:
             logger.error(f"Failed to stream message from {provider_name}: {e}")
@@ -413,7 +455,7 @@ class EndpointManager:
         best_score = -1
         
         for name, adapter in self.active_adapters.items():
-            if not adapter.is_initialized:
+            if not adapter.is_initialized or not self._breaker(name).available:
                 continue
             
             metrics = self.endpoint_metrics.get(name)
@@ -436,6 +478,21 @@ class EndpointManager:
         
         return best_endpoint
     
+    async def select_endpoint(self, model: Optional[str] = None, path: Optional[str] = None) -> Optional[str]:
+        """Pick an endpoint for a request with the load-balancing strategy configured for it"""
+        load_balancer = get_load_balancer()
+        if load_balancer.strategy_for(model, path).name == "priority":
+            # Adapters carry no priority, so the default keeps the best-success-rate pick
+            return await self.get_best_endpoint('success_rate')
+        
+        candidates = [
+            {'name': name, 'weight': adapter.provider_config.get('weight', 1.0)}
+            for name, adapter in self.active_adapters.items()
+            if adapter.is_initialized and self._breaker(name).available
+        ]
+        ordered = load_balancer.order(candidates, model=model, path=path)
+        return ordered[0]['name'] if ordered else None
+    
     # New server-based methods
     async def add_endpoint_server(self, name: str, provider_type: str, config: Dict[str, Any], priority: int = 50) -> bool:
         """Add new endpoint using server architecture"""
@@ -479,6 +536,7 @@ class EndpointManager:
                 # Start endpoint
                 if await endpoint.start():
                     self.active_endpoints[name] = endpoint
+                    self.endpoint_changed(name)
                     logger.info(f"Added and started endpoint: {name} (priority: {priority})")
                     return True
                 else:
@@ -497,6 +555,7 @@ class EndpointManager:
                     'priority': priority,
                     'status': 'running'
                 }
+                self.endpoint_changed(name)
                 
                 logger.info(f"Added basic endpoint: {name} (priority: {priority})")
                 return True
@@ -515,6 +574,7 @@ class EndpointManager:
             endpoint = self.active_endpoints[name]
             await endpoint.stop()
             del self.active_endpoints[name]
+            self.endpoint_changed(name)
             
             logger.info(f"Removed endpoint: {name}")
             return True
@@ -523,6 +583,23 @@ class EndpointManager:
             logger.error(f"Failed to remove endpoint {name}: {e}")
             return False
     
+    def endpoint_changed(self, name: str):
+        """
+        Record that an endpoint was added, removed, replaced or reconfigured
+        (priority, model, aliases): bumps endpoints_version and re-indexes it
+        """
+        index = get_routing_index()
+        in_sync = index.registry_version == self.endpoints_version
+        self.endpoints_version += 1
+        endpoint = self.active_endpoints.get(name)
+        if endpoint is None:
+            index.remove(name)
+        else:
+            index.add(endpoint)
+        if in_sync:
+            # Otherwise the index was already stale and the router rebuilds it
+            index.registry_version = self.endpoints_version
+    
     async def start_endpoint_server(self, name: str) -> bool:
         """Start endpoint using server architecture"""
         try:
@@ -16,8 +16,15 @@ from .endpoint_manager import get_endpoint_manager
 from .api.endpoints import router as endpoints_router
 from .api.chat import router as chat_router
 from .api.config import router as config_router
+from .middleware.compression import CompressionConfig, CompressionMiddleware, get_compression_stats
 from .middleware.request_interceptor import UniversalRequestInterceptor
 from .config.default_endpoints import DefaultEndpointsConfig
+from .routing.circuit_breaker import get_circuit_breakers
+from .routing.health_cache import get_health_cache
+from .routing.hedging import get_hedger
+from .routing.load_balancer import get_load_balancer
+from .routing.routing_index import get_routing_index
+from .streaming import get_backpressure_monitor
 from typing import Optional
 
 # Configure logging
@@ -47,6 +54,9 @@ async def lifespan(app: FastAPI):
         results = await default_config.initialize_default_endpoints(endpoint_manager)
         logger.info(f"Default endpoints initialized: {results}")
         
+        # Keep router health state current in the background
+        get_health_cache(endpoint_manager).start()
+        
         yield
         
     except Exception as e:
@@ -55,6 +65,7 @@ async def lifespan(app: FastAPI):
     finally:
         # Cleanup
         logger.info("Shutting down...")
+        await get_health_cache().stop()
         endpoint_manager = get_endpoint_manager()
         await endpoint_manager.stop()
         logger.info("Endpoint Manager stopped")
@@ -80,6 +91,10 @@ app.add_middleware(
 endpoint_manager = get_endpoint_manager()
 app.add_middleware(UniversalRequestInterceptor, endpoint_manager=endpoint_manager)
 
+# Compress responses the client accepts (per-event flush for SSE); outermost so
+# responses produced by the interceptor are covered too
+app.add_middleware(CompressionMiddleware, config=CompressionConfig.from_environment())
+
 # Include API routers
 app.include_router(config_router)
 app.include_router(endpoints_router)
@@ -217,6 +232,13 @@ async def system_status():
                 "total_requests": total_requests,
                 "average_success_rate": round(avg_success_rate, 2)
             },
+            "streaming": get_backpressure_monitor().get_stats(),
+            "compression": get_compression_stats().get_stats(),
+            "health": get_health_cache().get_stats(),
+            "load_balancing": get_load_balancer().get_stats(),
+            "hedging": get_hedger().get_stats(),
+            "circuit_breakers": get_circuit_breakers().get_stats(),
+            "routing_index": get_routing_index().get_stats(),
             "endpoints": endpoints
         }
     except Exception as e:
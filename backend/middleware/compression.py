@@ -0,0 +1,345 @@
+"""
+Response compression negotiated on Accept-Encoding (brotli when installed, gzip).
+Single-body responses (e.g. non-streamed completions) are compressed once they
+pass a size threshold; streamed responses such as SSE are flushed after every
+write so each event reaches the client without waiting for more output.
+"""
+
+import logging
+import os
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Content types worth compressing (prefix match on the media type)
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+)
+
+
+@dataclass
+class CompressionConfig:
+    """Compression settings shared by both servers"""
+    enabled: bool = True
+    minimum_size: int = 1024
+    gzip_level: int = 6
+    brotli_quality: int = 4
+    encodings: Tuple[str, ...] = ("br", "gzip")  # Server preference order
+    compress_streams: bool = True
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "CompressionConfig":
+        """
+        Build from a settings dict.
+
+        Args:
+            data: e.g. {"enabled": True, "minimum_size_bytes": 1024, "gzip_level": 6,
+                  "brotli_quality": 4, "encodings": "br,gzip", "compress_streams": True}
+
+        Returns:
+            CompressionConfig: Parsed settings
+        """
+        data = data or {}
+        defaults = cls()
+        encodings = data.get("encodings", defaults.encodings)
+        if isinstance(encodings, str):
+            encodings = encodings.split(",")
+        encodings = tuple(e.strip().lower() for e in encodings if e.strip().lower() in ("br", "gzip"))
+        return cls(
+            enabled=_as_bool(data.get("enabled", defaults.enabled)),
+            minimum_size=max(0, int(data.get("minimum_size_bytes", defaults.minimum_size))),
+            gzip_level=min(9, max(1, int(data.get("gzip_level", defaults.gzip_level)))),
+            brotli_quality=min(11, max(0, int(data.get("brotli_quality", defaults.brotli_quality)))),
+            encodings=encodings,
+            compress_streams=_as_bool(data.get("compress_streams", defaults.compress_streams))
+        )
+
+    @classmethod
+    def from_environment(cls) -> "CompressionConfig":
+        """Settings from COMPRESSION_ENABLED, COMPRESSION_MIN_BYTES, COMPRESSION_GZIP_LEVEL,
+        COMPRESSION_BROTLI_QUALITY, COMPRESSION_ENCODINGS and COMPRESSION_STREAMS."""
+        return cls.from_dict({
+            key: value for key, value in {
+                "enabled": os.getenv("COMPRESSION_ENABLED"),
+                "minimum_size_bytes": os.getenv("COMPRESSION_MIN_BYTES"),
+                "gzip_level": os.getenv("COMPRESSION_GZIP_LEVEL"),
+                "brotli_quality": os.getenv("COMPRESSION_BROTLI_QUALITY"),
+                "encodings": os.getenv("COMPRESSION_ENCODINGS"),
+                "compress_streams": os.getenv("COMPRESSION_STREAMS")
+            }.items() if value
+        })
+
+    @property
+    def available_encodings(self) -> Tuple[str, ...]:
+        """Configured encodings this process can actually produce."""
+        return tuple(e for e in self.encodings if e != "br" or BROTLI_AVAILABLE)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "minimum_size_bytes": self.minimum_size,
+            "gzip_level": self.gzip_level,
+            "brotli_quality": self.brotli_quality,
+            "encodings": list(self.available_encodings),
+            "compress_streams": self.compress_streams
+        }
+
+
+def _as_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def negotiate_encoding(accept_encoding: str, available: Sequence[str]) -> Optional[str]:
+    """
+    Pick a content coding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Header value, e.g. "gzip, deflate, br;q=0.9"
+        available: Codings we can produce, in server preference order
+
+    Returns:
+        The coding with the highest q-value (ties go to server preference), or
+        None when the client accepts none of them
+    """
+    qualities: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[coding] = q
+
+    best: Optional[str] = None
+    best_q = 0.0
+    for coding in available:
+        q = qualities.get(coding, qualities.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressionStats:
+    """Bytes saved and CPU time spent compressing, per coding"""
+
+    def __init__(self):
+        self.responses_compressed = 0
+        self.streams_compressed = 0
+        self.skipped: Dict[str, int] = {}
+        self.by_encoding: Dict[str, Dict[str, float]] = {}
+
+    def skip(self, reason: str):
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int, cpu_seconds: float):
+        totals = self.by_encoding.get(encoding)
+        if totals is None:
+            totals = self.by_encoding[encoding] = {"bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0}
+        totals["bytes_in"] += bytes_in
+        totals["bytes_out"] += bytes_out
+        totals["cpu_seconds"] += cpu_seconds
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get compression totals across all responses"""
+        bytes_in = sum(t["bytes_in"] for t in self.by_encoding.values())
+        bytes_out = sum(t["bytes_out"] for t in self.by_encoding.values())
+        cpu_seconds = sum(t["cpu_seconds"] for t in self.by_encoding.values())
+        return {
+            "responses_compressed": self.responses_compressed,
+            "streams_compressed": self.streams_compressed,
+            "skipped": dict(self.skipped),
+            "bytes_in": bytes_in,
+            "bytes_out": bytes_out,
+            "bytes_saved": bytes_in - bytes_out,
+            "ratio": round(bytes_out / bytes_in, 3) if bytes_in else None,
+            "cpu_seconds": round(cpu_seconds, 4),
+            "encodings": {
+                encoding: {**totals, "cpu_seconds": round(totals["cpu_seconds"], 4)}
+                for encoding, totals in self.by_encoding.items()
+            }
+        }
+
+
+# Global stats instance
+_stats: Optional[CompressionStats] = None
+
+
+def get_compression_stats() -> CompressionStats:
+    """Get the global compression stats instance"""
+    global _stats
+    if _stats is None:
+        _stats = CompressionStats()
+    return _stats
+
+
+class _Compressor:
+    """Incremental compressor for one response"""
+
+    def __init__(self, encoding: str, config: CompressionConfig):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(mode=brotli.MODE_TEXT, quality=config.brotli_quality)
+        else:
+            self._gzip = zlib.compressobj(config.gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool = True) -> bytes:
+        """Compress a piece of the body; with flush, everything so far is decodable by the client."""
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + self._brotli.flush() if flush else out
+        out = self._gzip.compress(data)
+        return out + self._gzip.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._gzip.compress(data) + self._gzip.flush(zlib.Z_FINISH)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses the client accepts.
+
+    A response whose body arrives in one message is compressed whole when it
+    is at least minimum_size bytes and compression actually shrinks it. A
+    response whose body arrives in several messages (StreamingResponse, SSE)
+    is compressed as a stream with a flush after every message.
+    """
+
+    def __init__(self, app, config: Optional[CompressionConfig] = None):
+        self.app = app
+        self.config = config or CompressionConfig.from_environment()
+        self.stats = get_compression_stats()
+        self.encodings = self.config.available_encodings
+        if self.config.enabled:
+            logger.info(f"Response compression enabled: {', '.join(self.encodings) or 'none'} (min {self.config.minimum_size} bytes)")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.config.enabled or not self.encodings:
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        responder = _CompressionResponder(send, encoding, self.config, self.stats)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Per-response state: holds the start message until the first body message decides the mode"""
+
+    def __init__(self, send, encoding: Optional[str], config: CompressionConfig, stats: CompressionStats):
+        self._send = send
+        self.encoding = encoding
+        self.config = config
+        self.stats = stats
+        self.start_message: Optional[Dict[str, Any]] = None
+        self.compressor: Optional[_Compressor] = None
+        self.decided = False
+
+    async def send(self, message):
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            self.start_message = message
+            return
+        if message_type != "http.response.body":
+            await self._send(message)
+            return
+        if not self.decided:
+            self.decided = True
+            await self._first_body(message)
+        elif self.compressor is not None:
+            await self._stream_body(message)
+        else:
+            await self._send(message)
+
+    async def _first_body(self, message):
+        start = self.start_message
+        headers = MutableHeaders(raw=start["headers"])
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        reason = self._skip_reason(start["status"], headers, len(body), more_body)
+        if reason is not None:
+            if reason != "content_type":
+                headers.add_vary_header("Accept-Encoding")
+            self.stats.skip(reason)
+            await self._send(start)
+            await self._send(message)
+            return
+
+        if not more_body:
+            compressor = _Compressor(self.encoding, self.config)
+            cpu_start = time.thread_time()
+            compressed = compressor.finish(body)
+            self.stats.record(self.encoding, len(body), len(compressed), time.thread_time() - cpu_start)
+            headers.add_vary_header("Accept-Encoding")
+            if len(compressed) >= len(body):
+                self.stats.skip("incompressible")
+                await self._send(start)
+                await self._send(message)
+                return
+            self.stats.responses_compressed += 1
+            headers["Content-Encoding"] = self.encoding
+            headers["Content-Length"] = str(len(compressed))
+            await self._send(start)
+            await self._send({"type": "http.response.body", "body": compressed})
+            return
+
+        self.compressor = _Compressor(self.encoding, self.config)
+        self.stats.streams_compressed += 1
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if "content-length" in headers:
+            del headers["content-length"]
+        await self._send(start)
+        await self._stream_body(message)
+
+    def _skip_reason(self, status: int, headers: MutableHeaders, size: int, more_body: bool) -> Optional[str]:
+        """Why this response goes out uncompressed, or None to compress it."""
+        media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        if not media_type.startswith(COMPRESSIBLE_TYPES):
+            return "content_type"
+        if self.encoding is None:
+            return "not_accepted"
+        if "content-encoding" in headers or status in (204, 304) or status < 200:
+            return "already_encoded"
+        if more_body:
+            return None if self.config.compress_streams else "stream"
+        if size < self.config.minimum_size:
+            return "below_minimum"
+        return None
+
+    async def _stream_body(self, message):
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not body and more_body:
+            await self._send(message)
+            return
+        cpu_start = time.thread_time()
+        compressed = self.compressor.compress(body) if more_body else self.compressor.finish(body)
+        self.stats.record(self.encoding, len(body), len(compressed), time.thread_time() - cpu_start)
+        await self._send({"type": "http.response.body", "body": compressed, "more_body": more_body})
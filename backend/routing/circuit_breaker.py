@@ -0,0 +1,306 @@
+"""
+Circuit Breaker - Stops sending traffic to failing endpoints
+Closed -> open when the error rate over a rolling window (or a run of consecutive
+failures) crosses a threshold; open -> half-open after a cooldown, when a few
+trial requests decide between closing again and reopening with a longer cooldown.
+"""
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState(Enum):
+    """Breaker state"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@dataclass
+class BreakerConfig:
+    """Thresholds for one breaker"""
+    window_seconds: float = 60.0  # Rolling window for the error rate
+    bucket_seconds: float = 5.0  # Window granularity
+    failure_rate_threshold: float = 50.0  # Percent of failed requests in the window that opens the circuit
+    minimum_requests: int = 10  # Requests in the window before the rate is trusted
+    consecutive_failures: int = 5  # Opens regardless of volume
+    open_seconds: float = 30.0  # First cooldown
+    max_open_seconds: float = 300.0  # Cooldown doubles after each failed trial, up to this
+    half_open_max_calls: int = 3  # Trial requests let through; all must succeed to close
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]], base: Optional["BreakerConfig"] = None) -> "BreakerConfig":
+        """
+        Build from a settings dict, e.g. an endpoint's `circuit_breaker` config.
+
+        Args:
+            data: Any subset of the field names
+            base: Values for keys missing from data (defaults if None)
+
+        Returns:
+            BreakerConfig: Parsed settings
+        """
+        values = asdict(base or cls())
+        for item in fields(cls):
+            if data and data.get(item.name) is not None:
+                values[item.name] = type(values[item.name])(data[item.name])
+        values["bucket_seconds"] = max(0.1, min(values["bucket_seconds"], values["window_seconds"]))
+        values["half_open_max_calls"] = max(1, values["half_open_max_calls"])
+        values["consecutive_failures"] = max(1, values["consecutive_failures"])
+        return cls(**values)
+
+    @classmethod
+    def from_environment(cls) -> "BreakerConfig":
+        """Settings from BREAKER_WINDOW_SECONDS, BREAKER_BUCKET_SECONDS, BREAKER_FAILURE_RATE,
+        BREAKER_MIN_REQUESTS, BREAKER_CONSECUTIVE_FAILURES, BREAKER_OPEN_SECONDS,
+        BREAKER_MAX_OPEN_SECONDS and BREAKER_HALF_OPEN_CALLS."""
+        return cls.from_dict({
+            "window_seconds": os.getenv("BREAKER_WINDOW_SECONDS"),
+            "bucket_seconds": os.getenv("BREAKER_BUCKET_SECONDS"),
+            "failure_rate_threshold": os.getenv("BREAKER_FAILURE_RATE"),
+            "minimum_requests": os.getenv("BREAKER_MIN_REQUESTS"),
+            "consecutive_failures": os.getenv("BREAKER_CONSECUTIVE_FAILURES"),
+            "open_seconds": os.getenv("BREAKER_OPEN_SECONDS"),
+            "max_open_seconds": os.getenv("BREAKER_MAX_OPEN_SECONDS"),
+            "half_open_max_calls": os.getenv("BREAKER_HALF_OPEN_CALLS")
+        })
+
+
+class CircuitBreaker:
+    """
+    Breaker for one endpoint.
+
+    Callers check allow_request() before sending (in half-open this takes one
+    of the trial slots), then report record_success(), record_failure(), or
+    release() if the request was never sent or was abandoned.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        config: Optional[BreakerConfig] = None,
+        on_transition: Optional[Callable[["CircuitBreaker", CircuitState, CircuitState, str], None]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.config = config or BreakerConfig()
+        self.on_transition = on_transition
+        self.clock = clock
+
+        self.state = CircuitState.CLOSED
+        self._buckets: Deque[List[int]] = deque()  # [bucket index, successes, failures]
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._cooldown = self.config.open_seconds
+        self._trials_started = 0
+        self._trials_succeeded = 0
+
+        self.times_opened = 0
+        self.rejected = 0
+
+    # --- rolling window ---
+
+    def _bucket(self, now: float) -> List[int]:
+        index = int(now // self.config.bucket_seconds)
+        if not self._buckets or self._buckets[-1][0] != index:
+            self._buckets.append([index, 0, 0])
+        self._prune(index)
+        return self._buckets[-1]
+
+    def _prune(self, index: int):
+        oldest = index - int(self.config.window_seconds // self.config.bucket_seconds) + 1
+        while self._buckets and self._buckets[0][0] < oldest:
+            self._buckets.popleft()
+
+    def window_counts(self) -> Dict[str, int]:
+        """Successes and failures in the rolling window."""
+        self._prune(int(self.clock() // self.config.bucket_seconds))
+        return {
+            "successes": sum(b[1] for b in self._buckets),
+            "failures": sum(b[2] for b in self._buckets)
+        }
+
+    def failure_rate(self) -> float:
+        """Percent of requests in the window that failed."""
+        counts = self.window_counts()
+        total = counts["successes"] + counts["failures"]
+        return counts["failures"] / total * 100 if total else 0.0
+
+    # --- state machine ---
+
+    def _transition(self, new_state: CircuitState, reason: str):
+        old_state = self.state
+        self.state = new_state
+        if new_state == CircuitState.OPEN:
+            self._opened_at = self.clock()
+            self.times_opened += 1
+        if new_state == CircuitState.HALF_OPEN:
+            self._trials_started = 0
+            self._trials_succeeded = 0
+        if new_state == CircuitState.CLOSED:
+            self._buckets.clear()
+            self._consecutive_failures = 0
+            self._cooldown = self.config.open_seconds
+        log = logger.info if new_state == CircuitState.CLOSED else logger.warning
+        log(f"Circuit breaker {self.name}: {old_state.value} -> {new_state.value} ({reason})")
+        if self.on_transition:
+            self.on_transition(self, old_state, new_state, reason)
+
+    def _cooldown_elapsed(self) -> bool:
+        return self.clock() - self._opened_at >= self._cooldown
+
+    @property
+    def available(self) -> bool:
+        """Whether allow_request() would currently succeed (no slot is taken)."""
+        if self.state == CircuitState.OPEN:
+            return self._cooldown_elapsed()
+        if self.state == CircuitState.HALF_OPEN:
+            return self._trials_started < self.config.half_open_max_calls
+        return True
+
+    def allow_request(self) -> bool:
+        """
+        Ask to send a request.
+
+        Returns:
+            bool: True if the request may go out; in half-open this takes a trial slot
+        """
+        if self.state == CircuitState.OPEN and self._cooldown_elapsed():
+            self._transition(CircuitState.HALF_OPEN, f"cooldown of {self._cooldown:g}s elapsed")
+        if self.state == CircuitState.OPEN:
+            self.rejected += 1
+            return False
+        if self.state == CircuitState.HALF_OPEN:
+            if self._trials_started >= self.config.half_open_max_calls:
+                self.rejected += 1
+                return False
+            self._trials_started += 1
+        return True
+
+    def release(self):
+        """Give back a trial slot for a request that produced no outcome."""
+        if self.state == CircuitState.HALF_OPEN and self._trials_started > self._trials_succeeded:
+            self._trials_started -= 1
+
+    def record_success(self):
+        now = self.clock()
+        self._bucket(now)[1] += 1
+        self._consecutive_failures = 0
+        if self.state == CircuitState.HALF_OPEN:
+            self._trials_succeeded += 1
+            if self._trials_succeeded >= self.config.half_open_max_calls:
+                self._transition(CircuitState.CLOSED, f"{self._trials_succeeded} trial requests succeeded")
+
+    def record_failure(self):
+        now = self.clock()
+        self._bucket(now)[2] += 1
+        self._consecutive_failures += 1
+        if self.state == CircuitState.HALF_OPEN:
+            # Back off harder on a provider that is still failing
+            self._cooldown = min(self.config.max_open_seconds, self._cooldown * 2)
+            self._transition(CircuitState.OPEN, "trial request failed")
+            return
+        if self.state != CircuitState.CLOSED:
+            return
+        if self._consecutive_failures >= self.config.consecutive_failures:
+            self._transition(CircuitState.OPEN, f"{self._consecutive_failures} consecutive failures")
+            return
+        counts = self.window_counts()
+        total = counts["successes"] + counts["failures"]
+        if total >= self.config.minimum_requests:
+            rate = counts["failures"] / total * 100
+            if rate >= self.config.failure_rate_threshold:
+                self._transition(CircuitState.OPEN, f"{rate:.0f}% of {total} requests failed in {self.config.window_seconds:.0f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get breaker state and window counts"""
+        counts = self.window_counts()
+        stats = {
+            "state": self.state.value,
+            "failure_rate": round(self.failure_rate(), 1),
+            "window_successes": counts["successes"],
+            "window_failures": counts["failures"],
+            "consecutive_failures": self._consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
+        if self.state == CircuitState.OPEN:
+            stats["retry_in_seconds"] = round(max(0.0, self._cooldown - (self.clock() - self._opened_at)), 1)
+        if self.state == CircuitState.HALF_OPEN:
+            stats["trials"] = f"{self._trials_succeeded}/{self.config.half_open_max_calls}"
+        return stats
+
+
+class CircuitBreakerRegistry:
+    """One breaker per endpoint, shared by PriorityRouter and EndpointManager"""
+
+    def __init__(self, config: Optional[BreakerConfig] = None, history: int = 100):
+        self.config = config or BreakerConfig.from_environment()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.transitions: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.listeners: List[Callable[[CircuitBreaker, CircuitState, CircuitState, str], None]] = []
+
+    def get(self, name: str, overrides: Optional[Dict[str, Any]] = None) -> CircuitBreaker:
+        """
+        Get (or create) an endpoint's breaker.
+
+        Args:
+            name: Endpoint name
+            overrides: Per-endpoint thresholds (the endpoint's `circuit_breaker`
+                config), applied when the breaker is created
+
+        Returns:
+            CircuitBreaker: The endpoint's breaker
+        """
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            config = BreakerConfig.from_dict(overrides, self.config) if overrides else self.config
+            breaker = self.breakers[name] = CircuitBreaker(name, config, self._on_transition)
+        return breaker
+
+    def add_listener(self, callback: Callable[[CircuitBreaker, CircuitState, CircuitState, str], None]):
+        """Call callback(breaker, old_state, new_state, reason) on every state change."""
+        self.listeners.append(callback)
+
+    def _on_transition(self, breaker: CircuitBreaker, old_state: CircuitState, new_state: CircuitState, reason: str):
+        self.transitions.append({
+            "endpoint": breaker.name,
+            "from": old_state.value,
+            "to": new_state.value,
+            "reason": reason,
+            "at": datetime.utcnow().isoformat()
+        })
+        for callback in self.listeners:
+            try:
+                callback(breaker, old_state, new_state, reason)
+            except Exception as e:
+                logger.error(f"Circuit breaker listener error: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get every breaker's state and the recent transitions"""
+        breakers = {name: breaker.get_stats() for name, breaker in self.breakers.items()}
+        return {
+            "open": [name for name, stats in breakers.items() if stats["state"] == CircuitState.OPEN.value],
+            "half_open": [name for name, stats in breakers.items() if stats["state"] == CircuitState.HALF_OPEN.value],
+            "breakers": breakers,
+            "transitions": list(self.transitions)
+        }
+
+
+# Global registry instance
+_registry: Optional[CircuitBreakerRegistry] = None
+
+
+def get_circuit_breakers() -> CircuitBreakerRegistry:
+    """Get the global circuit breaker registry"""
+    global _registry
+    if _registry is None:
+        _registry = CircuitBreakerRegistry()
+    return _registry
@@ -0,0 +1,243 @@
+"""
+Health-State Cache - Endpoint health for routing without a live check per request
+A background prober and real request outcomes keep the cache current; the router
+only reads it. Probes are skipped for endpoints that recently served real traffic.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HealthCacheConfig:
+    """Probe cadence and staleness bounds"""
+    probe_interval: float = 60.0  # Seconds between probes of an endpoint without recent traffic
+    max_staleness: float = 300.0  # Older entries are treated as unknown
+    failure_threshold: int = 3  # Consecutive real-request failures before an endpoint is marked unhealthy
+    unknown_is_available: bool = True  # Route to endpoints with no fresh health data
+    max_concurrent_probes: int = 4
+
+    @classmethod
+    def from_environment(cls) -> "HealthCacheConfig":
+        """Settings from HEALTH_PROBE_INTERVAL, HEALTH_MAX_STALENESS, HEALTH_FAILURE_THRESHOLD,
+        HEALTH_UNKNOWN_AVAILABLE and HEALTH_MAX_CONCURRENT_PROBES."""
+        defaults = cls()
+        return cls(
+            probe_interval=float(os.getenv("HEALTH_PROBE_INTERVAL", defaults.probe_interval)),
+            max_staleness=float(os.getenv("HEALTH_MAX_STALENESS", defaults.max_staleness)),
+            failure_threshold=max(1, int(os.getenv("HEALTH_FAILURE_THRESHOLD", defaults.failure_threshold))),
+            unknown_is_available=os.getenv("HEALTH_UNKNOWN_AVAILABLE", "true").lower() == "true",
+            max_concurrent_probes=max(1, int(os.getenv("HEALTH_MAX_CONCURRENT_PROBES", defaults.max_concurrent_probes)))
+        )
+
+
+@dataclass
+class HealthEntry:
+    """Last known health of one endpoint"""
+    healthy: bool
+    updated_at: float  # time.monotonic()
+    source: str  # "probe" or "request"
+    consecutive_failures: int = 0
+    last_error: Optional[str] = None
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "age_seconds": round(now - self.updated_at, 1),
+            "source": self.source,
+            "consecutive_failures": self.consecutive_failures,
+            "last_error": self.last_error
+        }
+
+
+class HealthCache:
+    """
+    Cached endpoint health, read in O(1) by the router.
+
+    Entries come from two places: the background prober (a real health check,
+    at most once per probe_interval per endpoint) and passive updates from
+    routed requests. An entry older than max_staleness counts as unknown.
+    """
+
+    def __init__(self, endpoint_manager, config: Optional[HealthCacheConfig] = None):
+        self.endpoint_manager = endpoint_manager
+        self.config = config or HealthCacheConfig.from_environment()
+        self.entries: Dict[str, HealthEntry] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._wake = asyncio.Event()
+
+        self.lookups = 0
+        self.stale_lookups = 0
+        self.probes = 0
+        self.probe_failures = 0
+        self.probes_skipped = 0
+        self.passive_updates = 0
+        # (minute index, lookups, probes) for the last few minutes
+        self._minutes: Deque[List[int]] = deque(maxlen=10)
+
+    def _tally(self, lookups: int = 0, probes: int = 0):
+        minute = int(time.monotonic() // 60)
+        if not self._minutes or self._minutes[-1][0] != minute:
+            self._minutes.append([minute, 0, 0])
+        self._minutes[-1][1] += lookups
+        self._minutes[-1][2] += probes
+
+    def is_available(self, name: str) -> bool:
+        """
+        Cached availability of an endpoint (no I/O).
+
+        Args:
+            name: Endpoint name
+
+        Returns:
+            bool: The cached health, or unknown_is_available when there is no
+                entry or it is older than max_staleness
+        """
+        self.lookups += 1
+        self._tally(lookups=1)
+        entry = self.entries.get(name)
+        if entry is None or time.monotonic() - entry.updated_at > self.config.max_staleness:
+            self.stale_lookups += 1
+            # Ask the prober to refresh this endpoint ahead of its schedule
+            self._wake.set()
+            return self.config.unknown_is_available
+        return entry.healthy
+
+    def record_success(self, name: str):
+        """Passive update: a routed request to this endpoint succeeded."""
+        self.passive_updates += 1
+        self._update(name, True, "request")
+
+    def record_failure(self, name: str, error: Optional[str] = None):
+        """Passive update: a routed request failed; unhealthy after failure_threshold in a row."""
+        self.passive_updates += 1
+        entry = self.entries.get(name)
+        failures = (entry.consecutive_failures if entry else 0) + 1
+        healthy = failures < self.config.failure_threshold and (entry.healthy if entry else True)
+        self._update(name, healthy, "request", failures, error)
+
+    def _update(self, name: str, healthy: bool, source: str, failures: int = 0, error: Optional[str] = None):
+        self.entries[name] = HealthEntry(healthy, time.monotonic(), source, failures, error)
+
+        # Keep the endpoint's own health field (shown in the UI, logged on change) in step
+        endpoint = getattr(self.endpoint_manager, "active_endpoints", {}).get(name)
+        if endpoint is not None and hasattr(endpoint, "update_health"):
+            from ..servers.base_endpoint import EndpointHealth
+            endpoint.update_health(EndpointHealth.HEALTHY if healthy else EndpointHealth.UNHEALTHY)
+
+    async def probe(self, name: str) -> bool:
+        """Run a real health check for one endpoint and cache the result."""
+        self.probes += 1
+        self._tally(probes=1)
+        try:
+            result = await self.endpoint_manager.health_check_endpoint_server(name)
+            healthy = bool(result.get("healthy"))
+            error = result.get("error")
+        except Exception as e:
+            healthy, error = False, str(e)
+        if not healthy:
+            self.probe_failures += 1
+        self._update(name, healthy, "probe", 0 if healthy else 1, error)
+        return healthy
+
+    def _due(self, now: float) -> List[str]:
+        """Endpoints whose entry is missing or older than probe_interval."""
+        active = list(getattr(self.endpoint_manager, "active_endpoints", {}))
+        for name in set(self.entries) - set(active):
+            # Endpoint was removed
+            del self.entries[name]
+
+        due = []
+        for name in active:
+            entry = self.entries.get(name)
+            if entry is None or now - entry.updated_at >= self.config.probe_interval:
+                due.append(name)
+            elif entry.source == "request":
+                # Fresh real traffic stands in for this round's probe
+                self.probes_skipped += 1
+        return due
+
+    async def _probe_loop(self):
+        semaphore = asyncio.Semaphore(self.config.max_concurrent_probes)
+
+        async def bounded_probe(name: str):
+            async with semaphore:
+                await self.probe(name)
+
+        while True:
+            try:
+                now = time.monotonic()
+                due = self._due(now)
+                if due:
+                    await asyncio.gather(*(bounded_probe(name) for name in due))
+                # Sleep until the oldest entry comes due, or until a lookup finds a stale entry
+                ages = [now - e.updated_at for e in self.entries.values()]
+                delay = self.config.probe_interval - max(ages, default=0.0)
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=max(1.0, min(delay, self.config.probe_interval)))
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Health prober error: {e}")
+                await asyncio.sleep(self.config.probe_interval)
+
+    def start(self):
+        """Start the background prober (idempotent)."""
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._probe_loop())
+            logger.info(f"Health prober started (every {self.config.probe_interval}s per idle endpoint)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache state plus probe savings (each lookup used to be a live check)"""
+        now = time.monotonic()
+        current = int(now // 60)
+        completed = [m for m in self._minutes if m[0] < current]
+        saved_per_minute = (
+            sum(m[1] - m[2] for m in completed) / len(completed) if completed else None
+        )
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "probe_interval_seconds": self.config.probe_interval,
+            "max_staleness_seconds": self.config.max_staleness,
+            "lookups": self.lookups,
+            "stale_lookups": self.stale_lookups,
+            "probes": self.probes,
+            "probe_failures": self.probe_failures,
+            "probes_skipped": self.probes_skipped,
+            "passive_updates": self.passive_updates,
+            "probes_saved": self.lookups - self.probes,
+            # Average over the completed minutes held (up to 10); None during the first minute
+            "probes_saved_per_minute": round(saved_per_minute, 1) if saved_per_minute is not None else None,
+            "endpoints": {name: entry.to_dict(now) for name, entry in self.entries.items()}
+        }
+
+
+# Global health cache instance
+_health_cache: Optional[HealthCache] = None
+
+
+def get_health_cache(endpoint_manager=None) -> HealthCache:
+    """Get the global health cache instance"""
+    global _health_cache
+    if _health_cache is None:
+        if endpoint_manager is None:
+            from ..endpoint_manager import get_endpoint_manager
+            endpoint_manager = get_endpoint_manager()
+        _health_cache = HealthCache(endpoint_manager)
+    return _health_cache
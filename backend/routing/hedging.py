@@ -0,0 +1,215 @@
+"""
+Request Hedging - Races a backup endpoint against a slow primary
+If the primary has not answered by its observed latency percentile, the same
+request goes to the next endpoint in line; the first answer wins and the other
+attempt is cancelled. A per-endpoint budget caps the extra load hedges add.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class HedgeConfig:
+    """When to hedge and how much extra load hedges may add"""
+    enabled: bool = True
+    percentile: float = 95.0  # Hedge once the primary is slower than this percentile of its latency
+    budget_percent: float = 10.0  # Hedges per endpoint at most this share of its requests
+    budget_burst: float = 5.0  # Unused budget saved up, in hedges
+    min_samples: int = 20  # Latency samples needed before an endpoint is hedged
+    min_delay: float = 1.0  # Never hedge sooner than this many seconds
+    window: int = 200  # Latency samples kept per endpoint
+
+    @classmethod
+    def from_environment(cls) -> "HedgeConfig":
+        """Settings from HEDGE_ENABLED, HEDGE_PERCENTILE, HEDGE_BUDGET_PERCENT, HEDGE_BUDGET_BURST,
+        HEDGE_MIN_SAMPLES and HEDGE_MIN_DELAY_SECONDS."""
+        defaults = cls()
+        return cls(
+            enabled=os.getenv("HEDGE_ENABLED", "true").lower() == "true",
+            percentile=min(99.9, max(50.0, float(os.getenv("HEDGE_PERCENTILE", defaults.percentile)))),
+            budget_percent=max(0.0, float(os.getenv("HEDGE_BUDGET_PERCENT", defaults.budget_percent))),
+            budget_burst=max(1.0, float(os.getenv("HEDGE_BUDGET_BURST", defaults.budget_burst))),
+            min_samples=max(1, int(os.getenv("HEDGE_MIN_SAMPLES", defaults.min_samples))),
+            min_delay=max(0.0, float(os.getenv("HEDGE_MIN_DELAY_SECONDS", defaults.min_delay)))
+        )
+
+
+@dataclass
+class EndpointHedgeState:
+    """Latency window, hedge budget and counters for one primary endpoint"""
+    latencies: Deque[float] = field(default_factory=deque)
+    credits: float = 0.0
+    requests: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0  # Backup answered first
+    primary_wins: int = 0  # Primary answered first after all
+    budget_denied: int = 0
+
+
+@dataclass
+class HedgeOutcome:
+    """Result of one (possibly hedged) attempt"""
+    endpoint: Optional[Dict[str, Any]]  # The endpoint whose response is returned
+    response: Optional[Dict[str, Any]]
+    attempted: List[Dict[str, Any]]  # Primary, plus the backup if a hedge fired
+    failed: List[Dict[str, Any]]  # Attempts that finished without a response
+
+
+class Hedger:
+    """
+    Runs router attempts with hedging.
+
+    Each request to an endpoint earns it budget_percent / 100 of a hedge
+    (saved up to budget_burst); firing a hedge spends one.
+    """
+
+    def __init__(self, config: Optional[HedgeConfig] = None):
+        self.config = config or HedgeConfig.from_environment()
+        self.states: Dict[str, EndpointHedgeState] = {}
+
+    def _state(self, name: str) -> EndpointHedgeState:
+        state = self.states.get(name)
+        if state is None:
+            state = self.states[name] = EndpointHedgeState(latencies=deque(maxlen=self.config.window))
+        return state
+
+    def record_latency(self, name: str, seconds: float):
+        """Add an attempt's latency (or a lower bound, if it lost a hedge) to an endpoint's window."""
+        self._state(name).latencies.append(seconds)
+
+    def hedge_delay(self, name: str) -> Optional[float]:
+        """
+        How long to wait on an endpoint before hedging.
+
+        Args:
+            name: Primary endpoint name
+
+        Returns:
+            Seconds (the configured percentile of recent latencies, at least
+            min_delay), or None if hedging is off or there are too few samples
+        """
+        if not self.config.enabled:
+            return None
+        latencies = self._state(name).latencies
+        if len(latencies) < self.config.min_samples:
+            return None
+        ordered = sorted(latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.config.percentile / 100))
+        return max(self.config.min_delay, ordered[index])
+
+    def _take_budget(self, state: EndpointHedgeState) -> bool:
+        if state.credits >= 1.0:
+            state.credits -= 1.0
+            return True
+        state.budget_denied += 1
+        return False
+
+    async def run(
+        self,
+        primary: Dict[str, Any],
+        backup: Optional[Dict[str, Any]],
+        attempt: Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> HedgeOutcome:
+        """
+        Try the primary endpoint, hedging to the backup if it is slow.
+
+        Args:
+            primary: Endpoint to try first
+            backup: Next endpoint in line (None disables hedging for this attempt)
+            attempt: Coroutine function sending the request to an endpoint;
+                returns the response or None on failure
+
+        Returns:
+            HedgeOutcome: The first response (or None) and which endpoints were tried
+        """
+        state = self._state(primary['name'])
+        state.requests += 1
+        state.credits = min(self.config.budget_burst, state.credits + self.config.budget_percent / 100)
+
+        started = time.monotonic()
+        tasks = {asyncio.create_task(attempt(primary)): primary}
+        delay = self.hedge_delay(primary['name']) if backup is not None else None
+        failed: List[Dict[str, Any]] = []
+        hedged = False
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self._take_budget(state):
+                    hedged = True
+                    state.hedges += 1
+                    logger.info(f"Hedging {primary['name']} after {delay:.2f}s with {backup['name']}")
+                    tasks[asyncio.create_task(attempt(backup))] = backup
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    endpoint = tasks[task]
+                    response = task.result() if not task.cancelled() and task.exception() is None else None
+                    if not response:
+                        failed.append(endpoint)
+                        continue
+                    # A still-running primary's elapsed time is a lower bound on its latency;
+                    # leaving it out would bias the window (and the hedge delay) low
+                    if primary not in failed:
+                        self.record_latency(primary['name'], time.monotonic() - started)
+                    if endpoint is primary:
+                        if hedged:
+                            state.primary_wins += 1
+                    else:
+                        state.hedge_wins += 1
+                    return HedgeOutcome(endpoint, response, list(tasks.values()), failed)
+            return HedgeOutcome(None, None, list(tasks.values()), failed)
+        finally:
+            # Cancel the losing attempt (or both, if the caller was cancelled)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hedge counts, wins and the current hedge delay per endpoint"""
+        endpoints = {}
+        for name, state in self.states.items():
+            delay = self.hedge_delay(name)
+            endpoints[name] = {
+                "requests": state.requests,
+                "hedges": state.hedges,
+                "hedge_rate": round(state.hedges / state.requests, 3) if state.requests else 0.0,
+                "hedge_wins": state.hedge_wins,
+                "primary_wins": state.primary_wins,
+                "budget_denied": state.budget_denied,
+                "hedge_delay_seconds": round(delay, 3) if delay is not None else None,
+                "latency_samples": len(state.latencies)
+            }
+        hedges = sum(s.hedges for s in self.states.values())
+        hedge_wins = sum(s.hedge_wins for s in self.states.values())
+        return {
+            "enabled": self.config.enabled,
+            "percentile": self.config.percentile,
+            "budget_percent": self.config.budget_percent,
+            "hedges": hedges,
+            "hedge_wins": hedge_wins,
+            "hedge_win_rate": round(hedge_wins / hedges, 3) if hedges else None,
+            "budget_denied": sum(s.budget_denied for s in self.states.values()),
+            "endpoints": endpoints
+        }
+
+
+# Global hedger instance
+_hedger: Optional[Hedger] = None
+
+
+def get_hedger() -> Hedger:
+    """Get the global hedger instance"""
+    global _hedger
+    if _hedger is None:
+        _hedger = Hedger()
+    return _hedger
@@ -0,0 +1,288 @@
+"""
+Load Balancer - Spreads requests across endpoints with pluggable strategies
+Strategies rank the available endpoints for a request; the first is tried and
+the rest are the fallback order. The strategy can be chosen per model or route.
+"""
+import fnmatch
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EndpointLoad:
+    """Live load figures for one endpoint"""
+    outstanding: int = 0
+    ewma_latency_ms: Optional[float] = None
+    requests: int = 0
+    failures: int = 0
+    # Smooth weighted round-robin state
+    current_weight: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "outstanding": self.outstanding,
+            "ewma_latency_ms": round(self.ewma_latency_ms, 1) if self.ewma_latency_ms is not None else None,
+            "requests": self.requests,
+            "failures": self.failures
+        }
+
+
+def endpoint_weight(endpoint: Dict[str, Any]) -> float:
+    """Load-balancing weight of an endpoint info dict (the `weight` config key, default 1.0)."""
+    weight = endpoint.get("weight")
+    if weight is None:
+        weight = (endpoint.get("config") or {}).get("weight", 1.0)
+    try:
+        return max(0.0, float(weight))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class LoadBalancingStrategy:
+    """Orders candidate endpoints; subclasses implement order()"""
+
+    name = "base"
+
+    def order(self, candidates: List[Dict[str, Any]], loads: Dict[str, EndpointLoad]) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+
+class PriorityStrategy(LoadBalancingStrategy):
+    """Highest priority first (the original router behaviour)"""
+
+    name = "priority"
+
+    def order(self, candidates, loads):
+        return sorted(candidates, key=lambda e: (e.get("priority", 0), e.get("name", "")), reverse=True)
+
+
+class WeightedRoundRobinStrategy(LoadBalancingStrategy):
+    """Smooth weighted round-robin: an endpoint with weight 3 gets three picks for every one of a weight-1 peer, interleaved"""
+
+    name = "weighted_round_robin"
+
+    def order(self, candidates, loads):
+        total = 0.0
+        best = None
+        for endpoint in candidates:
+            load = loads[endpoint["name"]]
+            weight = endpoint_weight(endpoint)
+            load.current_weight += weight
+            total += weight
+            if best is None or load.current_weight > loads[best["name"]].current_weight:
+                best = endpoint
+        if best is None or total == 0:
+            return list(candidates)
+        loads[best["name"]].current_weight -= total
+        rest = sorted(
+            (e for e in candidates if e is not best),
+            key=lambda e: loads[e["name"]].current_weight,
+            reverse=True
+        )
+        return [best] + rest
+
+
+class LeastOutstandingStrategy(LoadBalancingStrategy):
+    """Fewest in-flight requests per unit of weight first; ties broken at random"""
+
+    name = "least_outstanding"
+
+    def order(self, candidates, loads):
+        def cost(endpoint):
+            weight = endpoint_weight(endpoint) or 1e-9
+            return (loads[endpoint["name"]].outstanding / weight, random.random())
+        return sorted(candidates, key=cost)
+
+
+class EWMAStrategy(LoadBalancingStrategy):
+    """
+    Power of two choices on EWMA latency: sample two endpoints and prefer the one
+    with the lower latency x (outstanding + 1). Endpoints without a latency sample
+    yet are scored at the current minimum so they get explored.
+    """
+
+    name = "ewma"
+
+    def _cost(self, endpoint, loads, unknown_latency: float) -> float:
+        load = loads[endpoint["name"]]
+        latency = load.ewma_latency_ms if load.ewma_latency_ms is not None else unknown_latency
+        return latency * (load.outstanding + 1) / (endpoint_weight(endpoint) or 1e-9)
+
+    def order(self, candidates, loads):
+        if len(candidates) < 2:
+            return list(candidates)
+        known = [loads[e["name"]].ewma_latency_ms for e in candidates if loads[e["name"]].ewma_latency_ms is not None]
+        unknown_latency = min(known) if known else 1.0
+        first, second = random.sample(candidates, 2)
+        if self._cost(second, loads, unknown_latency) < self._cost(first, loads, unknown_latency):
+            first = second
+        rest = sorted((e for e in candidates if e is not first), key=lambda e: self._cost(e, loads, unknown_latency))
+        return [first] + rest
+
+
+STRATEGIES = {
+    strategy.name: strategy
+    for strategy in (PriorityStrategy, WeightedRoundRobinStrategy, LeastOutstandingStrategy, EWMAStrategy)
+}
+
+
+@dataclass
+class LoadBalancerConfig:
+    """Strategy selection and EWMA smoothing"""
+    default_strategy: str = "priority"
+    # Pattern -> strategy; a pattern starting with "/" is a route prefix, anything else a model glob
+    overrides: Dict[str, str] = field(default_factory=dict)
+    ewma_alpha: float = 0.3  # Weight of the newest latency sample
+    failure_penalty: float = 2.0  # A failed call counts as this multiple of the current EWMA latency
+
+    @classmethod
+    def from_environment(cls) -> "LoadBalancerConfig":
+        """Settings from LB_STRATEGY, LB_STRATEGY_OVERRIDES ("gpt-4*=ewma,/v1/messages=least_outstanding"),
+        LB_EWMA_ALPHA and LB_FAILURE_PENALTY."""
+        defaults = cls()
+        overrides = {}
+        for pair in os.getenv("LB_STRATEGY_OVERRIDES", "").split(","):
+            if "=" in pair:
+                pattern, strategy = pair.rsplit("=", 1)
+                overrides[pattern.strip()] = strategy.strip()
+        return cls(
+            default_strategy=os.getenv("LB_STRATEGY", defaults.default_strategy),
+            overrides=overrides,
+            ewma_alpha=min(1.0, max(0.01, float(os.getenv("LB_EWMA_ALPHA", defaults.ewma_alpha)))),
+            failure_penalty=max(1.0, float(os.getenv("LB_FAILURE_PENALTY", defaults.failure_penalty)))
+        )
+
+
+class LoadBalancer:
+    """
+    Picks the order in which endpoints are tried for a request.
+
+    Callers wrap each attempt in begin()/end() so outstanding counts and EWMA
+    latencies stay current for the load-aware strategies.
+    """
+
+    def __init__(self, config: Optional[LoadBalancerConfig] = None):
+        self.config = config or LoadBalancerConfig.from_environment()
+        self.loads: Dict[str, EndpointLoad] = {}
+        self.strategies = {name: strategy() for name, strategy in STRATEGIES.items()}
+        self.selections: Dict[str, int] = {}
+
+        for name in [self.config.default_strategy, *self.config.overrides.values()]:
+            if name not in self.strategies:
+                logger.warning(f"Unknown load-balancing strategy '{name}', using 'priority' (known: {', '.join(STRATEGIES)})")
+
+    def strategy_for(self, model: Optional[str] = None, path: Optional[str] = None) -> LoadBalancingStrategy:
+        """
+        Resolve the strategy for a request.
+
+        Args:
+            model: Requested model name
+            path: Request path
+
+        Returns:
+            LoadBalancingStrategy: The first matching override, else the default
+        """
+        name = self.config.default_strategy
+        for pattern, strategy in self.config.overrides.items():
+            if pattern.startswith("/"):
+                matched = path is not None and path.startswith(pattern)
+            else:
+                matched = model is not None and fnmatch.fnmatch(model, pattern)
+            if matched:
+                name = strategy
+                break
+        return self.strategies.get(name) or self.strategies["priority"]
+
+    def order(
+        self,
+        candidates: List[Dict[str, Any]],
+        model: Optional[str] = None,
+        path: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Order endpoints for one request.
+
+        Args:
+            candidates: Available endpoint info dicts (need 'name'; 'priority' and 'weight' optional)
+            model: Requested model name
+            path: Request path
+
+        Returns:
+            List of the same endpoints, the one to try first at the front
+        """
+        if not candidates:
+            return []
+        for endpoint in candidates:
+            if endpoint["name"] not in self.loads:
+                self.loads[endpoint["name"]] = EndpointLoad()
+        strategy = self.strategy_for(model, path)
+        ordered = strategy.order(candidates, self.loads)
+        self.selections[ordered[0]["name"]] = self.selections.get(ordered[0]["name"], 0) + 1
+        return ordered
+
+    def begin(self, name: str) -> float:
+        """Mark a request to an endpoint as in flight; returns the start time for end()."""
+        load = self.loads.get(name)
+        if load is None:
+            load = self.loads[name] = EndpointLoad()
+        load.outstanding += 1
+        load.requests += 1
+        return time.monotonic()
+
+    def end(self, name: str, started: float, success: bool = True, sample_latency: bool = True):
+        """
+        Finish a request started with begin().
+
+        Args:
+            name: Endpoint name
+            started: Value returned by begin()
+            success: Whether the endpoint answered
+            sample_latency: Fold the duration into the EWMA (off for streams,
+                whose duration tracks output length rather than endpoint speed)
+        """
+        load = self.loads.get(name)
+        if load is None:
+            return
+        load.outstanding = max(0, load.outstanding - 1)
+        if not success:
+            load.failures += 1
+        if not sample_latency:
+            return
+        latency_ms = (time.monotonic() - started) * 1000
+        if not success:
+            # Push failing endpoints back without waiting for them to time out
+            if load.ewma_latency_ms is not None:
+                latency_ms = max(latency_ms, load.ewma_latency_ms * self.config.failure_penalty)
+        if load.ewma_latency_ms is None:
+            load.ewma_latency_ms = latency_ms
+        else:
+            alpha = self.config.ewma_alpha
+            load.ewma_latency_ms = alpha * latency_ms + (1 - alpha) * load.ewma_latency_ms
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get strategy settings and per-endpoint load"""
+        return {
+            "default_strategy": self.config.default_strategy,
+            "overrides": dict(self.config.overrides),
+            "strategies": list(STRATEGIES),
+            "selections": dict(self.selections),
+            "endpoints": {name: load.to_dict() for name, load in self.loads.items()}
+        }
+
+
+# Global load balancer instance
+_load_balancer: Optional[LoadBalancer] = None
+
+
+def get_load_balancer() -> LoadBalancer:
+    """Get the global load balancer instance"""
+    global _load_balancer
+    if _load_balancer is None:
+        _load_balancer = LoadBalancer()
+    return _load_balancer
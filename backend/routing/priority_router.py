@@ -4,7 +4,14 @@ Priority-Based Router - Routes requests based on endpoint priorities with intell
 import logging
 from typing import Optional, Dict, Any, List
 import asyncio
-from datetime import datetime, timedelta
+from datetime import datetime
+from urllib.parse import urlparse
+
+from .circuit_breaker import get_circuit_breakers
+from .health_cache import get_health_cache
+from .hedging import get_hedger
+from .load_balancer import get_load_balancer
+from .routing_index import get_routing_index
 
 logger = logging.getLogger(__name__)
 
@@ -16,10 +23,11 @@ class PriorityRouter:
     
     def __init__(self, endpoint_manager):
         self.endpoint_manager = endpoint_manager
-        self.failure_counts = {}  # Track failures for circuit breaker
-        self.last_failure_time = {}
-        self.circuit_breaker_threshold = 5  # Failures before circuit opens
-        self.circuit_breaker_timeout = 300  # 5 minutes
+        self.circuit_breakers = get_circuit_breakers()  # Shared with EndpointManager
+        self.health_cache = get_health_cache(endpoint_manager)
+        self.load_balancer = get_load_balancer()
+        self.hedger = get_hedger()
+        self.routing_index = get_routing_index()
         
     async def route_request(
         self, 
@@ -41,22 +49,38 @@ class PriorityRouter:
             
             # If model is specified, try to find matching endpoint first
             if model:
-                target_endpoint = await self._find_endpoint_by_model(model, endpoints)
-                if target_endpoint:
-                    response = await self._try_endpoint(target_endpoint, message, request_data)
+                target_endpoint = await self._find_endpoint_by_model(model)
+                if target_endpoint and self._breaker(target_endpoint).allow_request():
+                    response = await self._try_balanced(target_endpoint, message, request_data)
                     if response:
                         return response
-                    # If specific model fails, continue with priority fallback
+                    # If specific model fails, continue with load-balanced fallback
             
-            # Try endpoints in priority order
-            for endpoint in endpoints:
-                if await self._is_endpoint_available(endpoint):
-                    response = await self._try_endpoint(endpoint, message, request_data)
-                    if response:
-                        await self._record_success(endpoint['name'])
-                        return response
-                    else:
+            # Try available endpoints in the order the load-balancing strategy picks,
+            # hedging a slow endpoint with the next one in line
+            available = [endpoint for endpoint in endpoints if await self._is_endpoint_available(endpoint)]
+            path = urlparse(url).path if url else None
+            remaining = self.load_balancer.order(available, model=model, path=path)
+            
+            async def attempt(endpoint):
+                return await self._try_balanced(endpoint, message, request_data)
+            
+            try:
+                while remaining:
+                    primary = remaining.pop(0)
+                    backup = remaining[0] if remaining else None
+                    outcome = await self.hedger.run(primary, backup, attempt)
+                    if backup is not None and backup in outcome.attempted:
+                        remaining.pop(0)
+                    for endpoint in outcome.failed:
                         await self._record_failure(endpoint['name'])
+                    if outcome.response:
+                        await self._record_success(outcome.endpoint['name'])
+                        return outcome.response
+            finally:
+                # Hand back half-open trial slots taken for endpoints never tried
+                for endpoint in remaining:
+                    self._breaker(endpoint).release()
             
             logger.error("All endpoints failed or unavailable")
             return None
@@ -67,77 +91,49 @@ class PriorityRouter:
     
     async def _get_prioritized_endpoints(self) -> List[Dict[str, Any]]:
         """
-        Get all active endpoints sorted by priority (highest first)
+        Get all active endpoints sorted by priority (highest first), from the routing index
         """
         try:
-            # Get active endpoints from endpoint manager
-            active_endpoints = self.endpoint_manager.get_active_endpoints_server()
-            
-            # Sort by priority (highest first), then by name for consistency
-            sorted_endpoints = sorted(
-                active_endpoints,
-                key=lambda x: (x.get('priority', 0), x.get('name', '')),
-                reverse=True
-            )
-            
-            return sorted_endpoints
+            active_endpoints = getattr(self.endpoint_manager, 'active_endpoints', {})
+            registry_version = getattr(self.endpoint_manager, 'endpoints_version', None)
+            if (
+                registry_version != self.routing_index.registry_version
+                or active_endpoints.keys() != self.routing_index.infos.keys()
+            ):
+                # Endpoints were added, removed or reconfigured without the index being kept in step
+                self.routing_index.rebuild(active_endpoints.values(), registry_version)
+            return self.routing_index.prioritized()
             
         except Exception as e:
             logger.error(f"Error getting prioritized endpoints: {e}")
             return []
     
-    async def _find_endpoint_by_model(
-        self, 
-        model: str, 
-        endpoints: List[Dict[str, Any]]
-    ) -> Optional[Dict[str, Any]]:
+    async def _find_endpoint_by_model(self, model: str) -> Optional[Dict[str, Any]]:
         """
-        Find endpoint that matches the specified model name
+        Find endpoint that matches the specified model name (exact name, model or alias, then name prefix)
         """
-        # Direct name match
-        for endpoint in endpoints:
-            if endpoint.get('name') == model:
-                return endpoint
-        
-        # Partial name match
-        for endpoint in endpoints:
-            if model.lower() in endpoint.get('name', '').lower():
-                return endpoint
-        
-        # Model field match
-        for endpoint in endpoints:
-            if endpoint.get('model') == model:
-                return endpoint
-        
-        return None
+        return self.routing_index.lookup(model)
+    
+    def _breaker(self, endpoint: Dict[str, Any]):
+        """
+        Get the endpoint's circuit breaker (per-endpoint thresholds from its `circuit_breaker` config)
+        """
+        return self.circuit_breakers.get(endpoint.get('name'), (endpoint.get('config') or {}).get('circuit_breaker'))
     
     async def _is_endpoint_available(self, endpoint: Dict[str, Any]) -> bool:
         """
-        Check if endpoint is available (not in circuit breaker state)
+        Check if endpoint is available (circuit closed, or a half-open trial slot was free and is now taken)
         """
         endpoint_name = endpoint.get('name')
         
-        # Check circuit breaker
-        if endpoint_name in self.failure_counts:
-            failure_count = self.failure_counts[endpoint_name]
-            last_failure = self.last_failure_time.get(endpoint_name)
-            
-            if failure_count >= self.circuit_breaker_threshold:
-                if last_failure and datetime.now() - last_failure < timedelta(seconds=self.circuit_breaker_timeout):
-                    logger.warning(f"Endpoint {endpoint_name} is in circuit breaker state")
-                    return False
-                else:
-                    # Reset circuit breaker after timeout
-                    self.failure_counts[endpoint_name] = 0
-                    logger.info(f"Circuit breaker reset for endpoint {endpoint_name}")
+        # Cached health first, so a trial slot is only taken for endpoints that can be tried
+        if not self.health_cache.is_available(endpoint_name):
+            return False
         
-        # Check endpoint health
-        try:
-            health = await self.endpoint_manager.health_check_endpoint_server(endpoint_name)
-            return health.get('status') == 'healthy'
-        except Exception as e:
-            logger.error(f"Health check failed for {endpoint_name}: {e}")
+        if not self._breaker(endpoint).allow_request():
+            logger.debug(f"Endpoint {endpoint_name} skipped: circuit {self._breaker(endpoint).state.value}")
             return False
+        return True
     
     async def _try_endpoint(
         self, 
@@ -191,13 +187,40 @@ class PriorityRouter:
             logger.error(f"Error trying endpoint {endpoint_name}: {e}")
             return None
     
+    async def _try_balanced(
+        self,
+        endpoint: Dict[str, Any],
+        message: str,
+        request_data: Dict[str, Any] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Try an endpoint while the load balancer tracks its in-flight count and latency
+        """
+        started = self.load_balancer.begin(endpoint['name'])
+        breaker = self._breaker(endpoint)
+        response = None
+        cancelled = False
+        try:
+            response = await self._try_endpoint(endpoint, message, request_data)
+            return response
+        except asyncio.CancelledError:
+            # Lost a hedge race: slow, not failed (its elapsed time still counts as latency)
+            cancelled = True
+            raise
+        finally:
+            self.load_balancer.end(endpoint['name'], started, success=cancelled or response is not None)
+            if cancelled:
+                breaker.release()
+            elif response is not None:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+    
     async def _record_success(self, endpoint_name: str):
         """
-        Record successful request for endpoint
+        Record successful request for endpoint (the circuit breaker is updated per attempt in _try_balanced)
         """
-        # Reset failure count on success
-        if endpoint_name in self.failure_counts:
-            self.failure_counts[endpoint_name] = 0
+        self.health_cache.record_success(endpoint_name)
         
         logger.debug(f"Success recorded for endpoint: {endpoint_name}")
     
@@ -205,32 +228,33 @@ class PriorityRouter:
         """
         Record failed request for endpoint
         """
-        if endpoint_name not in self.failure_counts:
-            self.failure_counts[endpoint_name] = 0
+        self.health_cache.record_failure(endpoint_name)
         
-        self.failure_counts[endpoint_name] += 1
-        self.last_failure_time[endpoint_name] = datetime.now()
-        
-        logger.warning(f"Failure recorded for endpoint: {endpoint_name} (count: {self.failure_counts[endpoint_name]})")
+        logger.warning(f"Failure recorded for endpoint: {endpoint_name}")
     
     def get_endpoint_priorities(self) -> Dict[str, int]:
         """
         Get current endpoint priorities
         """
-        try:
-            endpoints = self.endpoint_manager.get_active_endpoints_server()
-            return {ep.get('name'): ep.get('priority', 0) for ep in endpoints}
-        except Exception as e:
-            logger.error(f"Error getting endpoint priorities: {e}")
-            return {}
+        return {info['name']: info['priority'] for info in self.routing_index.prioritized()}
     
     async def set_endpoint_priority(self, endpoint_name: str, priority: int) -> bool:
         """
         Set priority for specific endpoint
         """
         try:
-            # This would need to be implemented in the endpoint manager
-            # For now, return True as placeholder
+            endpoint = getattr(self.endpoint_manager, 'active_endpoints', {}).get(endpoint_name)
+            if endpoint is None:
+                logger.error(f"Endpoint {endpoint_name} not found")
+                return False
+            if isinstance(endpoint, dict):
+                endpoint['priority'] = priority
+            else:
+                endpoint.priority = priority
+            if hasattr(self.endpoint_manager, 'endpoint_changed'):
+                self.endpoint_manager.endpoint_changed(endpoint_name)
+            else:
+                self.routing_index.update_priority(endpoint_name, priority)
             logger.info(f"Setting priority {priority} for endpoint {endpoint_name}")
             return True
         except Exception as e:
@@ -0,0 +1,229 @@
+"""
+Routing Index - Precompiled model -> endpoint lookups for the priority router
+Endpoint names, models and aliases map to priority-ordered endpoint lists; the
+index is updated in place when endpoints are added, removed or re-prioritised,
+so a request does dict lookups instead of scanning and sorting every endpoint.
+"""
+import bisect
+import logging
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Name tokens start after these characters ("web-deepseek-1" -> deepseek, 1)
+_TOKEN_BOUNDARY = re.compile(r"[-_./:\s]+")
+# Prefix keys are indexed up to this length
+MAX_PREFIX_LENGTH = 64
+
+
+def _routing_info(endpoint: Any) -> Dict[str, Any]:
+    """
+    The fields routing needs from an endpoint object (or a placeholder dict),
+    without building metrics as get_info() does.
+    """
+    if isinstance(endpoint, dict):
+        config = endpoint.get('config') or {}
+        name = endpoint['name']
+        priority = endpoint.get('priority', 0)
+    else:
+        config = endpoint.config or {}
+        name = endpoint.name
+        priority = endpoint.priority
+    return {
+        'name': name,
+        'priority': priority,
+        'weight': config.get('weight', 1.0),
+        'model': config.get('model'),
+        'aliases': list(config.get('aliases') or []),
+        'provider_type': config.get('provider_type', 'unknown'),
+        'config': config
+    }
+
+
+class _OrderedEndpoints:
+    """Endpoint infos kept sorted by (priority, name); read highest first"""
+
+    __slots__ = ("keys", "items")
+
+    def __init__(self):
+        self.keys: List[Tuple[int, str]] = []
+        self.items: List[Dict[str, Any]] = []
+
+    def add(self, info: Dict[str, Any]):
+        key = (info['priority'], info['name'])
+        index = bisect.bisect_left(self.keys, key)
+        self.keys.insert(index, key)
+        self.items.insert(index, info)
+
+    def remove(self, info: Dict[str, Any]):
+        index = bisect.bisect_left(self.keys, (info['priority'], info['name']))
+        if index < len(self.keys) and self.items[index] is info:
+            del self.keys[index]
+            del self.items[index]
+
+    def highest_first(self) -> List[Dict[str, Any]]:
+        return self.items[::-1]
+
+    def first(self) -> Optional[Dict[str, Any]]:
+        return self.items[-1] if self.items else None
+
+    def __len__(self):
+        return len(self.items)
+
+
+class RoutingIndex:
+    """
+    Lookups from a requested model to endpoints.
+
+    exact:  endpoint name, configured `model` and `aliases` (case-insensitive)
+    prefix: prefixes of the endpoint name and of each name token, so "deepseek"
+            finds "web-deepseek-1" (replaces the old substring scan, matching at
+            token boundaries)
+    """
+
+    def __init__(self):
+        self.infos: Dict[str, Dict[str, Any]] = {}
+        self.ordered = _OrderedEndpoints()
+        self.exact: Dict[str, _OrderedEndpoints] = {}
+        self.prefix: Dict[str, _OrderedEndpoints] = {}
+        self._keys: Dict[str, Tuple[Set[str], Set[str]]] = {}
+        self.version = 0
+        self.registry_version: Optional[int] = None  # EndpointManager.endpoints_version this reflects
+        self.lookups = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.infos)
+
+    @staticmethod
+    def _exact_keys(info: Dict[str, Any]) -> Set[str]:
+        keys = {info['name'].lower()}
+        if info['model']:
+            keys.add(str(info['model']).lower())
+        keys.update(str(alias).lower() for alias in info['aliases'])
+        return keys
+
+    @staticmethod
+    def _prefix_keys(info: Dict[str, Any]) -> Set[str]:
+        name = info['name'].lower()
+        starts = [0] + [match.end() for match in _TOKEN_BOUNDARY.finditer(name)]
+        keys = set()
+        for start in starts:
+            tail = name[start:start + MAX_PREFIX_LENGTH]
+            keys.update(tail[:length] for length in range(1, len(tail) + 1))
+        return keys
+
+    def _link(self, table: Dict[str, _OrderedEndpoints], keys: Iterable[str], info: Dict[str, Any]):
+        for key in keys:
+            entries = table.get(key)
+            if entries is None:
+                entries = table[key] = _OrderedEndpoints()
+            entries.add(info)
+
+    def _unlink(self, table: Dict[str, _OrderedEndpoints], keys: Iterable[str], info: Dict[str, Any]):
+        for key in keys:
+            entries = table.get(key)
+            if entries is not None:
+                entries.remove(info)
+                if not entries:
+                    del table[key]
+
+    def add(self, endpoint: Any):
+        """Index an endpoint (replaces an existing entry with the same name)."""
+        info = _routing_info(endpoint)
+        if info['name'] in self.infos:
+            self.remove(info['name'])
+        exact_keys, prefix_keys = self._exact_keys(info), self._prefix_keys(info)
+        self.infos[info['name']] = info
+        self._keys[info['name']] = (exact_keys, prefix_keys)
+        self.ordered.add(info)
+        self._link(self.exact, exact_keys, info)
+        self._link(self.prefix, prefix_keys, info)
+        self.version += 1
+
+    def remove(self, name: str):
+        """Drop an endpoint from the index."""
+        info = self.infos.pop(name, None)
+        if info is None:
+            return
+        exact_keys, prefix_keys = self._keys.pop(name)
+        self.ordered.remove(info)
+        self._unlink(self.exact, exact_keys, info)
+        self._unlink(self.prefix, prefix_keys, info)
+        self.version += 1
+
+    def update_priority(self, name: str, priority: int):
+        """Re-sort one endpoint after its priority changed."""
+        info = self.infos.get(name)
+        if info is None or info['priority'] == priority:
+            return
+        exact_keys, prefix_keys = self._keys[name]
+        tables = [(self.exact, exact_keys), (self.prefix, prefix_keys)]
+        self.ordered.remove(info)
+        for table, keys in tables:
+            self._unlink(table, keys, info)
+        info['priority'] = priority
+        self.ordered.add(info)
+        for table, keys in tables:
+            self._link(table, keys, info)
+        self.version += 1
+
+    def rebuild(self, endpoints: Iterable[Any], registry_version: Optional[int] = None):
+        """Replace the whole index (e.g. when it no longer matches the endpoint registry)."""
+        lookups, misses = self.lookups, self.misses
+        self.__init__()
+        self.lookups, self.misses = lookups, misses
+        for endpoint in endpoints:
+            self.add(endpoint)
+        self.registry_version = registry_version
+        logger.info(f"Routing index rebuilt: {len(self.infos)} endpoints")
+
+    def prioritized(self) -> List[Dict[str, Any]]:
+        """All endpoints, highest priority first (ties by name, descending)."""
+        return self.ordered.highest_first()
+
+    def lookup(self, model: str) -> Optional[Dict[str, Any]]:
+        """
+        Find the endpoint serving a model name.
+
+        Args:
+            model: Requested model, endpoint name or alias
+
+        Returns:
+            The highest-priority exact match, else the highest-priority
+            name-prefix match, else None
+        """
+        self.lookups += 1
+        key = model.lower()
+        entries = self.exact.get(key)
+        if entries is None and len(key) <= MAX_PREFIX_LENGTH:
+            entries = self.prefix.get(key)
+        if entries is None:
+            self.misses += 1
+            return None
+        return entries.first()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index size and lookup counts"""
+        return {
+            "endpoints": len(self.infos),
+            "exact_keys": len(self.exact),
+            "prefix_keys": len(self.prefix),
+            "version": self.version,
+            "registry_version": self.registry_version,
+            "lookups": self.lookups,
+            "misses": self.misses
+        }
+
+
+# Global routing index instance
+_routing_index: Optional[RoutingIndex] = None
+
+
+def get_routing_index() -> RoutingIndex:
+    """Get the global routing index instance"""
+    global _routing_index
+    if _routing_index is None:
+        _routing_index = RoutingIndex()
+    return _routing_index
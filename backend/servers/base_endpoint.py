@@ -5,12 +5,13 @@ Abstract base class for all endpoint types (web_chat, rest_api)
 
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional, AsyncGenerator
-import asyncio
 import logging
 import time
 from datetime import datetime
 from enum import Enum
 
+from ..streaming import BackpressureConfig, PacingConfig, PacingMode, pace_stream, split_words
+
 logger = logging.getLogger(__name__)
 
 class EndpointStatus(Enum):
@@ -107,6 +108,7 @@ class BaseEndpoint(ABC):
         self.name = name
         self.config = config
         self.priority = priority  # Higher numbers = higher priority
+        self.weight = float(config.get('weight', 1.0))  # Share of traffic under weighted load balancing
         self.status = EndpointStatus.STOPPED
         self.health = EndpointHealth.UNKNOWN
         self.metrics = EndpointMetrics()
@@ -116,6 +118,9 @@ class BaseEndpoint(ABC):
         # Extract common configuration
         self.url = config.get('url', '')
         self.timeout = config.get('timeout', 30)
+        # Responses arrive complete, so by default they are streamed in coalesced frames
+        self.pacing = PacingConfig.from_dict(config.get('streaming'), default_mode=PacingMode.COALESCE)
+        self.backpressure = BackpressureConfig.from_dict(config.get('streaming'), BackpressureConfig.from_environment())
         self.max_retries = config.get('max_retries', 3)
         self.use_proxy = config.get('use_proxy', False)
         
@@ -146,14 +151,9 @@ class BaseEndpoint(ABC):
         # Default implementation for non-streaming endpoints
         response = await self.send_message(message, **kwargs)
         if response:
-            # Simulate streaming by yielding chunks
-            words = response.split()
-            for i, word in enumerate(words):
-                if i == 0:
-                    yield word
-                else:
-                    yield f" {word}"
-                await asyncio.sleep(0.01)  # Small delay to simulate streaming
+            # Stream word chunks through the endpoint's pacing stage
+            async for chunk in pace_stream(split_words(response), self.pacing):
+                yield chunk
     
     async def test_connection(self) -> Dict[str, Any]:
         """Test the endpoint connection"""
@@ -250,6 +250,8 @@ class BaseEndpoint(ABC):
             "name": self.name,
             "type": self.__class__.__name__.replace("Endpoint", "").lower(),
             "url": self.url,
+            "priority": self.priority,
+            "weight": self.weight,
             "status": self.status.value,
             "health": self.health.value,
             "config": self.config,
@@ -9,9 +9,11 @@ from typing import Dict, Any, Optional, AsyncGenerator
 import json
 import aiohttp
 import time
+from contextlib import aclosing
 from urllib.parse import urljoin
 
 from .base_endpoint import BaseEndpoint, EndpointStatus, EndpointHealth
+from ..streaming import SSEParser, buffered_stream, openai_delta_content
 
 logger = logging.getLogger(__name__)
 
@@ -196,22 +198,16 @@ class RestApiEndpoint(BaseEndpoint):
             
             async with self.session.post(url, json=payload) as response:
                 if response.status == 200:
-                    async for line in response.content:
-                        line = line.decode('utf-8').strip()
-                        
-                        if line.startswith('data: '):
-                            data_str = line[6:]  # Remove 'data: ' prefix
-                            
-                            if data_str == '[DONE]':
-                                break
-                            
-                            try:
-                                data = json.loads(data_str)
-                                content = self._extract_stream_content(data)
+                    parser = SSEParser()
+                    # Read ahead through a bounded buffer so a slow client pauses the upstream socket
+                    async with aclosing(buffered_stream(response.content.iter_chunked(self.backpressure.read_size), self.backpressure, self.name)) as chunks:
+                        async for chunk in chunks:
+                            for event in parser.feed(chunk):
+                                if event.is_done:
+                                    return
+                                content = self._event_content(event.data)
                                 if content:
                                     yield content
-                            except json.JSONDecodeError:
-                                continue
                                 
                 else:
                     error_text = await response.text()
@@ -316,6 +312,17 @@ class RestApiEndpoint(BaseEndpoint):
             logger.error(f"Failed to extract response content: {e}")
             return None
     
+    def _event_content(self, data_str: str) -> Optional[str]:
+        """Extract content from a streamed event's data field"""
+        api_name = self.name.lower()
+        if not any(name in api_name for name in ('anthropic', 'claude', 'gemini', 'google')):
+            # OpenAI format: read the delta without decoding the whole chunk
+            return openai_delta_content(data_str)
+        try:
+            return self._extract_stream_content(json.loads(data_str))
+        except json.JSONDecodeError:
+            return None
+    
     def _extract_stream_content(self, data: Dict[str, Any]) -> Optional[str]:
         """Extract content from streaming response chunk"""
         try:
@@ -12,6 +12,7 @@ from urllib.parse import urlparse
 
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page
 from .base_endpoint import BaseEndpoint, EndpointStatus, EndpointHealth
+from ..streaming import pace_stream, split_words
 
 logger = logging.getLogger(__name__)
 
@@ -170,14 +171,9 @@ class WebChatEndpoint(BaseEndpoint):
             response = await self.send_message(message, **kwargs)
             
             if response:
-                # Simulate streaming by yielding words with delays
-                words = response.split()
-                for i, word in enumerate(words):
-                    if i == 0:
-                        yield word
-                    else:
-                        yield f" {word}"
-                    await asyncio.sleep(0.05)  # Slightly longer delay for web chat
+                # Stream word chunks through the endpoint's pacing stage
+                async for chunk in pace_stream(split_words(response), self.pacing):
+                    yield chunk
                     
         except Exception as e:
             logger.error(f"Failed to stream message from {self.name}: {e}")
@@ -0,0 +1,46 @@
+"""
+Shared streaming output utilities
+"""
+
+from .backpressure import (
+    BackpressureConfig,
+    StallPolicy,
+    StreamStalled,
+    buffered_stream,
+    get_backpressure_monitor
+)
+from .sse_parser import SSEEvent, SSEParser, openai_delta_content
+from .hub import HubStream, StreamHub, StreamNotFound
+from .pacing import PacingConfig, PacingMode, pace_stream, split_words
+from .sse_encoder import (
+    AnthropicEventEncoder,
+    GeminiChunkEncoder,
+    OpenAIChunkEncoder,
+    TextCompletionChunkEncoder,
+    SSE_DONE,
+    ORJSON_AVAILABLE
+)
+
+__all__ = [
+    'BackpressureConfig',
+    'StallPolicy',
+    'StreamStalled',
+    'buffered_stream',
+    'get_backpressure_monitor',
+    'HubStream',
+    'StreamHub',
+    'StreamNotFound',
+    'PacingConfig',
+    'PacingMode',
+    'pace_stream',
+    'split_words',
+    'SSEEvent',
+    'SSEParser',
+    'openai_delta_content',
+    'AnthropicEventEncoder',
+    'GeminiChunkEncoder',
+    'OpenAIChunkEncoder',
+    'TextCompletionChunkEncoder',
+    'SSE_DONE',
+    'ORJSON_AVAILABLE'
+]
@@ -0,0 +1,327 @@
+"""
+Bounded buffering between an upstream stream and a (possibly slow) client.
+Upstream reads pause once a stream holds high_watermark bytes and resume below
+low_watermark, so a stalled consumer caps per-connection memory instead of
+making the server hold the whole response.
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, AsyncGenerator, AsyncIterable, Deque, Dict, Iterable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+Chunk = Union[str, bytes]
+
+# Returned by next() when a synchronous source is exhausted
+_END = object()
+
+
+class StallPolicy(Enum):
+    """What to do when the client hasn't drained a full buffer within stall_timeout"""
+    WAIT = "wait"  # Keep upstream paused until the client catches up
+    DROP = "drop"  # Discard the oldest buffered chunks and keep reading
+    ABORT = "abort"  # Stop reading upstream and end the stream with StreamStalled
+
+
+class StreamStalled(Exception):
+    """Raised to the consumer when a stream is aborted because the client stalled"""
+    pass
+
+
+@dataclass
+class BackpressureConfig:
+    """Per-stream buffer limits"""
+    high_watermark: int = 64 * 1024
+    low_watermark: int = 16 * 1024
+    stall_timeout: float = 30.0
+    on_stall: StallPolicy = StallPolicy.ABORT
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]], defaults: Optional["BackpressureConfig"] = None) -> "BackpressureConfig":
+        """
+        Build from an endpoint's `streaming` config section.
+
+        Args:
+            data: e.g. {"buffer_bytes": 65536, "low_watermark_bytes": 16384,
+                  "stall_timeout_seconds": 30, "on_stall": "abort"}
+            defaults: Values used for keys the section doesn't set
+
+        Returns:
+            BackpressureConfig: Parsed settings
+        """
+        data = data or {}
+        defaults = defaults or cls()
+        try:
+            on_stall = StallPolicy(str(data.get("on_stall", defaults.on_stall.value)).lower())
+        except ValueError:
+            on_stall = defaults.on_stall
+        high = max(1, int(data.get("buffer_bytes", defaults.high_watermark)))
+        low = int(data.get("low_watermark_bytes", min(defaults.low_watermark, high)))
+        return cls(
+            high_watermark=high,
+            low_watermark=max(0, min(low, high)),
+            stall_timeout=float(data.get("stall_timeout_seconds", defaults.stall_timeout)),
+            on_stall=on_stall
+        )
+
+    @classmethod
+    def from_environment(cls) -> "BackpressureConfig":
+        """Defaults from STREAM_BUFFER_BYTES, STREAM_LOW_WATERMARK_BYTES, STREAM_STALL_TIMEOUT and STREAM_ON_STALL."""
+        return cls.from_dict({
+            key: value for key, value in {
+                "buffer_bytes": os.getenv("STREAM_BUFFER_BYTES"),
+                "low_watermark_bytes": os.getenv("STREAM_LOW_WATERMARK_BYTES"),
+                "stall_timeout_seconds": os.getenv("STREAM_STALL_TIMEOUT"),
+                "on_stall": os.getenv("STREAM_ON_STALL")
+            }.items() if value
+        })
+
+    @property
+    def read_size(self) -> int:
+        """Largest single upstream read, so one chunk can't overshoot the buffer by much."""
+        return max(1024, min(16 * 1024, self.high_watermark // 4))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "buffer_bytes": self.high_watermark,
+            "low_watermark_bytes": self.low_watermark,
+            "stall_timeout_seconds": self.stall_timeout,
+            "on_stall": self.on_stall.value
+        }
+
+
+class StreamBuffer:
+    """Bounded FIFO of chunks for one stream, with watermark bookkeeping"""
+
+    def __init__(self, stream_id: str, name: str, config: BackpressureConfig):
+        self.stream_id = stream_id
+        self.name = name
+        self.config = config
+        self.chunks: Deque[Chunk] = deque()
+        self.buffered_bytes = 0
+        self.peak_bytes = 0
+        self.total_bytes = 0
+        self.pauses = 0
+        self.dropped_chunks = 0
+        self.dropped_bytes = 0
+        self.paused = False
+        self.started_at = time.time()
+        self.readable = asyncio.Event()
+        self.writable = asyncio.Event()
+        self.writable.set()
+
+    def put(self, chunk: Chunk):
+        size = len(chunk)
+        self.chunks.append(chunk)
+        self.buffered_bytes += size
+        self.total_bytes += size
+        self.peak_bytes = max(self.peak_bytes, self.buffered_bytes)
+        self.readable.set()
+        if self.buffered_bytes >= self.config.high_watermark:
+            self.writable.clear()
+
+    def get(self) -> Chunk:
+        chunk = self.chunks.popleft()
+        self.buffered_bytes -= len(chunk)
+        if not self.chunks:
+            self.readable.clear()
+        if self.buffered_bytes <= self.config.low_watermark:
+            self.writable.set()
+        return chunk
+
+    def drop_oldest(self):
+        """Discard buffered chunks down to the low watermark."""
+        while self.chunks and self.buffered_bytes > self.config.low_watermark:
+            chunk = self.chunks.popleft()
+            self.buffered_bytes -= len(chunk)
+            self.dropped_chunks += 1
+            self.dropped_bytes += len(chunk)
+        if not self.chunks:
+            self.readable.clear()
+        self.writable.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "buffered_bytes": self.buffered_bytes,
+            "peak_bytes": self.peak_bytes,
+            "total_bytes": self.total_bytes,
+            "paused": self.paused,
+            "pauses": self.pauses,
+            "dropped_chunks": self.dropped_chunks,
+            "dropped_bytes": self.dropped_bytes,
+            "age_seconds": round(time.time() - self.started_at, 1)
+        }
+
+
+class BackpressureMonitor:
+    """Tracks live stream buffers and lifetime totals for metrics"""
+
+    def __init__(self):
+        self.active: Dict[str, StreamBuffer] = {}
+        self._ids = itertools.count(1)
+        self.streams_total = 0
+        self.pauses_total = 0
+        self.stalls_total = 0
+        self.aborted_total = 0
+        self.dropped_bytes_total = 0
+        self.peak_bytes = 0
+
+    def open(self, name: str, config: BackpressureConfig) -> StreamBuffer:
+        buffer = StreamBuffer(f"{name}-{next(self._ids)}", name, config)
+        self.active[buffer.stream_id] = buffer
+        self.streams_total += 1
+        return buffer
+
+    def close(self, buffer: StreamBuffer):
+        self.active.pop(buffer.stream_id, None)
+        self.pauses_total += buffer.pauses
+        self.dropped_bytes_total += buffer.dropped_bytes
+        self.peak_bytes = max(self.peak_bytes, buffer.peak_bytes)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get buffered-bytes metrics for live streams plus lifetime totals"""
+        streams = {stream_id: buffer.get_stats() for stream_id, buffer in self.active.items()}
+        return {
+            "active_streams": len(streams),
+            "buffered_bytes": sum(s["buffered_bytes"] for s in streams.values()),
+            "paused_streams": sum(1 for s in streams.values() if s["paused"]),
+            "peak_stream_bytes": max([self.peak_bytes] + [s["peak_bytes"] for s in streams.values()]),
+            "streams_total": self.streams_total,
+            "pauses_total": self.pauses_total + sum(s["pauses"] for s in streams.values()),
+            "stalls_total": self.stalls_total,
+            "aborted_total": self.aborted_total,
+            "dropped_bytes_total": self.dropped_bytes_total + sum(s["dropped_bytes"] for s in streams.values()),
+            "streams": streams
+        }
+
+
+# Global monitor instance
+_monitor: Optional[BackpressureMonitor] = None
+
+
+def get_backpressure_monitor() -> BackpressureMonitor:
+    """Get the global backpressure monitor instance"""
+    global _monitor
+    if _monitor is None:
+        _monitor = BackpressureMonitor()
+    return _monitor
+
+
+async def _read_sync(iterator):
+    """Pull the next item of a blocking iterator on a worker thread."""
+    return await asyncio.to_thread(next, iterator, _END)
+
+
+async def buffered_stream(
+    source: Union[AsyncIterable[Chunk], Iterable[Chunk]],
+    config: Optional[BackpressureConfig] = None,
+    name: str = "stream"
+) -> AsyncGenerator[Chunk, None]:
+    """
+    Read a source ahead of the consumer through a bounded buffer.
+
+    Synchronous iterables (e.g. a blocking SDK stream) are read on a worker
+    thread, one chunk at a time, so they pause with the buffer too.
+
+    Args:
+        source: Async or blocking iterable of str or bytes chunks
+        config: Buffer limits and stall policy (defaults when omitted)
+        name: Label for metrics (endpoint or route name)
+
+    Yields:
+        Chunks in order, minus any dropped under StallPolicy.DROP
+
+    Raises:
+        StreamStalled: When the client stalls and the policy is ABORT
+    """
+    config = config or BackpressureConfig()
+    monitor = get_backpressure_monitor()
+    buffer = monitor.open(name, config)
+    is_async = hasattr(source, "__aiter__")
+    iterator = source.__aiter__() if is_async else iter(source)
+    done = False
+    error: Optional[BaseException] = None
+
+    async def wait_for_space() -> bool:
+        """Block while the buffer is over the high watermark; False means stop reading."""
+        if buffer.writable.is_set():
+            return True
+        buffer.paused = True
+        buffer.pauses += 1
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(buffer.writable.wait(), timeout=config.stall_timeout)
+                    return True
+                except asyncio.TimeoutError:
+                    monitor.stalls_total += 1
+                    if config.on_stall == StallPolicy.DROP:
+                        logger.debug(f"Stream {buffer.stream_id} stalled; dropping {buffer.buffered_bytes - config.low_watermark} buffered bytes")
+                        buffer.drop_oldest()
+                        return True
+                    if config.on_stall == StallPolicy.ABORT:
+                        logger.warning(f"Stream {buffer.stream_id} stalled for {config.stall_timeout}s; aborting")
+                        return False
+        finally:
+            buffer.paused = False
+
+    async def produce():
+        nonlocal done, error
+        try:
+            while await wait_for_space():
+                if is_async:
+                    try:
+                        chunk = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        break
+                else:
+                    chunk = await _read_sync(iterator)
+                    if chunk is _END:
+                        break
+                if chunk:
+                    buffer.put(chunk)
+            else:
+                monitor.aborted_total += 1
+                error = StreamStalled(f"Client stalled for {config.stall_timeout}s with {buffer.buffered_bytes} bytes buffered")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = e
+        finally:
+            done = True
+            buffer.readable.set()
+            # The producer owns the upstream iterator; release it as soon as reading stops
+            if is_async:
+                if hasattr(iterator, "aclose"):
+                    await iterator.aclose()
+            elif hasattr(iterator, "close"):
+                try:
+                    iterator.close()
+                except ValueError:
+                    # A worker thread is still inside next(); it finishes on its own
+                    pass
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            if buffer.chunks:
+                yield buffer.get()
+            elif done:
+                break
+            else:
+                await buffer.readable.wait()
+        if error is not None:
+            raise error
+    finally:
+        if not producer.done():
+            producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        monitor.close(buffer)
@@ -0,0 +1,461 @@
+"""
+Stream hub: fan one upstream stream out to any number of subscribers.
+Chunks go into a shared, byte-bounded backlog; each subscriber reads it at its
+own pace, so late joiners replay what they missed and a slow reader never
+holds up the others. Event-stream frames can be stamped with an `id:` so a
+dropped client resumes with Last-Event-ID instead of starting over, and idle
+event streams get `: ping` comments so proxies don't time them out.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import deque
+from typing import Any, AsyncGenerator, AsyncIterable, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# SSE comment sent to subscribers of an idle event stream
+HEARTBEAT = b": ping\n\n"
+
+# Upper bounds (seconds) of the idle-gap histogram buckets; the last bucket is open-ended
+IDLE_GAP_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0)
+
+
+class StreamNotFound(Exception):
+    """Raised when a stream ID is unknown, expired or belongs to another tenant"""
+    pass
+
+
+class HubStream:
+    """One published upstream stream and its backlog"""
+
+    def __init__(
+        self,
+        hub: "StreamHub",
+        stream_id: str,
+        source: AsyncIterable[bytes],
+        tenant: Optional[str],
+        media_type: str,
+        headers: Dict[str, str],
+        on_finish: Optional[Callable[[], Any]],
+        event_ids: bool = False,
+        heartbeat_interval: float = 0.0
+    ):
+        self.hub = hub
+        self.id = stream_id
+        self.tenant = tenant
+        self.media_type = media_type
+        self.headers = headers
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.cancelled = False
+        self.event_ids = event_ids
+
+        # Backlog: chunk with sequence number base_seq + i is at _chunks[_head + i]
+        self._chunks: List[bytes] = []
+        self._head = 0
+        self.base_seq = 0
+        self.backlog_bytes = 0
+        self.next_seq = 0
+        self.total_bytes = 0
+        # Incomplete trailing frame, held back until its blank line arrives (event_ids only)
+        self._partial = b""
+        self._id_prefix = f"id: {stream_id}:".encode("utf-8")
+
+        self.subscribers = 0
+        self.peak_subscribers = 0
+        self.subscriptions = 0
+        self.lagged = 0
+
+        # One heartbeat timer per stream; subscribers compare against the shared counter
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeats = 0
+        self.max_idle_gap = 0.0
+        self._last_data = 0.0
+        self._last_output = 0.0
+        self._heartbeat_handle: Optional[asyncio.TimerHandle] = None
+
+        self._source = source
+        self._on_finish = on_finish
+        self._producer: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+        self._linger_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    def _ingest(self, chunk: bytes):
+        """Add an upstream chunk; with event_ids each complete frame becomes its own numbered entry."""
+        if self.heartbeat_interval > 0:
+            self._mark_data()
+        if not self.event_ids:
+            self._append(chunk)
+            self._notify()
+            return
+        data = self._partial + chunk if self._partial else chunk
+        end = data.rfind(b"\n\n")
+        if end == -1:
+            self._partial = data
+            return
+        self._partial = data[end + 2:]
+        for frame in data[:end].split(b"\n\n"):
+            if frame:
+                self._append(self._stamp(frame + b"\n\n"))
+        self._notify()
+
+    def _stamp(self, frame: bytes) -> bytes:
+        """Prefix `id: <stream>:<seq>` to frames that carry data; comments and bare fields stay unnumbered."""
+        if frame.startswith(b"data:") or b"\ndata:" in frame:
+            return self._id_prefix + str(self.next_seq).encode("ascii") + b"\n" + frame
+        return frame
+
+    def _append(self, chunk: bytes):
+        self._chunks.append(chunk)
+        self.next_seq += 1
+        self.backlog_bytes += len(chunk)
+        self.total_bytes += len(chunk)
+        # Keep at least the newest chunk so live subscribers can always read it
+        while self.backlog_bytes > self.hub.backlog_bytes and self.next_seq - self.base_seq > 1:
+            self.backlog_bytes -= len(self._chunks[self._head])
+            self._chunks[self._head] = b""
+            self._head += 1
+            self.base_seq += 1
+        if self._head > 1024 and self._head * 2 > len(self._chunks):
+            del self._chunks[:self._head]
+            self._head = 0
+
+    def _notify(self):
+        # Wake every waiting subscriber; later waits use a fresh event
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def _start(self):
+        if self._producer is None and not self.done:
+            self._producer = asyncio.create_task(self._produce())
+            if self.heartbeat_interval > 0:
+                self._last_data = self._last_output = time.monotonic()
+                self._arm_heartbeat()
+
+    def _mark_data(self):
+        now = time.monotonic()
+        gap = now - self._last_data
+        self.max_idle_gap = max(self.max_idle_gap, gap)
+        self.hub._record_idle_gap(gap)
+        self._last_data = self._last_output = now
+
+    def _arm_heartbeat(self):
+        loop = asyncio.get_running_loop()
+        delay = self._last_output + self.heartbeat_interval - time.monotonic()
+        self._heartbeat_handle = loop.call_later(max(delay, 0.0), self._heartbeat)
+
+    def _heartbeat(self):
+        """Timer callback: wake subscribers with a ping if nothing was sent for a full interval."""
+        self._heartbeat_handle = None
+        if self.done:
+            return
+        now = time.monotonic()
+        if now - self._last_output >= self.heartbeat_interval:
+            self._last_output = now
+            if self.subscribers:
+                self.heartbeats += 1
+                self._notify()
+        self._arm_heartbeat()
+
+    async def _produce(self):
+        try:
+            async for chunk in self._source:
+                if chunk:
+                    self._ingest(chunk if isinstance(chunk, bytes) else chunk.encode("utf-8"))
+        except asyncio.CancelledError:
+            self.cancelled = True
+        except Exception as e:
+            logger.error(f"Stream {self.id} upstream failed: {e}")
+            self.error = str(e)
+        finally:
+            if self._heartbeat_handle is not None:
+                self._heartbeat_handle.cancel()
+                self._heartbeat_handle = None
+            if self._partial:
+                # An unterminated last frame is passed through as-is
+                self._append(self._partial)
+                self._partial = b""
+            self.finished_at = time.time()
+            self._notify()
+            if hasattr(self._source, "aclose"):
+                try:
+                    await self._source.aclose()
+                except Exception as e:
+                    logger.debug(f"Error closing stream {self.id} source: {e}")
+            self._finish_callback()
+            self.hub._finished(self)
+
+    def _finish_callback(self):
+        on_finish, self._on_finish = self._on_finish, None
+        if on_finish:
+            try:
+                on_finish()
+            except Exception as e:
+                logger.error(f"Stream {self.id} finish callback failed: {e}")
+
+    def _abandon(self):
+        """Expire a stream nobody ever read; its source was never started."""
+        self.finished_at = time.time()
+        self.cancelled = True
+        self._finish_callback()
+
+    def _detach(self):
+        self.subscribers -= 1
+        if self.subscribers > 0 or self.done or self._producer is None:
+            return
+        if self.hub.linger > 0:
+            # Give a reconnecting client the chance to attach before the upstream is dropped
+            loop = asyncio.get_running_loop()
+            self._linger_handle = loop.call_later(self.hub.linger, self._cancel_if_unwatched)
+        else:
+            self._cancel_if_unwatched()
+
+    def _cancel_if_unwatched(self):
+        self._linger_handle = None
+        if self.subscribers == 0 and not self.done and self._producer is not None:
+            logger.info(f"Stream {self.id} has no subscribers; cancelling upstream")
+            self._producer.cancel()
+
+    def can_resume(self, from_seq: int) -> bool:
+        """True while everything from `from_seq` on is still held (or yet to come)."""
+        return self.base_seq <= from_seq <= self.next_seq
+
+    async def subscribe(self, from_seq: Optional[int] = None) -> AsyncGenerator[bytes, None]:
+        """
+        Read the stream: backlog first, then live chunks as they are produced.
+
+        Args:
+            from_seq: First sequence number wanted (oldest held chunk when omitted)
+
+        Yields:
+            Everything available since the last read, joined into one write, or a
+            heartbeat comment when the stream has been idle; ends early if this
+            subscriber falls out of the backlog
+        """
+        self.subscribers += 1
+        self.subscriptions += 1
+        self.peak_subscribers = max(self.peak_subscribers, self.subscribers)
+        if self._linger_handle is not None:
+            self._linger_handle.cancel()
+            self._linger_handle = None
+        self._start()
+
+        cursor = self.base_seq if from_seq is None else max(from_seq, 0)
+        heartbeats = self.heartbeats
+        try:
+            while True:
+                if cursor < self.base_seq:
+                    self.lagged += 1
+                    logger.warning(f"Subscriber of stream {self.id} fell {self.base_seq - cursor} chunks behind the backlog; disconnecting")
+                    return
+                if cursor < self.next_seq:
+                    start = self._head + cursor - self.base_seq
+                    end = self._head + self.next_seq - self.base_seq
+                    cursor = self.next_seq
+                    heartbeats = self.heartbeats
+                    yield self._chunks[start] if end - start == 1 else b"".join(self._chunks[start:end])
+                    continue
+                if self.done:
+                    return
+                if heartbeats != self.heartbeats:
+                    heartbeats = self.heartbeats
+                    self.hub.heartbeats_sent += 1
+                    yield HEARTBEAT
+                    continue
+                await self._changed.wait()
+        finally:
+            self._detach()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "done": self.done,
+            "cancelled": self.cancelled,
+            "error": self.error,
+            "subscribers": self.subscribers,
+            "peak_subscribers": self.peak_subscribers,
+            "subscriptions": self.subscriptions,
+            "lagged": self.lagged,
+            "chunks": self.next_seq,
+            "total_bytes": self.total_bytes,
+            "backlog_bytes": self.backlog_bytes,
+            "backlog_from": self.base_seq,
+            "heartbeats": self.heartbeats,
+            "max_idle_gap_seconds": round(self.max_idle_gap, 1),
+            "age_seconds": round(time.time() - self.created_at, 1)
+        }
+
+
+class StreamHub:
+    """
+    Registry of published streams.
+
+    One upstream generation is read once and served to every subscriber.
+    Finished streams stay attachable for `retention` seconds.
+    """
+
+    def __init__(
+        self,
+        backlog_bytes: int = 1024 * 1024,
+        retention: float = 60.0,
+        linger: float = 0.0,
+        max_streams: int = 1000,
+        heartbeat_interval: float = 0.0
+    ):
+        self.backlog_bytes = backlog_bytes
+        self.retention = retention
+        self.linger = linger
+        self.max_streams = max_streams
+        self.heartbeat_interval = heartbeat_interval
+        self.streams: Dict[str, HubStream] = {}
+        self._finished_order: Deque[str] = deque()
+        self.published = 0
+        self.attached = 0
+        self.resumed = 0
+        self.resume_failed = 0
+        self.expired = 0
+        self.heartbeats_sent = 0
+        self.idle_gaps = [0] * (len(IDLE_GAP_BUCKETS) + 1)
+
+    def publish(
+        self,
+        source: AsyncIterable[bytes],
+        tenant: Optional[str] = None,
+        media_type: str = "text/event-stream",
+        headers: Optional[Dict[str, str]] = None,
+        on_finish: Optional[Callable[[], Any]] = None,
+        event_ids: bool = False
+    ) -> HubStream:
+        """
+        Register an upstream stream; it starts when the first subscriber reads.
+
+        Args:
+            source: Upstream chunk generator (read exactly once)
+            tenant: Owner; only the same tenant may attach later
+            media_type: Media type for attached responses
+            headers: Response headers for attached responses
+            on_finish: Called once when the upstream ends, fails or is cancelled
+            event_ids: Stamp each event-stream frame with a resumable `id:`
+                and send heartbeat comments while the upstream is idle
+
+        Returns:
+            HubStream: The published stream (subscribe() to read it)
+        """
+        self._sweep()
+        stream = HubStream(
+            self, f"strm_{uuid.uuid4().hex}", source, tenant, media_type, dict(headers or {}), on_finish,
+            event_ids, self.heartbeat_interval if event_ids else 0.0
+        )
+        self.streams[stream.id] = stream
+        self.published += 1
+        return stream
+
+    def get(self, stream_id: str, tenant: Optional[str] = None) -> HubStream:
+        """
+        Look up a stream for attaching another subscriber.
+
+        Raises:
+            StreamNotFound: Unknown or expired ID, or a different tenant
+        """
+        self._sweep()
+        stream = self.streams.get(stream_id)
+        if stream is None or (stream.tenant is not None and stream.tenant != tenant):
+            raise StreamNotFound(f"Stream {stream_id} not found")
+        self.attached += 1
+        return stream
+
+    def resume(self, last_event_id: str, tenant: Optional[str] = None) -> Tuple[HubStream, int]:
+        """
+        Find where a client that last saw `last_event_id` should continue.
+
+        Args:
+            last_event_id: The client's Last-Event-ID (`<stream id>:<seq>`)
+            tenant: Requesting tenant
+
+        Returns:
+            Tuple[HubStream, int]: The stream and the sequence number after that event
+
+        Raises:
+            StreamNotFound: Malformed ID, unknown or expired stream, a cancelled
+                upstream, or an event that has already left the backlog
+        """
+        try:
+            stream_id, _, seq = last_event_id.strip().rpartition(":")
+            if not stream_id or not seq.isdigit():
+                raise StreamNotFound(f"Invalid event ID {last_event_id!r}")
+            stream = self.get(stream_id, tenant)
+            from_seq = int(seq) + 1
+            if stream.cancelled:
+                raise StreamNotFound(f"Stream {stream_id} was cancelled before it finished")
+            if not stream.can_resume(from_seq):
+                raise StreamNotFound(f"Event {last_event_id} is no longer held for stream {stream_id}")
+        except StreamNotFound:
+            self.resume_failed += 1
+            raise
+        self.resumed += 1
+        return stream, from_seq
+
+    def _record_idle_gap(self, gap: float):
+        for i, bound in enumerate(IDLE_GAP_BUCKETS):
+            if gap <= bound:
+                self.idle_gaps[i] += 1
+                return
+        self.idle_gaps[-1] += 1
+
+    def _finished(self, stream: HubStream):
+        self._finished_order.append(stream.id)
+        self._sweep()
+
+    def _sweep(self):
+        """Drop finished streams past retention, and the oldest finished ones over max_streams."""
+        now = time.time()
+        if len(self.streams) > len(self._finished_order):
+            for stream in list(self.streams.values()):
+                if stream._producer is None and not stream.done and now - stream.created_at >= self.retention:
+                    stream._abandon()
+                    self._finished_order.append(stream.id)
+        while self._finished_order:
+            stream = self.streams.get(self._finished_order[0])
+            over_limit = len(self.streams) > self.max_streams
+            if stream is not None and not over_limit and now - stream.finished_at < self.retention:
+                break
+            self._finished_order.popleft()
+            if stream is not None:
+                del self.streams[stream.id]
+                self.expired += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hub-wide counters and per-stream state"""
+        self._sweep()
+        streams: List[Dict[str, Any]] = [stream.get_stats() for stream in self.streams.values()]
+        return {
+            "streams": len(streams),
+            "live_streams": sum(1 for s in streams if not s["done"]),
+            "subscribers": sum(s["subscribers"] for s in streams),
+            "backlog_bytes": sum(s["backlog_bytes"] for s in streams),
+            "published": self.published,
+            "attached": self.attached,
+            "reconnects": self.resumed,
+            "reconnects_failed": self.resume_failed,
+            "expired": self.expired,
+            "lagged": sum(s["lagged"] for s in streams),
+            "backlog_limit_bytes": self.backlog_bytes,
+            "retention_seconds": self.retention,
+            "linger_seconds": self.linger,
+            "heartbeat_seconds": self.heartbeat_interval,
+            "heartbeats_sent": self.heartbeats_sent,
+            # Seconds between consecutive upstream writes; the first is measured from stream start
+            "idle_gap_histogram": {
+                **{f"le_{bound:g}": count for bound, count in zip(IDLE_GAP_BUCKETS, self.idle_gaps)},
+                f"gt_{IDLE_GAP_BUCKETS[-1]:g}": self.idle_gaps[-1]
+            },
+            "recent": streams[-20:]
+        }
@@ -0,0 +1,180 @@
+"""
+Streaming output stage: immediate, coalescing or paced delivery of chunks.
+Replaces per-chunk sleeps so in-memory responses are not artificially slowed,
+while still letting an endpoint batch frames or rate-limit output when asked.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, AsyncGenerator, AsyncIterable, Dict, Iterable, List, Optional, Union
+
+Chunk = Union[str, bytes]
+
+
+class PacingMode(Enum):
+    """How chunks are released to the client"""
+    IMMEDIATE = "immediate"  # Forward every chunk as soon as it arrives
+    COALESCE = "coalesce"  # Merge chunks, flushing every flush_bytes or flush_interval
+    PACED = "paced"  # Release at most chars_per_second
+
+
+@dataclass
+class PacingConfig:
+    """Per-endpoint streaming output settings"""
+    mode: PacingMode = PacingMode.IMMEDIATE
+    flush_bytes: int = 1024
+    flush_interval: float = 0.02
+    chars_per_second: float = 400.0
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]], default_mode: PacingMode = PacingMode.IMMEDIATE) -> "PacingConfig":
+        """
+        Build from an endpoint's `streaming` config section.
+
+        Args:
+            data: e.g. {"mode": "coalesce", "flush_bytes": 2048, "flush_interval_ms": 25}
+            default_mode: Mode used when the section doesn't name one
+
+        Returns:
+            PacingConfig: Parsed settings
+        """
+        data = data or {}
+        try:
+            mode = PacingMode(str(data.get("mode", default_mode.value)).lower())
+        except ValueError:
+            mode = default_mode
+        return cls(
+            mode=mode,
+            flush_bytes=int(data.get("flush_bytes", cls.flush_bytes)),
+            flush_interval=float(data.get("flush_interval_ms", cls.flush_interval * 1000)) / 1000,
+            chars_per_second=float(data.get("chars_per_second", cls.chars_per_second))
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode.value,
+            "flush_bytes": self.flush_bytes,
+            "flush_interval_ms": round(self.flush_interval * 1000, 3),
+            "chars_per_second": self.chars_per_second
+        }
+
+
+async def iterate_chunks(chunks: Iterable[Chunk]) -> AsyncGenerator[Chunk, None]:
+    """Adapt an in-memory sequence of chunks to an async stream."""
+    for chunk in chunks:
+        yield chunk
+
+
+def split_words(text: str) -> List[str]:
+    """Split a complete response into word chunks (leading space on all but the first)."""
+    words = text.split()
+    return [word if i == 0 else f" {word}" for i, word in enumerate(words)]
+
+
+async def pace_stream(
+    source: Union[AsyncIterable[Chunk], Iterable[Chunk]],
+    config: Optional[PacingConfig] = None
+) -> AsyncGenerator[Chunk, None]:
+    """
+    Deliver a chunk stream according to a pacing config.
+
+    Args:
+        source: Async or in-memory iterable of str or bytes chunks
+        config: Pacing settings (immediate when omitted)
+
+    Yields:
+        Chunks, merged in coalescing mode
+    """
+    config = config or PacingConfig()
+    if not hasattr(source, "__aiter__"):
+        source = iterate_chunks(source)
+
+    if config.mode == PacingMode.COALESCE:
+        stream = _coalesce(source, config.flush_bytes, config.flush_interval)
+    elif config.mode == PacingMode.PACED:
+        stream = _paced(source, config.chars_per_second)
+    else:
+        stream = source
+
+    try:
+        async for chunk in stream:
+            yield chunk
+    finally:
+        for generator in (stream, source):
+            if hasattr(generator, "aclose"):
+                await generator.aclose()
+
+
+async def _coalesce(source: AsyncIterable[Chunk], flush_bytes: int, flush_interval: float) -> AsyncGenerator[Chunk, None]:
+    """Merge chunks until flush_bytes are buffered or flush_interval passes since the first."""
+    iterator = source.__aiter__()
+    buffer: List[Chunk] = []
+    buffered = 0
+    first_at = 0.0
+    pending: Optional[asyncio.Future] = None
+
+    def flush() -> Chunk:
+        nonlocal buffered
+        joined = (b"" if isinstance(buffer[0], bytes) else "").join(buffer)
+        buffer.clear()
+        buffered = 0
+        return joined
+
+    try:
+        while True:
+            if not buffer:
+                # Nothing to flush on a timer; wait for the next chunk directly
+                if pending is None:
+                    try:
+                        chunk = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        return
+                else:
+                    try:
+                        chunk = await pending
+                    except StopAsyncIteration:
+                        return
+                    pending = None
+                first_at = time.monotonic()
+            else:
+                if pending is None:
+                    # Keep the same read in flight across flushes; cancelling it would end the source
+                    pending = asyncio.ensure_future(iterator.__anext__())
+                remaining = flush_interval - (time.monotonic() - first_at)
+                if remaining > 0 and not pending.done():
+                    await asyncio.wait({pending}, timeout=remaining)
+                if not pending.done():
+                    yield flush()
+                    continue
+                try:
+                    chunk = pending.result()
+                except StopAsyncIteration:
+                    pending = None
+                    yield flush()
+                    return
+                pending = None
+
+            buffer.append(chunk)
+            buffered += len(chunk)
+            if buffered >= flush_bytes:
+                yield flush()
+    finally:
+        if pending is not None and not pending.done():
+            # Let the cancelled read unwind so the source can be closed afterwards
+            pending.cancel()
+            await asyncio.wait({pending})
+
+
+async def _paced(source: AsyncIterable[Chunk], chars_per_second: float) -> AsyncGenerator[Chunk, None]:
+    """Release chunks no faster than chars_per_second, without delaying a slow source further."""
+    started = time.monotonic()
+    sent = 0
+    async for chunk in source:
+        due = started + sent / chars_per_second if chars_per_second > 0 else 0
+        delay = due - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        yield chunk
+        sent += len(chunk)
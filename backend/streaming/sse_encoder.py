@@ -0,0 +1,218 @@
+"""
+Fast Server-Sent Event encoders for OpenAI (chat and text), Anthropic and Gemini streams.
+Each encoder serializes the static part of a chunk (id, model, created, ...)
+once per request; per-delta work is a single JSON string escape.
+"""
+
+import json
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# Stand-in value that marks where the delta text goes in a chunk template
+_SENTINEL = "\x00delta\x00"
+
+SSE_DONE = b"data: [DONE]\n\n"
+
+
+def dumps(value: Any) -> bytes:
+    """Serialize a value to JSON bytes, using orjson when it is installed."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value)
+    return json.dumps(value).encode("utf-8")
+
+
+def escape_text(text: str) -> bytes:
+    """JSON-encode a single string (quotes included)."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(text)
+    return json.dumps(text).encode("utf-8")
+
+
+def sse_frame(data: Dict[str, Any], event: Optional[str] = None) -> bytes:
+    """Encode a one-off SSE frame; use a template for anything sent per delta."""
+    head = b"event: " + event.encode("utf-8") + b"\n" if event else b""
+    return head + b"data: " + dumps(data) + b"\n\n"
+
+
+def split_template(template: Dict[str, Any], event: Optional[str] = None) -> Tuple[bytes, bytes]:
+    """
+    Pre-serialize an SSE frame around the single value equal to the sentinel.
+
+    Args:
+        template: Chunk payload with exactly one string value set to _SENTINEL
+        event: Optional SSE event name
+
+    Returns:
+        Tuple[bytes, bytes]: Frame bytes before and after the delta's JSON string
+    """
+    frame = sse_frame(template, event)
+    marker = escape_text(_SENTINEL)
+    prefix, found, suffix = frame.partition(marker)
+    if not found:
+        raise ValueError("Chunk template does not contain the delta sentinel")
+    return prefix, suffix
+
+
+class OpenAIChunkEncoder:
+    """Encodes chat.completion.chunk frames for one streamed response."""
+
+    def __init__(self, request_id: str, model: str, created: Optional[int] = None):
+        self.request_id = request_id
+        self.model = model
+        self.created = created or int(time.time())
+        self._suffixes: Dict[Optional[str], bytes] = {}
+        self._prefix, self._suffixes[None] = self._template(None)
+
+    def _template(self, finish_reason: Optional[str]) -> Tuple[bytes, bytes]:
+        return split_template({
+            "id": self.request_id,
+            "object": "chat.completion.chunk",
+            "created": self.created,
+            "model": self.model,
+            "choices": [{
+                "index": 0,
+                "delta": {"role": "assistant", "content": _SENTINEL, "name": None},
+                "finish_reason": finish_reason
+            }]
+        })
+
+    def delta(self, content: str) -> bytes:
+        """Frame for a content delta."""
+        return self._prefix + escape_text(content) + self._suffixes[None]
+
+    def chunk(self, content: str = "", finish_reason: Optional[str] = None) -> bytes:
+        """Frame with an explicit finish_reason (final and error chunks)."""
+        suffix = self._suffixes.get(finish_reason)
+        if suffix is None:
+            suffix = self._suffixes[finish_reason] = self._template(finish_reason)[1]
+        return self._prefix + escape_text(content) + suffix
+
+    def done(self) -> bytes:
+        return SSE_DONE
+
+
+class TextCompletionChunkEncoder(OpenAIChunkEncoder):
+    """Encodes text_completion frames (legacy /v1/completions) for one streamed response."""
+
+    def _template(self, finish_reason: Optional[str]) -> Tuple[bytes, bytes]:
+        return split_template({
+            "id": self.request_id,
+            "object": "text_completion",
+            "created": self.created,
+            "model": self.model,
+            "choices": [{
+                "text": _SENTINEL,
+                "index": 0,
+                "logprobs": None,
+                "finish_reason": finish_reason
+            }]
+        })
+
+
+class AnthropicEventEncoder:
+    """Encodes the Messages API event sequence for one streamed response."""
+
+    def __init__(self, model: str, message_id: Optional[str] = None, index: int = 0):
+        self.model = model
+        self.message_id = message_id or f"msg_{uuid.uuid4().hex[:24]}"
+        self.index = index
+        self._prefix, self._suffix = split_template({
+            "type": "content_block_delta",
+            "index": index,
+            "delta": {"type": "text_delta", "text": _SENTINEL}
+        }, event="content_block_delta")
+
+    def message_start(self, input_tokens: int = 0) -> bytes:
+        return sse_frame({
+            "type": "message_start",
+            "message": {
+                "id": self.message_id,
+                "type": "message",
+                "role": "assistant",
+                "model": self.model,
+                "content": [],
+                "stop_reason": None,
+                "stop_sequence": None,
+                "usage": {
+                    "input_tokens": input_tokens,
+                    "cache_creation_input_tokens": 0,
+                    "cache_read_input_tokens": 0,
+                    "output_tokens": 0
+                }
+            }
+        }, event="message_start")
+
+    def content_block_start(self) -> bytes:
+        return sse_frame(
+            {"type": "content_block_start", "index": self.index, "content_block": {"type": "text", "text": ""}},
+            event="content_block_start"
+        )
+
+    def ping(self) -> bytes:
+        return sse_frame({"type": "ping"}, event="ping")
+
+    def delta(self, text: str) -> bytes:
+        """content_block_delta frame for a text delta."""
+        return self._prefix + escape_text(text) + self._suffix
+
+    def content_block_stop(self) -> bytes:
+        return sse_frame({"type": "content_block_stop", "index": self.index}, event="content_block_stop")
+
+    def message_delta(self, stop_reason: str = "end_turn", output_tokens: int = 0) -> bytes:
+        return sse_frame({
+            "type": "message_delta",
+            "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+            "usage": {"output_tokens": output_tokens}
+        }, event="message_delta")
+
+    def message_stop(self) -> bytes:
+        return sse_frame({"type": "message_stop"}, event="message_stop")
+
+    def done(self) -> bytes:
+        return SSE_DONE
+
+
+class GeminiChunkEncoder:
+    """Encodes streamGenerateContent chunks for one streamed response."""
+
+    def __init__(self):
+        self._prefix, self._suffix = split_template({
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": _SENTINEL}]},
+                "finishReason": None,
+                "index": 0
+            }]
+        })
+
+    def delta(self, text: str) -> bytes:
+        """Chunk frame for a text delta."""
+        return self._prefix + escape_text(text) + self._suffix
+
+    def final(self, prompt_tokens: int = 0, completion_tokens: int = 0) -> bytes:
+        """Closing chunk with finishReason and usage metadata."""
+        return sse_frame({
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": ""}]},
+                "finishReason": "STOP",
+                "index": 0
+            }],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": completion_tokens,
+                "totalTokenCount": prompt_tokens + completion_tokens
+            }
+        })
+
+    def error(self, message: str, code: int = 500) -> bytes:
+        return sse_frame({"error": {"code": code, "message": message, "status": "INTERNAL"}})
+
+    def done(self) -> bytes:
+        return SSE_DONE
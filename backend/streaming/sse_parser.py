@@ -0,0 +1,186 @@
+"""
+Incremental Server-Sent Events parser for upstream REST streams.
+Works directly on network chunks (bytes, bytearray or memoryview), follows the
+event-stream field rules, and has a fast path for OpenAI delta content.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from json.decoder import scanstring
+from typing import Any, Iterable, Iterator, List, Optional, Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+# Sentinel returned by extract_openai_delta when the fast path can't decide
+NEEDS_JSON = object()
+
+# "delta": {["role": "...",] "content": then either null or the opening quote of the string
+_DELTA_CONTENT = re.compile(
+    r'"delta"\s*:\s*\{\s*(?:"role"\s*:\s*"[a-z]*"\s*,\s*)?"content"\s*:\s*(?:(null)|")'
+)
+
+
+@dataclass
+class SSEEvent:
+    """One dispatched event"""
+    data: str
+    event: str = "message"
+    id: Optional[str] = None
+    retry: Optional[int] = None
+
+    @property
+    def is_done(self) -> bool:
+        """True for the OpenAI-style `data: [DONE]` terminator."""
+        return self.data == "[DONE]"
+
+    def json(self) -> Any:
+        return json.loads(self.data)
+
+
+class SSEParser:
+    """
+    Incremental event-stream parser.
+
+    Feed raw chunks as they arrive; complete events are returned as soon as
+    their terminating blank line is seen. Lines may be split across chunks and
+    end in LF, CRLF or CR. Multi-line `data:` fields are joined with newlines,
+    `event:`/`id:`/`retry:` are honoured and comment lines are skipped.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._data: List[str] = []
+        self._event: Optional[str] = None
+        self.last_event_id: Optional[str] = None
+        self.retry: Optional[int] = None
+
+    def feed(self, chunk: Buffer) -> List[SSEEvent]:
+        """
+        Parse a chunk of the stream.
+
+        Args:
+            chunk: Raw bytes from the connection
+
+        Returns:
+            List[SSEEvent]: Events completed by this chunk (often empty or one)
+        """
+        buffer = self._buffer
+        buffer += chunk
+        if b"\r" in buffer:
+            self._normalize_newlines()
+
+        cut = buffer.rfind(b"\n")
+        if cut == -1:
+            return []
+        # Complete lines are split in one pass; the partial tail stays buffered
+        lines = buffer[:cut].split(b"\n")
+        del buffer[:cut + 1]
+
+        events: List[SSEEvent] = []
+        data = self._data
+        for line in lines:
+            if not line:
+                if data:
+                    events.append(self._dispatch())
+                    data = self._data
+                else:
+                    self._event = None
+            elif line.startswith(b"data: "):
+                data.append(line[6:].decode("utf-8", "replace"))
+            elif line[0] != 0x3A:  # ':' starts a comment
+                self._process_field(line)
+        return events
+
+    def iter_events(self, chunks: Iterable[Buffer]) -> Iterator[SSEEvent]:
+        """Parse a blocking iterable of chunks, yielding events as they complete."""
+        for chunk in chunks:
+            yield from self.feed(chunk)
+
+    def reset(self):
+        """Drop any partial line or event (e.g. before reusing the parser for a new stream)."""
+        self._buffer.clear()
+        self._data.clear()
+        self._event = None
+
+    def _normalize_newlines(self):
+        """Rewrite CRLF and lone CR line endings to LF, holding back a trailing CR that may start a CRLF."""
+        buffer = self._buffer
+        trailing_cr = buffer.endswith(b"\r")
+        if trailing_cr:
+            del buffer[-1:]
+        normalized = buffer.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        buffer[:] = normalized
+        if trailing_cr:
+            buffer += b"\r"
+
+    def _process_field(self, line: bytearray):
+        field, colon, value = line.partition(b":")
+        if colon and value.startswith(b" "):
+            value = value[1:]
+
+        if field == b"data":
+            self._data.append(value.decode("utf-8", "replace"))
+        elif field == b"event":
+            self._event = value.decode("utf-8", "replace")
+        elif field == b"id":
+            if b"\x00" not in value:
+                self.last_event_id = value.decode("utf-8", "replace")
+        elif field == b"retry":
+            if value.isdigit():
+                self.retry = int(value)
+
+    def _dispatch(self) -> SSEEvent:
+        data = self._data[0] if len(self._data) == 1 else "\n".join(self._data)
+        event = SSEEvent(
+            data=data,
+            event=self._event or "message",
+            id=self.last_event_id,
+            retry=self.retry
+        )
+        self._data = []
+        self._event = None
+        return event
+
+
+def extract_openai_delta(data: str) -> Any:
+    """
+    Read choices[0].delta.content from a chat.completion.chunk without building the dict.
+
+    Args:
+        data: The event's data field
+
+    Returns:
+        The content string, None when the delta carries no content, or
+        NEEDS_JSON when the payload isn't a simple single-choice delta
+    """
+    match = _DELTA_CONTENT.search(data)
+    if match is None:
+        if '"delta"' in data and '"content"' not in data:
+            return None
+        return NEEDS_JSON
+    # Quotes inside JSON strings are escaped, so a second "delta" key means another choice
+    if data.find('"delta"', match.end()) != -1:
+        return NEEDS_JSON
+    if match.group(1):
+        return None
+    try:
+        content, _ = scanstring(data, match.end())
+    except ValueError:
+        return NEEDS_JSON
+    return content
+
+
+def openai_delta_content(data: str) -> Optional[str]:
+    """choices[0].delta.content of a chunk, using the fast path when it applies."""
+    content = extract_openai_delta(data)
+    if content is not NEEDS_JSON:
+        return content
+    try:
+        payload = json.loads(data)
+    except json.JSONDecodeError:
+        return None
+    choices = payload.get("choices") if isinstance(payload, dict) else None
+    if not choices:
+        return None
+    return (choices[0].get("delta") or {}).get("content")
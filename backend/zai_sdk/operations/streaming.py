@@ -73,14 +73,18 @@ class StreamingOperations:
             stream=True
         )
         
-        for line in response.iter_lines(decode_unicode=True):
-            if line:
-                data = self.sse_parser.parse_line(line)
-                if data:
-                    chunk = self._create_streaming_chunk(data)
-                    yield chunk
-                    if chunk.done:
-                        break
+        # Parse raw chunks incrementally so multi-line data fields and split lines are handled
+        parser = SSEParser()
+        for event in parser.iter_events(response.iter_content(chunk_size=None)):
+            try:
+                data = json.loads(event.data)
+            except json.JSONDecodeError:
+                continue
+            if data:
+                chunk = self._create_streaming_chunk(data)
+                yield chunk
+                if chunk.done:
+                    break
     
     def _get_default_features(self, enable_thinking: bool) -> Dict[str, Any]:
         """
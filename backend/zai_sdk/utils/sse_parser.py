@@ -3,9 +3,15 @@
 import json
 from typing import Any, Dict, Optional
 
+from ...streaming.sse_parser import SSEParser as StreamParser
 
-class SSEParser:
-    """Parser for Server-Sent Events."""
+
+class SSEParser(StreamParser):
+    """Parser for Server-Sent Events.
+    
+    Incremental parsing (``feed``) is shared with the endpoint manager's
+    streaming package; ``parse_line`` is kept for line-at-a-time callers.
+    """
     
     def parse_line(self, line: str) -> Optional[Dict[str, Any]]:
         """
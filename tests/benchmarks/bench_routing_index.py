@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Routing Index Benchmark
+Per-request endpoint selection with hundreds of registered endpoints: the old
+path (get_info() for every endpoint, sort, then linear name/substring/model
+scans) against routing index lookups, plus the cost of keeping the index
+current when an endpoint is added, removed or re-prioritised.
+
+Run from the repository root:
+    python tests/benchmarks/bench_routing_index.py [--endpoints 500 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.routing.routing_index import RoutingIndex
+
+PROVIDERS = ["openai", "anthropic", "deepseek", "gemini", "mistral", "zai", "codegen", "qwen"]
+
+
+class BenchEndpoint:
+    """Stands in for a BaseEndpoint: same attributes and get_info() shape."""
+
+    def __init__(self, index: int):
+        provider = PROVIDERS[index % len(PROVIDERS)]
+        self.name = f"{provider}-web-{index}"
+        self.priority = random.randint(1, 100)
+        self.config = {
+            "provider_type": "rest_api",
+            "url": f"https://{provider}.example.com/v1",
+            "model": f"{provider}-model-{index}",
+            "aliases": [f"{provider}-{index}"],
+            "timeout": 30,
+        }
+        self.total_requests = random.randint(0, 10000)
+        self.successful_requests = self.total_requests // 2
+        self.total_response_time = self.successful_requests * 420.0
+
+    def get_info(self):
+        return {
+            "name": self.name,
+            "type": "restapi",
+            "url": self.config["url"],
+            "priority": self.priority,
+            "status": "running",
+            "health": "healthy",
+            "config": self.config,
+            "metrics": {
+                "total_requests": self.total_requests,
+                "successful_requests": self.successful_requests,
+                "success_rate": self.successful_requests / max(self.total_requests, 1) * 100,
+                "average_response_time": self.total_response_time / max(self.successful_requests, 1),
+            },
+            "session_data": {"has_session": False, "session_keys": []},
+        }
+
+
+def legacy_route(endpoints, model):
+    """What PriorityRouter did per request before the index."""
+    infos = sorted(
+        (endpoint.get_info() for endpoint in endpoints),
+        key=lambda x: (x.get("priority", 0), x.get("name", "")),
+        reverse=True
+    )
+    for info in infos:
+        if info.get("name") == model:
+            return infos, info
+    for info in infos:
+        if model.lower() in info.get("name", "").lower():
+            return infos, info
+    for info in infos:
+        if info.get("model") == model:
+            return infos, info
+    return infos, None
+
+
+def indexed_route(index, model):
+    return index.prioritized(), index.lookup(model)
+
+
+def per_request(label, route, requests):
+    start = time.perf_counter()
+    found = 0
+    for model in requests:
+        _, endpoint = route(model)
+        found += endpoint is not None
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<10} {elapsed / len(requests) * 1e6:>10.1f} µs/request  ({found}/{len(requests)} matched)")
+    return elapsed
+
+
+def run(count: int, requests: int):
+    random.seed(count)
+    endpoints = [BenchEndpoint(i) for i in range(count)]
+
+    start = time.perf_counter()
+    index = RoutingIndex()
+    for endpoint in endpoints:
+        index.add(endpoint)
+    build = time.perf_counter() - start
+
+    # Mix of exact names, prefixes ("deepseek"), aliases and misses
+    models = []
+    for i in range(requests):
+        endpoint = endpoints[i % count]
+        models.append(random.choice([
+            endpoint.name, endpoint.name.split("-")[0], endpoint.config["aliases"][0], "no-such-model"
+        ]))
+
+    # Both paths agree on ordering and on exact-name lookups
+    assert [e["name"] for e in legacy_route(endpoints, "x")[0]] == [e["name"] for e in index.prioritized()]
+    for endpoint in endpoints[:50]:
+        assert index.lookup(endpoint.name)["name"] == endpoint.name
+
+    print(f"📊 {count} endpoints, {requests} requests")
+    print(f"  index build {build * 1000:.1f} ms ({index.get_stats()['prefix_keys']} prefix keys)")
+    legacy = per_request("linear", lambda m: legacy_route(endpoints, m), models)
+    indexed = per_request("index", lambda m: indexed_route(index, m), models)
+    print(f"  speedup    {legacy / indexed:>10.1f}x")
+
+    # Incremental maintenance versus a full rebuild
+    extra = BenchEndpoint(count)
+    start = time.perf_counter()
+    for _ in range(100):
+        index.add(extra)
+        index.update_priority(extra.name, random.randint(1, 100))
+        index.remove(extra.name)
+    incremental = (time.perf_counter() - start) / 300
+    start = time.perf_counter()
+    index.rebuild(endpoints)
+    rebuild = time.perf_counter() - start
+    print(f"  update     {incremental * 1e6:>10.1f} µs/change (full rebuild {rebuild * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the routing index")
+    parser.add_argument("--endpoints", type=int, nargs="+", default=[500, 2000])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    import logging
+    logging.disable(logging.INFO)
+    for count in args.endpoints:
+        run(count, args.requests)
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+SSE Encoder Benchmark
+Chunks per second for the old per-delta model building + json.dumps path
+versus the precomputed encoders, for OpenAI, Anthropic and Gemini streams.
+
+Run from the repository root:
+    python tests/benchmarks/bench_sse_encoder.py [--chunks N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.adapter.response_transformer import create_chat_stream_chunk, format_sse_chunk
+from backend.adapter.gemini_transformer import create_gemini_stream_chunk
+from backend.streaming import sse_encoder
+from backend.streaming.sse_encoder import AnthropicEventEncoder, GeminiChunkEncoder, OpenAIChunkEncoder
+
+MODEL = "gpt-4"
+REQUEST_ID = "chatcmpl-123456"
+# Token-sized deltas with the characters that need escaping in real output
+DELTAS = ["Hello", " world", ",", " here's", " some", " `code`", ":\n", "    print(\"hi\")", " — done", "."]
+
+
+def legacy_openai(delta):
+    return format_sse_chunk(create_chat_stream_chunk(delta, MODEL, request_id=REQUEST_ID)).encode("utf-8")
+
+
+def legacy_anthropic(delta):
+    payload = {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': delta}}
+    return f"event: content_block_delta\ndata: {json.dumps(payload)}\n\n".encode("utf-8")
+
+
+def legacy_gemini(delta):
+    return f"data: {json.dumps(create_gemini_stream_chunk(content=delta))}\n\n".encode("utf-8")
+
+
+def measure(encode, chunks):
+    """Encode `chunks` deltas and return chunks per second."""
+    deltas = DELTAS
+    count = len(deltas)
+    start = time.perf_counter()
+    for i in range(chunks):
+        encode(deltas[i % count])
+    return chunks / (time.perf_counter() - start)
+
+
+def run(chunks):
+    dialects = [
+        ("openai", legacy_openai, lambda: OpenAIChunkEncoder(REQUEST_ID, MODEL).delta),
+        ("anthropic", legacy_anthropic, lambda: AnthropicEventEncoder(MODEL).delta),
+        ("gemini", legacy_gemini, lambda: GeminiChunkEncoder().delta),
+    ]
+    modes = [("stdlib json", False)]
+    if sse_encoder.ORJSON_AVAILABLE:
+        modes.append(("orjson", True))
+
+    print(f"📊 SSE encoding, {chunks} chunks per run")
+    print(f"{'dialect':<10} {'encoder':<12} {'chunks/s':>12} {'speedup':>8}")
+    for name, legacy, make_encoder in dialects:
+        baseline = measure(legacy, chunks)
+        print(f"{name:<10} {'legacy':<12} {baseline:>12,.0f} {'1.0x':>8}")
+        for label, use_orjson in modes:
+            sse_encoder.ORJSON_AVAILABLE = use_orjson
+            # Templates are built per response, so the encoder is created per mode
+            rate = measure(make_encoder(), chunks)
+            print(f"{name:<10} {label:<12} {rate:>12,.0f} {rate / baseline:>7.1f}x")
+        sse_encoder.ORJSON_AVAILABLE = sse_encoder.orjson is not None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark SSE chunk encoding")
+    parser.add_argument("--chunks", type=int, default=200000)
+    run(parser.parse_args().chunks)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+SSE Parser Benchmark
+Throughput of the old per-line decode/strip/json.loads loop versus the
+incremental parser (with full JSON decoding and with the delta fast path),
+replaying a multi-MB upstream stream in network-sized chunks.
+
+Run from the repository root:
+    python tests/benchmarks/bench_sse_parser.py [--megabytes N] [--recording FILE]
+
+A recording is a raw capture of an upstream response body (e.g. saved with
+`curl -N ... > stream.txt`); without one a chat.completion.chunk stream is generated.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.streaming.sse_parser import SSEParser, openai_delta_content
+
+DELTAS = ["Hello", " world", ",", " here's", " some", " `code`", ":\n", "    print(\"hi\")", " — done", "."]
+
+
+def generate_stream(megabytes: float) -> bytes:
+    """Build an OpenAI-style stream of roughly `megabytes` MB."""
+    frames = []
+    size = 0
+    i = 0
+    target = int(megabytes * 1024 * 1024)
+    while size < target:
+        frame = "data: " + json.dumps({
+            "id": "chatcmpl-8x2kq",
+            "object": "chat.completion.chunk",
+            "created": 1700000000,
+            "model": "gpt-4",
+            "choices": [{"index": 0, "delta": {"content": DELTAS[i % len(DELTAS)]}, "finish_reason": None}]
+        }) + "\n\n"
+        frames.append(frame)
+        size += len(frame)
+        i += 1
+    frames.append("data: [DONE]\n\n")
+    return "".join(frames).encode("utf-8")
+
+
+def network_chunks(stream: bytes, seed: int = 7):
+    """Split a stream at arbitrary points, like reads from a socket (1-16 KB)."""
+    rng = random.Random(seed)
+    chunks = []
+    position = 0
+    while position < len(stream):
+        size = rng.randint(1024, 16 * 1024)
+        chunks.append(stream[position:position + size])
+        position += size
+    return chunks
+
+
+def legacy(chunks):
+    """The old loop: iterate lines, decode, strip, slice 'data: ', json.loads every chunk."""
+    text = []
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            line = line.decode("utf-8").strip()
+            if line.startswith("data: "):
+                data_str = line[6:]
+                if data_str == "[DONE]":
+                    return "".join(text)
+                try:
+                    data = json.loads(data_str)
+                    if "choices" in data and data["choices"]:
+                        content = data["choices"][0].get("delta", {}).get("content", "")
+                        if content:
+                            text.append(content)
+                except json.JSONDecodeError:
+                    continue
+    return "".join(text)
+
+
+def parser_json(chunks):
+    text = []
+    parser = SSEParser()
+    for chunk in chunks:
+        for event in parser.feed(chunk):
+            if event.is_done:
+                return "".join(text)
+            data = json.loads(event.data)
+            content = data["choices"][0].get("delta", {}).get("content")
+            if content:
+                text.append(content)
+    return "".join(text)
+
+
+def parser_fast_path(chunks):
+    text = []
+    parser = SSEParser()
+    for chunk in chunks:
+        for event in parser.feed(memoryview(chunk)):
+            if event.is_done:
+                return "".join(text)
+            content = openai_delta_content(event.data)
+            if content:
+                text.append(content)
+    return "".join(text)
+
+
+async def aiohttp_replay(chunks, consume):
+    """Feed chunks through an aiohttp StreamReader, as a response body would arrive."""
+    from aiohttp.base_protocol import BaseProtocol
+    from aiohttp.streams import StreamReader
+
+    loop = asyncio.get_running_loop()
+    # A limit above the stream size keeps the reader from pausing a transport that isn't there
+    reader = StreamReader(BaseProtocol(loop), 2 ** 30, loop=loop)
+    for chunk in chunks:
+        reader.feed_data(chunk)
+    reader.feed_eof()
+    return await consume(reader)
+
+
+async def legacy_readline(reader):
+    """The old endpoint loop over `async for line in response.content`."""
+    text = []
+    async for line in reader:
+        line = line.decode("utf-8").strip()
+        if line.startswith("data: "):
+            data_str = line[6:]
+            if data_str == "[DONE]":
+                break
+            try:
+                data = json.loads(data_str)
+                if "choices" in data and data["choices"]:
+                    content = data["choices"][0].get("delta", {}).get("content", "")
+                    if content:
+                        text.append(content)
+            except json.JSONDecodeError:
+                continue
+    return "".join(text)
+
+
+async def parser_chunked(reader):
+    """The new loop over `response.content.iter_chunked(...)`."""
+    text = []
+    parser = SSEParser()
+    async for chunk in reader.iter_chunked(16 * 1024):
+        for event in parser.feed(chunk):
+            if event.is_done:
+                return "".join(text)
+            content = openai_delta_content(event.data)
+            if content:
+                text.append(content)
+    return "".join(text)
+
+
+def measure(func, chunks, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(chunks)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(stream: bytes, repeat: int):
+    chunks = network_chunks(stream)
+    megabytes = len(stream) / (1024 * 1024)
+    print(f"📊 Parsing a {megabytes:.1f} MB stream in {len(chunks)} chunks (best of {repeat})")
+    print(f"{'parser':<28} {'seconds':>9} {'MB/s':>9} {'speedup':>8}")
+
+    baseline, expected = measure(legacy, chunks, repeat)
+    print(f"{'legacy line loop':<28} {baseline:>9.3f} {megabytes / baseline:>9.1f} {'1.0x':>8}")
+    for label, func in (("incremental + json.loads", parser_json), ("incremental + fast path", parser_fast_path)):
+        elapsed, text = measure(func, chunks, repeat)
+        assert text == expected, f"{label} output differs from the legacy loop"
+        print(f"{label:<28} {elapsed:>9.3f} {megabytes / elapsed:>9.1f} {baseline / elapsed:>7.1f}x")
+
+    if importlib.util.find_spec("aiohttp") is None:
+        return
+    print("Through an aiohttp StreamReader (includes per-read overhead):")
+    readline = lambda c: asyncio.run(aiohttp_replay(c, legacy_readline))
+    chunked = lambda c: asyncio.run(aiohttp_replay(c, parser_chunked))
+    baseline, expected = measure(readline, chunks, repeat)
+    print(f"{'legacy readline loop':<28} {baseline:>9.3f} {megabytes / baseline:>9.1f} {'1.0x':>8}")
+    elapsed, text = measure(chunked, chunks, repeat)
+    assert text == expected, "chunked parser output differs from the readline loop"
+    print(f"{'iter_chunked + fast path':<28} {elapsed:>9.3f} {megabytes / elapsed:>9.1f} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark upstream SSE parsing")
+    parser.add_argument("--megabytes", type=float, default=8.0)
+    parser.add_argument("--recording", help="Raw upstream response body to replay")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    if args.recording:
+        with open(args.recording, "rb") as f:
+            data = f.read()
+    else:
+        data = generate_stream(args.megabytes)
+    run(data, args.repeat)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Stream Pacing Benchmark
+Time-to-last-byte and frame count for delivering an in-memory response with the
+old per-chunk sleeps versus the immediate, coalescing and paced output modes.
+
+Run from the repository root:
+    python tests/benchmarks/bench_stream_pacing.py [--words N]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.streaming.pacing import PacingConfig, PacingMode, pace_stream, split_words
+
+# Sleeps that used to be hard-coded into the streaming paths
+LEGACY_LOOPS = [
+    ("adapter sse (10ms/chunk)", "words", 0.01),
+    ("BaseEndpoint (10ms/word)", "words", 0.01),
+    ("WebChatEndpoint (50ms/word)", "words", 0.05),
+    ("WebChatAdapter (100ms/10 chars)", "chars", 0.1),
+]
+
+
+def make_response(words: int) -> str:
+    vocabulary = ["the", "stream", "returns", "a", "response", "with", "several", "words", "and", "code:"]
+    return " ".join(vocabulary[i % len(vocabulary)] for i in range(words))
+
+
+def legacy_chunks(text: str, unit: str):
+    if unit == "chars":
+        return [text[i:i + 10] for i in range(0, len(text), 10)]
+    return split_words(text)
+
+
+async def legacy_stream(chunks, delay: float):
+    for chunk in chunks:
+        yield chunk
+        await asyncio.sleep(delay)
+
+
+async def drain(stream):
+    """Consume a stream; return (time to last byte, frames, chars)."""
+    start = time.perf_counter()
+    frames = chars = 0
+    async for chunk in stream:
+        frames += 1
+        chars += len(chunk)
+    return time.perf_counter() - start, frames, chars
+
+
+async def run(words: int, legacy_sample: int, paced_rate: float):
+    text = make_response(words)
+    print(f"📊 Delivering a {words}-word ({len(text)} char) in-memory response")
+    print(f"{'path':<40} {'time to last byte':>18} {'frames':>8}")
+
+    for label, unit, delay in LEGACY_LOOPS:
+        # Sleeping loops are linear in chunk count; time a sample and scale up
+        all_chunks = legacy_chunks(text, unit)
+        sample = all_chunks[:legacy_sample]
+        elapsed, frames, _ = await drain(legacy_stream(sample, delay))
+        estimate = elapsed * len(all_chunks) / max(1, len(sample))
+        print(f"{'legacy ' + label:<40} {estimate:>16.2f}s* {len(all_chunks):>8}")
+
+    modes = [
+        ("immediate", PacingConfig(PacingMode.IMMEDIATE)),
+        ("coalesce (1024 B / 20 ms)", PacingConfig(PacingMode.COALESCE)),
+        (f"paced ({paced_rate:.0f} chars/s)", PacingConfig(PacingMode.PACED, chars_per_second=paced_rate)),
+    ]
+    for label, config in modes:
+        elapsed, frames, chars = await drain(pace_stream(split_words(text), config))
+        assert chars == len(text)
+        print(f"{label:<40} {elapsed:>17.4f}s {frames:>8}")
+
+    print(f"* extrapolated from the first {legacy_sample} chunks")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark streaming output pacing")
+    parser.add_argument("--words", type=int, default=2000)
+    parser.add_argument("--legacy-sample", type=int, default=50)
+    parser.add_argument("--paced-rate", type=float, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.words, args.legacy_sample, args.paced_rate))
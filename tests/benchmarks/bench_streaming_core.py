@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Streaming Core Benchmark
+Frames per second for each dialect (OpenAI chat, text completion, Anthropic,
+Gemini) encoding the same delta stream through the shared core, plus
+non-streaming collection with a list join versus the old `+=` loop.
+
+Run from the repository root:
+    python tests/benchmarks/bench_streaming_core.py [--deltas N]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.adapter.streaming_core import (
+    AnthropicDialect, GeminiDialect, OpenAIChatDialect, TextCompletionDialect, collect_response, stream_events
+)
+from backend.streaming import SSEParser, openai_delta_content
+
+DELTAS = ["Hello", " world", ",", " here's", " some", " `code`", ":\n", "    print(\"hi\")", " — done", "."]
+
+
+class ReplayClient:
+    """Stands in for a Codegen client: replays a fixed list of output chunks."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def run_task(self, prompt, stream=True, **options):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def dialects():
+    return {
+        "openai": lambda: OpenAIChatDialect("chatcmpl-bench", "gpt-4"),
+        "text": lambda: TextCompletionDialect("cmpl-bench", "gpt-3.5-turbo-instruct"),
+        "anthropic": lambda: AnthropicDialect("claude-3-sonnet-20240229"),
+        "gemini": GeminiDialect,
+    }
+
+
+async def encode(make_dialect, client) -> bytes:
+    frames = []
+    async for frame in stream_events(make_dialect(), client, "benchmark prompt"):
+        frames.append(frame)
+    return b"".join(frames)
+
+
+async def legacy_collect(client) -> str:
+    """The old Anthropic/Gemini collection loop."""
+    full_content = ""
+    async for chunk in client.run_task("benchmark prompt", stream=False):
+        if chunk:
+            full_content += chunk
+    return full_content
+
+
+def measure(factory, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = asyncio.run(factory())
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(count: int, repeat: int):
+    chunks = [DELTAS[i % len(DELTAS)] for i in range(count)]
+    client = ReplayClient(chunks)
+    expected = "".join(chunks)
+    print(f"📊 Encoding {count} deltas per dialect (best of {repeat})")
+    print(f"{'dialect':<12} {'seconds':>9} {'frames/s':>12} {'MB out':>8}")
+    for name, make_dialect in dialects().items():
+        elapsed, body = measure(lambda: encode(make_dialect, client), repeat)
+        if name == "openai":
+            text = "".join(openai_delta_content(e.data) or "" for e in SSEParser().feed(body) if not e.is_done)
+            assert text.startswith(expected), "OpenAI stream lost or altered delta text"
+        print(f"{name:<12} {elapsed:>9.3f} {count / elapsed:>12,.0f} {len(body) / 1e6:>8.1f}")
+
+    # Non-streaming collection of one large response in many small chunks
+    big = ReplayClient(["x" * 64] * (count * 4))
+    baseline, legacy = measure(lambda: legacy_collect(big), repeat)
+    elapsed, joined = measure(lambda: collect_response(big, "benchmark prompt"), repeat)
+    assert joined == legacy
+    print(f"collect {len(joined) / 1e6:.1f} MB: += loop {baseline:.3f}s, list join {elapsed:.3f}s ({baseline / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the shared streaming core")
+    parser.add_argument("--deltas", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    import logging
+    logging.disable(logging.INFO)
+    run(args.deltas, args.repeat)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tests for the endpoint circuit breaker shared by the router and endpoint manager.
+Runs without a server: python -m pytest tests/test_circuit_breaker.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.routing.circuit_breaker import (
+    BreakerConfig, CircuitBreaker, CircuitBreakerRegistry, CircuitState
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def make_breaker(**overrides):
+    clock = FakeClock()
+    config = BreakerConfig.from_dict({
+        "window_seconds": 60, "bucket_seconds": 5, "failure_rate_threshold": 50,
+        "minimum_requests": 10, "consecutive_failures": 5, "open_seconds": 30,
+        "max_open_seconds": 120, "half_open_max_calls": 2, **overrides
+    })
+    return CircuitBreaker("test", config, clock=clock), clock
+
+
+def fail(breaker, times):
+    for _ in range(times):
+        assert breaker.allow_request()
+        breaker.record_failure()
+
+
+def test_opens_on_consecutive_failures():
+    breaker, _ = make_breaker()
+    fail(breaker, 4)
+    assert breaker.state == CircuitState.CLOSED
+    fail(breaker, 1)
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow_request()
+    assert breaker.rejected == 1
+
+
+def test_one_success_does_not_reset_error_rate():
+    breaker, _ = make_breaker()
+    # Alternating failures never reach 5 in a row, but the window rate does
+    for _ in range(5):
+        fail(breaker, 1)
+        breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    fail(breaker, 1)
+    # 6 of 11 failed in the window
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.times_opened == 1
+
+
+def test_rate_needs_minimum_requests():
+    breaker, _ = make_breaker()
+    fail(breaker, 3)
+    breaker.record_success()
+    breaker.record_success()
+    assert breaker.failure_rate() == 60.0
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_window_rolls_off_old_buckets():
+    breaker, clock = make_breaker()
+    fail(breaker, 4)
+    breaker.record_success()
+    clock.advance(61)
+    assert breaker.window_counts() == {"successes": 0, "failures": 0}
+    for _ in range(6):
+        breaker.record_success()
+    fail(breaker, 4)
+    # 4 of 10 in the current window: below the 50% threshold
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_half_open_limits_trials_and_closes():
+    breaker, clock = make_breaker()
+    fail(breaker, 5)
+    clock.advance(30)
+    assert breaker.available
+    assert breaker.allow_request()
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitState.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.window_counts() == {"successes": 0, "failures": 0}
+
+
+def test_failed_trial_reopens_with_backoff():
+    breaker, clock = make_breaker()
+    fail(breaker, 5)
+    for cooldown in (30, 60, 120, 120):
+        clock.advance(cooldown - 1)
+        assert not breaker.allow_request()
+        clock.advance(1)
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitState.OPEN
+
+
+def test_release_returns_trial_slot():
+    breaker, clock = make_breaker()
+    fail(breaker, 5)
+    clock.advance(30)
+    assert breaker.allow_request()
+    assert breaker.allow_request()
+    assert not breaker.available
+    breaker.release()
+    assert breaker.available
+    assert breaker.allow_request()
+
+
+def test_registry_overrides_and_transitions():
+    registry = CircuitBreakerRegistry(BreakerConfig())
+    events = []
+    registry.add_listener(lambda breaker, old, new, reason: events.append((breaker.name, old, new)))
+    breaker = registry.get("flaky", {"consecutive_failures": 2})
+    assert registry.get("flaky") is breaker
+    assert breaker.config.consecutive_failures == 2
+    assert registry.get("other").config.consecutive_failures == 5
+    fail(breaker, 2)
+    assert events == [("flaky", CircuitState.CLOSED, CircuitState.OPEN)]
+    stats = registry.get_stats()
+    assert stats["open"] == ["flaky"]
+    assert stats["transitions"][0]["to"] == "open"
+    assert stats["breakers"]["flaky"]["retry_in_seconds"] > 0
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for CodegenClient's non-streaming polling with and without adaptive polling.
+Runs without a server: python -m pytest tests/test_codegen_client.py
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.adapter import codegen_client
+from backend.adapter.codegen_client import CodegenClient
+from backend.adapter.config import CodegenConfig
+from backend.adapter.poll_scheduler import AdaptivePollScheduler
+
+
+class FakeTask:
+    """Completes on its second refresh."""
+
+    def __init__(self):
+        self.id = 1
+        self.status = "ACTIVE"
+        self.result = None
+        self.refreshes = 0
+
+    def refresh(self):
+        self.refreshes += 1
+        if self.refreshes >= 2:
+            self.status = "COMPLETE"
+            self.result = "done"
+
+
+class FakeAgent:
+    def __init__(self):
+        self.task = FakeTask()
+
+    def run(self, prompt):
+        return self.task
+
+
+def make_client(monkeypatch, adaptive_polling, scheduler=None):
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def fast_sleep(seconds):
+        sleeps.append(seconds)
+        await real_sleep(0)
+
+    monkeypatch.setattr(codegen_client.asyncio, "sleep", fast_sleep)
+    monkeypatch.setattr(codegen_client, "Agent", lambda **kwargs: FakeAgent())
+    config = CodegenConfig(org_id="1", token="t", adaptive_polling=adaptive_polling)
+    return CodegenClient(config, scheduler=scheduler), sleeps
+
+
+async def collect(client, prompt="hello"):
+    return [chunk async for chunk in client.run_task(prompt)]
+
+
+def test_run_task_without_adaptive_polling(monkeypatch):
+    client, sleeps = make_client(monkeypatch, adaptive_polling=False)
+    assert client.scheduler is None
+    assert client.poller.scheduler is None
+    assert asyncio.run(collect(client)) == ["done"]
+    # Fixed backoff: 1s before the first poll, then base_delay * 1.5 ** retry
+    assert sleeps == [1, 5]
+
+
+def test_run_task_with_adaptive_polling_records_completion(monkeypatch):
+    scheduler = AdaptivePollScheduler()
+    client, _ = make_client(monkeypatch, adaptive_polling=True, scheduler=scheduler)
+    assert client.scheduler is scheduler
+    assert asyncio.run(collect(client)) == ["done"]
+    assert scheduler.get_distributions()["distributions"]["*"]["samples"] == 1
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Tests for request hedging between an endpoint and the next one in the fallback chain.
+Runs without a server: python -m pytest tests/test_hedging.py
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.routing.hedging import HedgeConfig, Hedger
+
+PRIMARY = {"name": "primary"}
+BACKUP = {"name": "backup"}
+
+
+class FakeAttempts:
+    """Per-endpoint delay and response; records calls and cancellations."""
+
+    def __init__(self, **behaviour):
+        self.behaviour = behaviour  # name -> (seconds, response)
+        self.calls = []
+        self.cancelled = []
+
+    async def __call__(self, endpoint):
+        name = endpoint["name"]
+        self.calls.append(name)
+        seconds, response = self.behaviour[name]
+        try:
+            await asyncio.sleep(seconds)
+        except asyncio.CancelledError:
+            self.cancelled.append(name)
+            raise
+        return response
+
+
+def make_hedger(**overrides):
+    config = HedgeConfig(**{
+        "percentile": 95.0, "budget_percent": 100.0, "budget_burst": 5.0,
+        "min_samples": 5, "min_delay": 0.0, **overrides
+    })
+    return Hedger(config)
+
+
+def prime(hedger, seconds=0.01, samples=5):
+    for _ in range(samples):
+        hedger.record_latency(PRIMARY["name"], seconds)
+
+
+def run(hedger, attempts, backup=BACKUP):
+    return asyncio.run(hedger.run(PRIMARY, backup, attempts))
+
+
+def test_budget_accrues_per_request_up_to_burst():
+    hedger = make_hedger(budget_percent=50.0, budget_burst=2.0)
+    attempts = FakeAttempts(primary=(0, {"ok": True}))
+    for _ in range(3):
+        run(hedger, attempts)
+    assert hedger.states["primary"].credits == 1.5
+    for _ in range(5):
+        run(hedger, attempts)
+    assert hedger.states["primary"].credits == 2.0
+
+
+def test_hedge_denied_without_budget():
+    hedger = make_hedger(budget_percent=10.0)
+    prime(hedger)
+    attempts = FakeAttempts(primary=(0.1, {"from": "primary"}), backup=(0, {"from": "backup"}))
+    outcome = run(hedger, attempts)
+    assert outcome.endpoint is PRIMARY
+    assert attempts.calls == ["primary"]
+    state = hedger.states["primary"]
+    assert state.budget_denied == 1
+    assert state.hedges == 0
+
+
+def test_no_hedge_before_min_samples():
+    hedger = make_hedger()
+    prime(hedger, samples=4)
+    assert hedger.hedge_delay("primary") is None
+    attempts = FakeAttempts(primary=(0.05, {"from": "primary"}), backup=(0, {"from": "backup"}))
+    outcome = run(hedger, attempts)
+    assert outcome.endpoint is PRIMARY
+    assert attempts.calls == ["primary"]
+    # The fifth sample turns hedging on
+    assert hedger.hedge_delay("primary") is not None
+
+
+def test_hedge_delay_uses_percentile_and_min_delay():
+    hedger = make_hedger(min_samples=10, percentile=90.0)
+    for seconds in range(1, 11):
+        hedger.record_latency("primary", seconds / 100)
+    assert hedger.hedge_delay("primary") == 0.10
+    hedger.config.min_delay = 0.5
+    assert hedger.hedge_delay("primary") == 0.5
+    hedger.config.enabled = False
+    assert hedger.hedge_delay("primary") is None
+
+
+def test_backup_wins_and_primary_is_cancelled():
+    hedger = make_hedger()
+    prime(hedger)
+    attempts = FakeAttempts(primary=(5, {"from": "primary"}), backup=(0.01, {"from": "backup"}))
+    outcome = run(hedger, attempts)
+    assert outcome.endpoint is BACKUP
+    assert outcome.response == {"from": "backup"}
+    assert outcome.attempted == [PRIMARY, BACKUP]
+    assert attempts.cancelled == ["primary"]
+    state = hedger.states["primary"]
+    assert (state.hedges, state.hedge_wins, state.primary_wins) == (1, 1, 0)
+    # The loser's elapsed time is kept as a lower bound on its latency
+    assert len(state.latencies) == 6
+    assert state.latencies[-1] >= 0.01
+
+
+def test_primary_wins_after_hedge_and_backup_is_cancelled():
+    hedger = make_hedger()
+    prime(hedger)
+    attempts = FakeAttempts(primary=(0.05, {"from": "primary"}), backup=(5, {"from": "backup"}))
+    outcome = run(hedger, attempts)
+    assert outcome.endpoint is PRIMARY
+    assert attempts.calls == ["primary", "backup"]
+    assert attempts.cancelled == ["backup"]
+    state = hedger.states["primary"]
+    assert (state.hedges, state.hedge_wins, state.primary_wins) == (1, 0, 1)
+
+
+def test_failed_primary_falls_through_to_backup():
+    hedger = make_hedger()
+    prime(hedger)
+    attempts = FakeAttempts(primary=(0.03, None), backup=(0.06, {"from": "backup"}))
+    outcome = run(hedger, attempts)
+    assert outcome.endpoint is BACKUP
+    assert outcome.failed == [PRIMARY]
+    assert attempts.cancelled == []
+    # A failed attempt says nothing about the primary's latency
+    assert len(hedger.states["primary"].latencies) == 5
+
+
+def test_no_backup_means_no_hedge():
+    hedger = make_hedger()
+    prime(hedger)
+    attempts = FakeAttempts(primary=(0.03, None))
+    outcome = run(hedger, attempts, backup=None)
+    assert outcome.endpoint is None
+    assert outcome.response is None
+    assert outcome.failed == [PRIMARY]
+    assert hedger.states["primary"].hedges == 0
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental SSE parser used by the REST endpoints and Z.ai SDK.
+Runs without a server: python -m pytest tests/test_sse_parser.py
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from backend.streaming.sse_parser import (
+    NEEDS_JSON, SSEParser, extract_openai_delta, openai_delta_content
+)
+
+
+def feed_all(chunks):
+    parser = SSEParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return events
+
+
+def openai_chunk(content, **dumps_kwargs):
+    return json.dumps({
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}]
+    }, **dumps_kwargs)
+
+
+def test_single_event():
+    events = feed_all([b'data: {"a": 1}\n\n'])
+    assert len(events) == 1
+    assert events[0].event == "message"
+    assert events[0].json() == {"a": 1}
+
+
+def test_lines_split_across_chunks_byte_by_byte():
+    stream = f"data: {openai_chunk('héllo')}\n\ndata: [DONE]\n\n".encode("utf-8")
+    events = feed_all([stream[i:i + 1] for i in range(len(stream))])
+    assert [e.data for e in events][-1] == "[DONE]"
+    assert openai_delta_content(events[0].data) == "héllo"
+    assert events[1].is_done
+
+
+def test_memoryview_chunks():
+    stream = memoryview(b"data: one\n\ndata: two\n\n")
+    events = feed_all([stream[:8], stream[8:15], stream[15:]])
+    assert [e.data for e in events] == ["one", "two"]
+
+
+def test_multiline_data_is_joined_with_newlines():
+    events = feed_all([b"data: first\ndata: second\ndata\n\n"])
+    assert events[0].data == "first\nsecond\n"
+
+
+def test_event_id_and_retry_fields():
+    parser = SSEParser()
+    events = parser.feed(b"event: content_block_delta\nid: 42\nretry: 1500\ndata: x\n\ndata: y\n\n")
+    assert events[0].event == "content_block_delta"
+    assert events[0].id == "42"
+    assert events[0].retry == 1500
+    # The event name resets per event; the last event id persists
+    assert events[1].event == "message"
+    assert events[1].id == "42"
+    assert parser.last_event_id == "42"
+
+
+def test_comments_and_empty_events_are_skipped():
+    events = feed_all([b": keep-alive\n\nevent: ping\n\ndata: ok\n\n"])
+    assert [(e.event, e.data) for e in events] == [("message", "ok")]
+
+
+def test_crlf_and_cr_line_endings():
+    events = feed_all([b"data: a\r", b"\n\r\n", b"data: b\r\rdata: c\r\n\r\n"])
+    assert [e.data for e in events] == ["a", "b", "c"]
+
+
+def test_field_without_space_after_colon():
+    events = feed_all([b"data:no-space\n\ndata:  two-spaces\n\n"])
+    assert [e.data for e in events] == ["no-space", " two-spaces"]
+
+
+def test_incomplete_event_is_not_dispatched():
+    parser = SSEParser()
+    assert parser.feed(b"data: partial\n") == []
+    assert parser.feed(b"data: more") == []
+    assert [e.data for e in parser.feed(b"\n\n")] == ["partial\nmore"]
+
+
+def test_fast_path_matches_json():
+    samples = [
+        "plain", "", "with \"quotes\" and \\backslash", "unicode é — 漢字 🙂",
+        "newline\nand\ttab", "braces } { inside", " separator"
+    ]
+    for content in samples:
+        for kwargs in ({}, {"separators": (",", ":")}, {"ensure_ascii": False}):
+            data = openai_chunk(content, **kwargs)
+            assert extract_openai_delta(data) == content
+            assert openai_delta_content(data) == json.loads(data)["choices"][0]["delta"]["content"]
+
+
+def test_fast_path_without_content():
+    assert extract_openai_delta('{"choices":[{"delta":{"role":"assistant"},"finish_reason":null}]}') is None
+    assert extract_openai_delta('{"choices":[{"delta":{},"finish_reason":"stop"}]}') is None
+    assert extract_openai_delta('{"choices":[{"delta":{"content":null}}]}') is None
+
+
+def test_fast_path_falls_back_for_complex_payloads():
+    tool_call = '{"choices":[{"delta":{"tool_calls":[{"function":{"arguments":"{}"}}],"content":"z"}}]}'
+    assert extract_openai_delta(tool_call) is NEEDS_JSON
+    assert openai_delta_content(tool_call) == "z"
+
+    two_choices = '{"choices":[{"index":0,"delta":{"content":"a"}},{"index":1,"delta":{"content":"b"}}]}'
+    assert extract_openai_delta(two_choices) is NEEDS_JSON
+    assert openai_delta_content(two_choices) == "a"
+
+    assert openai_delta_content("not json") is None
+
+
+def test_zai_sdk_parser_shares_implementation():
+    from backend.zai_sdk.utils.sse_parser import SSEParser as ZaiParser
+
+    parser = ZaiParser()
+    assert parser.parse_line('data: {"type": "chat:completion"}') == {"type": "chat:completion"}
+    events = parser.feed(b'data: {"data": {"delta_content": "hi",\ndata:  "phase": "answer"}}\n\n')
+    assert events[0].json() == {"data": {"delta_content": "hi", "phase": "answer"}}